@@ -13,11 +13,15 @@
 # limitations under the License.
 
 import flask
+import gevent
 
 from . import handlers
 from . import hooks
+from . import view
 
 from pumphouse import events
+from pumphouse import mapping
+from pumphouse import transfer
 from pumphouse import utils
 
 
@@ -54,12 +58,21 @@ def start_app(config=None, **kwargs):
     app.config.setdefault("CLOUDS_RESET", False)
     app.config.setdefault("BIND_HOST", None)
     app.config.setdefault("PLUGINS", None)
+    app.config.setdefault("RESOURCES_RECONCILE_INTERVAL", 300)
     if config is not None:
         app.config.update(config)
     events.init_app(app)
+    parameters = app.config.get("PARAMETERS", {})
+    transfer.bandwidth.configure(parameters.get("transfer_bandwidth", {}))
+    mapping.registry.configure(
+        parameters.get("id_mapping_path"),
+        verify=parameters.get("id_mapping_verify", False),
+        source=app.config["CLOUDS"]["source"]["endpoint"]["auth_url"])
     hooks.source.init_app(app)
     if "destination" in app.config["CLOUDS"]:
         hooks.destination.init_app(app)
+    events.subscribe(view.resources_view.handle)
+    gevent.spawn(handlers.watch_resources, app)
     host, port = get_bind_host()
     events.run(app, policy_server=False, host=host, port=port)
 
@@ -16,6 +16,7 @@ import datetime
 import functools
 import os
 import logging
+import uuid
 
 import flask
 import gevent
@@ -23,10 +24,12 @@ from taskflow import exceptions as taskflow_excs
 from taskflow.patterns import graph_flow
 
 from . import hooks
+from . import view
 
 from pumphouse import context
 from pumphouse import events
 from pumphouse import flows
+from pumphouse import transfer
 from pumphouse.tasks import evacuation
 from pumphouse.tasks import resources as resource_tasks
 from pumphouse.tasks import node as node_tasks
@@ -189,11 +192,12 @@ def cloud_floating_ips(conf, cloud):
 
 @cloud_resources.register
 def cloud_hypervisors(conf, cloud):
+    services = dict((service.host, service)
+                    for service in cloud.nova.services.list(
+                        binary="nova-compute"))
     for hyperv in cloud.nova.hypervisors.list():
-        services = cloud.nova.services.list(host=hyperv.service["host"],
-                                            binary="nova-compute")
-        service = services[0]
-        if service.state == "up":
+        service = services.get(hyperv.service["host"])
+        if service is not None and service.state == "up":
             if service.status == "enabled":
                 status = "available"
             else:
@@ -288,12 +292,40 @@ def cloud_networks(conf, cloud):
             }
 
 
-def cloud_view(client):
-    return {
-        "urls": client.cloud_urls,
-        "resources": cloud_resources(flask.current_app.config,
-                                     client.connect()),
-    }
+def get_clouds(config):
+    clouds = [("source", hooks.source)]
+    if "destination" in config["CLOUDS"]:
+        clouds.append(("destination", hooks.destination))
+    return clouds
+
+
+def reconcile_view(app, clouds):
+    """List resources of clouds and reconcile the view with them.
+
+    :param app:    a :class:`flask.Flask` instance
+    :param clouds: a list of pairs of names of clouds and their hooks
+    """
+    def reconcile(name, hook):
+        with app.app_context():
+            resources = cloud_resources(app.config, hook.connect())
+        view.resources_view.reconcile(name, resources)
+
+    gevent.joinall([gevent.spawn(reconcile, name, hook)
+                    for name, hook in clouds], raise_error=True)
+
+
+def watch_resources(app):
+    """Seed the view of resources and reconcile it periodically.
+
+    :param app: a :class:`flask.Flask` instance
+    """
+    interval = app.config["RESOURCES_RECONCILE_INTERVAL"]
+    while True:
+        try:
+            reconcile_view(app, get_clouds(app.config))
+        except Exception:
+            LOG.exception("Unable to reconcile the view of resources")
+        gevent.sleep(interval)
 
 
 @pump.route("/")
@@ -331,40 +363,83 @@ def reset():
 @pump.route("/resources")
 @crossdomain()
 def resources():
-    group = gevent.pool.Group()
-    source_view = gevent.spawn(
-        flask.copy_current_request_context(cloud_view),
-        hooks.source,
-    )
-    if "destination" not in flask.current_app.config["CLOUDS"]:
-        gevent.wait([source_view])
-        return flask.jsonify(
-            reset=flask.current_app.config["CLOUDS_RESET"],
-            source=source_view.value,
-            # TODO(akscram): A set of hosts that don't belong to any cloud.
-            hosts=[],
-            # TODO(akscram): A set of current events.
-            events=[],
-        )
-    destination_view = gevent.spawn(
-        flask.copy_current_request_context(cloud_view),
-        hooks.destination,
-    )
-    gevent.wait([source_view, destination_view])
-    return flask.jsonify(
-        reset=flask.current_app.config["CLOUDS_RESET"],
-        source=source_view.value,
-        destination=destination_view.value,
+    config = flask.current_app.config
+    clouds = get_clouds(config)
+    stale = [(name, hook) for name, hook in clouds
+             if not view.resources_view.is_ready(name)]
+    if stale:
+        try:
+            reconcile_view(flask.current_app._get_current_object(), stale)
+        except Exception:
+            LOG.exception("Unable to reconcile the view of resources")
+            return flask.make_response(
+                "Unable to list resources of clouds", 503)
+    etag, resources = view.resources_view.snapshot(
+        [name for name, _ in clouds])
+    response = flask.jsonify(
+        reset=config["CLOUDS_RESET"],
         # TODO(akscram): A set of hosts that don't belong to any cloud.
         hosts=[],
         # TODO(akscram): A set of current events.
         events=[],
+        **dict((name, {"urls": hook.cloud_urls,
+                       "resources": resources[name]})
+               for name, hook in clouds)
     )
+    response.set_etag(etag)
+    return response.make_conditional(flask.request)
+
+
+@pump.route("/bandwidth", methods=["GET", "PUT"])
+@crossdomain()
+def bandwidth():
+    if flask.request.method == "PUT":
+        limits = flask.request.get_json(force=True, silent=True)
+        if not isinstance(limits, dict) or not all(
+                rate is None or isinstance(rate, (int, long, float)) and
+                rate > 0 for rate in limits.itervalues()):
+            return flask.make_response(
+                "a mapping of routes to positive rates in bytes per second "
+                "or null is expected", 400)
+        transfer.bandwidth.configure(limits)
+    return flask.jsonify(transfer.bandwidth.limits())
+
+
+def is_persistent():
+    parameters = flask.current_app.config.get("PARAMETERS") or {}
+    return bool(parameters.get("flow_persistence"))
+
+
+def get_run():
+    """Get an ID of the run of a migration and whether it is resumed.
+
+    The stored run is resumed if its ID is passed by the resume argument,
+    otherwise a new ID is generated if runs are stored.
+
+    :returns: a pair of the ID of the run or None and the flag of resume
+    """
+    run_id = flask.request.args.get("resume")
+    if run_id is not None:
+        return run_id, True
+    if not is_persistent():
+        return None, False
+    return uuid.uuid4().hex, False
+
+
+def run_response(run_id):
+    if run_id is None:
+        return flask.make_response()
+    return flask.jsonify(run_id=run_id)
 
 
 @pump.route("/servers/<server_id>", methods=["POST"])
 @crossdomain()
 def migrate_server(server_id):
+    run_id, resume = get_run()
+    if resume and not is_persistent():
+        return flask.make_response(
+            "flow_persistence is required to resume runs", 400)
+
     @flask.copy_current_request_context
     def migrate():
         config = flask.current_app.config.get("PLUGINS") or {}
@@ -386,7 +461,8 @@ def migrate_server(server_id):
             res, server_flow = server_tasks.migrate_server(ctx, server_id)
             flow.add(*res)
             flow.add(server_flow)
-            result = flows.run_flow(flow, ctx.store)
+            result = flows.run_flow(flow, ctx.store, ctx.config,
+                                    run_id=run_id, resume=resume)
             LOG.debug("Result of migration: %s", result)
         except Exception:
             msg = ("Error occured during migration of server: {}"
@@ -409,12 +485,17 @@ def migrate_server(server_id):
         return flask.make_response(
             "destination cloud is not specified in config", 403)
     gevent.spawn(migrate)
-    return flask.make_response()
+    return run_response(run_id)
 
 
 @pump.route("/tenants/<tenant_id>", methods=["POST"])
 @crossdomain()
 def migrate_tenant(tenant_id):
+    run_id, resume = get_run()
+    if resume and not is_persistent():
+        return flask.make_response(
+            "flow_persistence is required to resume runs", 400)
+
     @flask.copy_current_request_context
     def migrate():
         config = flask.current_app.config.get("PLUGINS") or {}
@@ -433,7 +514,8 @@ def migrate_tenant(tenant_id):
         try:
             flow = resource_tasks.migrate_resources(ctx, tenant_id)
             LOG.debug("Migration flow: %s", flow)
-            result = flows.run_flow(flow, ctx.store)
+            result = flows.run_flow(flow, ctx.store, ctx.config,
+                                    run_id=run_id, resume=resume)
             LOG.debug("Result of migration: %s", result)
         except taskflow_excs.Empty:
             msg = ("There aren't any resources for migration in the {} tenant"
@@ -464,15 +546,21 @@ def migrate_tenant(tenant_id):
         return flask.make_response(
             "destination cloud is not specified in config", 403)
     gevent.spawn(migrate)
-    return flask.make_response()
+    return run_response(run_id)
 
 
 @pump.route("/hosts/<host_id>", methods=["POST"])
 @crossdomain()
 def evacuate_host(host_id):
+    run_id, resume = get_run()
+    if resume and not is_persistent():
+        return flask.make_response(
+            "flow_persistence is required to resume runs", 400)
+
     @flask.copy_current_request_context
     def evacuate():
-        config = flask.current_app.config.get("PLUGINS") or {}
+        config = dict(flask.current_app.config.get("PLUGINS") or {},
+                      **flask.current_app.config.get("PARAMETERS", {}))
         src = hooks.source.connect()
         if "destination" not in flask.current_app.config["CLOUDS"]:
             dst = None
@@ -490,7 +578,8 @@ def evacuate_host(host_id):
         try:
             flow = evacuation.evacuate_host(ctx, host_id)
             LOG.debug("Evacuation flow: %s", flow)
-            result = flows.run_flow(flow, ctx.store)
+            result = flows.run_flow(flow, ctx.store, ctx.config,
+                                    run_id=run_id, resume=resume)
             LOG.debug("Result of evacuation: %s", result)
         except Exception:
             msg = ("Error occured during evacuating host {}"
@@ -509,12 +598,17 @@ def evacuate_host(host_id):
             "action": None,
         }, namespace="/events")
     gevent.spawn(evacuate)
-    return flask.make_response()
+    return run_response(run_id)
 
 
 @pump.route("/hosts/<host_id>", methods=["DELETE"])
 @crossdomain()
 def reassign_host(host_id):
+    run_id, resume = get_run()
+    if resume and not is_persistent():
+        return flask.make_response(
+            "flow_persistence is required to resume runs", 400)
+
     @flask.copy_current_request_context
     def reassign():
         # NOTE(akscram): Initialization of fuelclient.
@@ -524,7 +618,8 @@ def reassign_host(host_id):
         os.environ["KEYSTONE_USER"] = fuel_config["username"]
         os.environ["KEYSTONE_PASS"] = fuel_config["password"]
 
-        plugins = flask.current_app.config.get("PLUGINS") or {}
+        plugins = dict(flask.current_app.config.get("PLUGINS") or {},
+                       **flask.current_app.config.get("PARAMETERS", {}))
 
         src_config = hooks.source.config()
         dst_config = hooks.destination.config()
@@ -540,7 +635,8 @@ def reassign_host(host_id):
 
             flow = node_tasks.reassign_node(ctx, host_id)
             LOG.debug("Reassigning flow: %s", flow)
-            result = flows.run_flow(flow, ctx.store)
+            result = flows.run_flow(flow, ctx.store, ctx.config,
+                                    run_id=run_id, resume=resume)
             LOG.debug("Result of migration: %s", result)
         except Exception:
             msg = ("Error occured during reassigning host {}"
@@ -555,7 +651,7 @@ def reassign_host(host_id):
         return flask.make_response(
             "destination cloud is not specified in config", 403)
     gevent.spawn(reassign)
-    return flask.make_response()
+    return run_response(run_id)
 
 
 # XXX(akscram): Nothing works without this.
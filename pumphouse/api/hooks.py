@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import gevent
 import gevent.lock
 import logging
+import time
 
 import flask
 
@@ -24,9 +26,32 @@ LOG = logging.getLogger(__name__)
 
 
 class Clouds(object):
-    def __init__(self):
+    """Keeps clients of clouds and their health state
+
+    The health of every client is checked by a background heartbeat
+    instead of each request. If a check fails the client is recreated
+    and checks are repeated with an exponential backoff until the cloud
+    becomes available again.
+
+    :param interval:    a number of seconds between heartbeats
+    :param ttl:         a number of seconds while the result of the last
+                        successful check is trusted, after that the
+                        client is checked synchronously on connect
+    :param max_backoff: a maximum number of seconds between checks of
+                        a broken client
+    """
+    default_interval = 30
+    default_ttl = 90
+    default_max_backoff = 300
+
+    def __init__(self, interval=None, ttl=None, max_backoff=None):
+        self.interval = interval or self.default_interval
+        self.ttl = ttl or self.default_ttl
+        self.max_backoff = max_backoff or self.default_max_backoff
         self._services = {}
         self._clients = {}
+        self._checked = {}
+        self._heartbeats = {}
 
     def register(self, name, service):
         self._services[name] = service
@@ -37,16 +62,52 @@ class Clouds(object):
         if client is None:
             client = service.make()
             self._clients[name] = client
-        else:
+            self._checked[name] = time.time()
+            self._heartbeats[name] = gevent.spawn(self._heartbeat, name)
+        elif not self.is_healthy(name):
             LOG.debug("Trying to check client %s", client)
-            if not service.check(client):
-                LOG.warning("The client %s is broken, try to get yet one",
-                            client)
-                # TODO(akscram): One try is not enough.
-                client = service.make(identity=client.identity)
-                self._clients[name] = client
+            client = self.check(name)
         return service, client
 
+    def is_healthy(self, name):
+        checked = self._checked.get(name)
+        return checked is not None and time.time() - checked <= self.ttl
+
+    def check(self, name):
+        """Check the client of the cloud and recreate it if it is broken.
+
+        :param name: a name of the cloud
+        :returns: the checked or a recreated client
+        """
+        service = self._services[name]
+        client = self._clients[name]
+        if service.check(client):
+            self._checked[name] = time.time()
+        else:
+            LOG.warning("The client %s is broken, try to get yet one",
+                        client)
+            self._checked.pop(name, None)
+            client = service.make(identity=client.identity)
+            self._clients[name] = client
+        return client
+
+    def beat(self, name, delay):
+        """Make one heartbeat and return the delay before the next one."""
+        try:
+            self.check(name)
+        except Exception:
+            LOG.exception("Unexpected error in heartbeat of cloud %s", name)
+            self._checked.pop(name, None)
+        if self.is_healthy(name):
+            return self.interval
+        return min(delay * 2, self.max_backoff)
+
+    def _heartbeat(self, name):
+        delay = self.interval
+        while True:
+            gevent.sleep(delay)
+            delay = self.beat(name, delay)
+
 
 class Cloud(object):
     def __init__(self, target):
@@ -58,6 +119,9 @@ class Cloud(object):
         app.config.setdefault("CLOUD_DRIVER", "pumphouse.cloud.Cloud")
         app.config.setdefault("IDENTITY_DRIVER", "pumphouse.cloud.Identity")
         app.config.setdefault("CLOUD_SERVICE", "pumphouse.base.Service")
+        app.config.setdefault("CLOUDS_HEARTBEAT_INTERVAL", None)
+        app.config.setdefault("CLOUDS_HEALTH_TTL", None)
+        app.config.setdefault("CLOUDS_RECONNECT_BACKOFF", None)
         clouds = self.register_extension(app)
         service = self.init_cloud_service(app)
         clouds.register(self.target, service)
@@ -66,7 +130,11 @@ class Cloud(object):
         if not hasattr(app, "extensions"):
             app.extensions = {}
         if "clouds" not in app.extensions:
-            app.extensions["clouds"] = clouds = Clouds()
+            app.extensions["clouds"] = clouds = Clouds(
+                interval=app.config["CLOUDS_HEARTBEAT_INTERVAL"],
+                ttl=app.config["CLOUDS_HEALTH_TTL"],
+                max_backoff=app.config["CLOUDS_RECONNECT_BACKOFF"],
+            )
         else:
             clouds = app.extensions["clouds"]
         return clouds
@@ -90,7 +158,8 @@ class Cloud(object):
                                 plugins,
                                 self.target,
                                 cloud_driver,
-                                identity_driver)
+                                identity_driver,
+                                parameters=config.get("PARAMETERS", {}))
         return service
 
     def reset(self, events):
@@ -0,0 +1,105 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import collections
+import logging
+import threading
+import uuid
+
+
+LOG = logging.getLogger(__name__)
+
+
+class ResourcesView(object):
+    """Keeps resources of clouds in memory
+
+    The view is filled by listing resources of a cloud and then kept
+    current by events of migration tasks. Every change of the view
+    increases its version, which is used as an entity tag of it.
+    """
+    fields = ("id", "cloud", "type", "data")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.clouds = {}
+        self.version = 0
+        self.instance = uuid.uuid4().hex[:8]
+
+    def is_ready(self, cloud):
+        return cloud in self.clouds
+
+    def reconcile(self, cloud, resources):
+        """Replace all resources of the cloud by listed ones.
+
+        :param cloud:     a name of the cloud
+        :param resources: an iterable with dicts describing resources
+        """
+        resources = collections.OrderedDict(
+            ((resource["type"], resource["id"]), resource)
+            for resource in resources)
+        with self.lock:
+            if self.clouds.get(cloud) != resources:
+                self.clouds[cloud] = resources
+                self.version += 1
+
+    def invalidate(self, cloud):
+        with self.lock:
+            if self.clouds.pop(cloud, None) is not None:
+                self.version += 1
+
+    def handle(self, event, payload=None, *args, **kwargs):
+        """Apply an event of tasks to the view.
+
+        The method has the signature of :func:`pumphouse.events.emit`
+        to be subscribed to events.
+        """
+        if event == "reset completed":
+            self.invalidate(payload["cloud"])
+        elif event in ("create", "update", "delete"):
+            with self.lock:
+                resources = self.clouds.get(payload.get("cloud"))
+                if resources is None:
+                    return
+                key = (payload["type"], payload["id"])
+                if event == "delete":
+                    if resources.pop(key, None) is None:
+                        return
+                elif "data" in payload:
+                    resource = dict((field, payload[field])
+                                    for field in self.fields
+                                    if field in payload)
+                    if key in resources:
+                        data = dict(resources[key]["data"], **resource["data"])
+                        resource = dict(resources[key], data=data)
+                    resources[key] = resource
+                else:
+                    return
+                self.version += 1
+
+    def snapshot(self, clouds):
+        """Get resources of clouds with the entity tag of them.
+
+        :param clouds: a list of names of clouds
+        :returns: a pair of the entity tag and a dict with lists of
+                  resources by names of clouds
+        """
+        with self.lock:
+            etag = "{}-{}".format(self.instance, self.version)
+            # NOTE: a cloud could be invalidated after it was reconciled.
+            resources = dict((cloud, self.clouds.get(cloud, {}).values())
+                             for cloud in clouds)
+        return etag, resources
+
+
+resources_view = ResourcesView()
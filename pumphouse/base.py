@@ -25,7 +25,8 @@ class Service(object):
     default_num_tenants = 2
     default_num_servers = 2
 
-    def __init__(self, config, plugins, target, cloud_driver, identity_driver):
+    def __init__(self, config, plugins, target, cloud_driver, identity_driver,
+                 parameters=None):
         self.identity_config = config.pop("identity")
         self.populate_config = config.pop("populate", None)
         self.workloads_config = config.pop("workloads", None)
@@ -35,12 +36,14 @@ class Service(object):
         self.target = target
         self.cloud_driver = cloud_driver
         self.identity_driver = identity_driver
+        self.parameters = parameters or {}
 
     def make(self, identity=None):
         if identity is None:
             identity = self.identity_driver(**self.identity_config)
         cloud = self.cloud_driver.from_dict(self.target, identity,
                                             self.cloud_config)
+        cloud.configure(self.parameters)
         LOG.info("Cloud client initialized for endpoint: %s",
                  self.cloud_config["endpoint"]["auth_url"])
         return cloud
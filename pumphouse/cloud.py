@@ -14,27 +14,52 @@
 
 import collections
 import logging
+import threading
+import time
+import weakref
+
+import requests
+from requests import adapters
 import sqlalchemy as sqla
 
 from novaclient.v1_1 import client as nova_client
+from keystoneclient.auth.identity import v2 as keystone_auth
+from keystoneclient import session as keystone_session
 from keystoneclient.v2_0 import client as keystone_client
 from glanceclient import client as glance
 from cinderclient import client as cinder
 from neutronclient.neutron import client as neutron_client
 
+from . import flows
+
 
 LOG = logging.getLogger(__name__)
 
 
 class Identity(collections.Mapping):
+    """Keeps hashes of users' passwords from the identity database
+
+    Hashes are fetched and pushed in batches to save round-trips to the
+    database when passwords of many users are handled at once.
+
+    :param connection:  a connection string in the SQLAlchemy format
+    :param batch_size:  a maximum number of users in one query
+    :param engine:      additional parameters of the SQLAlchemy engine,
+                        e.g. pool_size, max_overflow or pool_recycle
+    """
+    default_batch_size = 500
+    users = sqla.sql.table("user", sqla.sql.column("id"),
+                           sqla.sql.column("password"))
     select_query = sqla.text("SELECT id, password FROM user "
                              "WHERE id = :user_id")
     update_query = sqla.text("UPDATE user SET password = :password "
                              "WHERE id = :user_id")
 
-    def __init__(self, connection):
-        self.engine = sqla.create_engine(connection)
+    def __init__(self, connection, batch_size=None, **engine):
+        self.engine = sqla.create_engine(connection, **engine)
+        self.batch_size = batch_size or self.default_batch_size
         self.hashes = {}
+        self.changed = set()
 
     def fetch(self, user_id):
         """Fetch a hash of user's password."""
@@ -43,12 +68,35 @@ class Identity(collections.Mapping):
             self.hashes[user_id] = password
             return password
 
+    def prefetch(self, user_ids):
+        """Fetch hashes of passwords of users which are not known yet.
+
+        :param user_ids: an iterable with IDs of users
+        """
+        user_ids = [user_id for user_id in set(user_ids)
+                    if user_id not in self.hashes]
+        for batch in self._batches(user_ids):
+            query = sqla.select([self.users.c.id, self.users.c.password]) \
+                .where(self.users.c.id.in_(batch))
+            for user_id, password in self.engine.execute(query):
+                self.hashes[user_id] = password
+            for user_id in batch:
+                self.hashes.setdefault(user_id, None)
+
     def push(self):
-        """Push hashes of users' passwords."""
+        """Push hashes of users' passwords changed since the last push."""
+        user_ids = list(self.changed)
         with self.engine.begin() as conn:
-            for user_id, password in self.hashes.iteritems():
-                conn.execute(self.update_query,
-                             user_id=user_id, password=password)
+            for batch in self._batches(user_ids):
+                conn.execute(self.update_query, [
+                    {"user_id": user_id, "password": self.hashes[user_id]}
+                    for user_id in batch
+                ])
+        self.changed.difference_update(user_ids)
+
+    def _batches(self, items):
+        for i in xrange(0, len(items), self.batch_size):
+            yield items[i:i + self.batch_size]
 
     def __len__(self):
         return len(self.hashes)
@@ -67,6 +115,7 @@ class Identity(collections.Mapping):
     def update(self, iterable):
         for user_id, password in iterable:
             self.hashes[user_id] = password
+            self.changed.add(user_id)
 
 
 NAMESPACE = collections.namedtuple("Namespace", ("username", "password",
@@ -101,6 +150,204 @@ class Namespace(NAMESPACE):
                         self.tenant_name, self.auth_url))
 
 
+class lazy_client(object):
+    """Creates a client of a service on the first access
+
+    The client is created only once for an instance of :class:`Cloud`
+    and then it is shared between all users of the cloud.
+
+    :param factory: a method which creates the client
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        with instance._clients_lock:
+            try:
+                return instance.__dict__[self.name]
+            except KeyError:
+                LOG.debug("Client %s is created for %r", self.name, instance)
+                client = instance.__dict__[self.name] = self.factory(instance)
+                return client
+
+
+class CloudPool(object):
+    """Keeps clouds restricted by different credentials
+
+    Every restricted cloud authenticates its clients once and then
+    reuses their tokens, so the pool allows to avoid a new round-trip
+    to the identity service for the same pair of user and tenant.
+    Clouds are evicted from the pool when their age exceeds the TTL,
+    which should be less than a lifetime of tokens, or when the pool
+    is full and the cloud is the least recently used one.
+
+    :param size:    a maximum number of clouds in the pool
+    :param ttl:     a number of seconds while a cloud can be reused
+    """
+    default_size = 128
+    default_ttl = 1800
+
+    def __init__(self, size=None, ttl=None):
+        self.size = size if size is not None else self.default_size
+        self.ttl = ttl if ttl is not None else self.default_ttl
+        self.clouds = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.creating = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, namespace, factory):
+        """Get a cloud by credentials or create it by the factory.
+
+        Concurrent requests for the same credentials wait for the only
+        one cloud to be created.
+
+        :param namespace: an instance of :class:`Namespace`
+        :param factory:   a callable which creates a cloud for the given
+                          namespace
+        :returns: a cloud object
+        """
+        with self.lock:
+            cloud = self._lookup(namespace)
+            if cloud is not None:
+                return cloud
+            creating = self.creating.setdefault(namespace, threading.Lock())
+        with creating:
+            with self.lock:
+                cloud = self._lookup(namespace)
+                if cloud is not None:
+                    return cloud
+                self.misses += 1
+            try:
+                cloud = factory(namespace)
+                with self.lock:
+                    self.clouds[namespace] = (cloud, time.time())
+                    while len(self.clouds) > self.size:
+                        self.clouds.popitem(last=False)
+                        self.evictions += 1
+            finally:
+                with self.lock:
+                    self.creating.pop(namespace, None)
+        return cloud
+
+    def _lookup(self, namespace):
+        try:
+            cloud, created_at = self.clouds.pop(namespace)
+        except KeyError:
+            return None
+        if time.time() - created_at > self.ttl:
+            self.evictions += 1
+            return None
+        self.clouds[namespace] = (cloud, created_at)
+        self.hits += 1
+        return cloud
+
+    def clear(self):
+        with self.lock:
+            self.clouds.clear()
+
+    def stats(self):
+        return {
+            "size": len(self.clouds),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(size=config.get("size"), ttl=config.get("ttl"))
+
+
+class HTTPSession(object):
+    """Keeps HTTP connections shared between clients of clouds
+
+    All clients of a cloud and of clouds restricted from it send their
+    requests through the same session, so connections to every host
+    are kept alive and reused instead of being established for each
+    API call.
+
+    :param pool_size:   a maximum number of connections kept for a host,
+                        defaults to the number of workers of the engine
+    :param download_streams: a number of concurrent requests of ranges of
+                             an image downloaded from the cloud
+    :param range_size:  a size of a range of an image in bytes
+    """
+    prefixes = ("http://", "https://")
+    default_pool_size = flows.WORKERS
+    default_download_streams = 1
+    default_range_size = 16 * 1024 * 1024
+
+    def __init__(self, pool_size=None, download_streams=None,
+                 range_size=None):
+        self.configured_pool_size = pool_size
+        self.pool_size = pool_size or self.default_pool_size
+        self.download_streams = (download_streams or
+                                 self.default_download_streams)
+        self.range_size = range_size or self.default_range_size
+        self.adapter = adapters.HTTPAdapter(pool_maxsize=self.pool_size)
+        self.sessions = weakref.WeakSet()
+        self.session = requests.Session()
+        self.mount(self.session)
+
+    def mount(self, session):
+        """Make the session use shared connections.
+
+        :param session: an instance of :class:`requests.Session`
+        """
+        for prefix in self.prefixes:
+            session.mount(prefix, self.adapter)
+        self.sessions.add(session)
+
+    def stats(self):
+        pools = self.adapter.poolmanager.pools
+        num_connections = num_requests = 0
+        for key in pools.keys():
+            pool = pools[key]
+            num_connections += pool.num_connections
+            num_requests += pool.num_requests
+        return {
+            "hosts": len(pools),
+            "connections": num_connections,
+            "requests": num_requests,
+            "reused": num_requests - num_connections,
+        }
+
+    def configure(self, parameters):
+        """Size pools of connections for workers of the engine.
+
+        The pool size given explicitly is kept. Mounted sessions are
+        remounted to a new adapter, connections of the old one are closed.
+
+        :param parameters: a dict with parameters of migration tasks
+        """
+        if self.configured_pool_size:
+            return
+        pool_size = max(
+            flows.WORKERS,
+            parameters.get("flow_workers", flows.WORKERS),
+            parameters.get("discovery_workers", flows.WORKERS))
+        if pool_size == self.pool_size:
+            return
+        adapter, self.adapter = (
+            self.adapter, adapters.HTTPAdapter(pool_maxsize=pool_size))
+        self.pool_size = pool_size
+        for session in list(self.sessions):
+            self.mount(session)
+        adapter.close()
+
+    @classmethod
+    def from_dict(cls, config):
+        return cls(pool_size=config.get("pool_size"),
+                   download_streams=config.get("download_streams"),
+                   range_size=config.get("range_size"))
+
+
 class Cloud(object):
     """Describes a cloud involved in migration process
 
@@ -112,28 +359,99 @@ class Cloud(object):
     :type namespace:    :class:`Namespace`
     :param identity:    object containing access credentials
     :type identity:     :class:`Identity`
+    :param pool:        a pool of restricted clouds shared by the cloud
+                        and all clouds restricted from it
+    :type pool:         :class:`CloudPool`
+    :param http:        HTTP connections shared by all clients of the cloud
+                        and of all clouds restricted from it
+    :type http:         :class:`HTTPSession`
     """
 
-    def __init__(self, name, namespace, identity):
+    def __init__(self, name, namespace, identity, pool=None, http=None):
         self.name = name
         self.namespace = namespace
         self.identity = identity
-        self.nova = nova_client.Client(self.namespace.username,
-                                       self.namespace.password,
-                                       self.namespace.tenant_name,
-                                       self.namespace.auth_url,
-                                       "compute")
-        self.keystone = keystone_client.Client(**self.namespace.to_dict())
-        g_endpoint = self.keystone.service_catalog.get_endpoints()["image"][0]
-        self.glance = glance.Client("2",
-                                    endpoint=g_endpoint["publicURL"],
-                                    token=self.keystone.auth_token)
-        self.cinder = cinder.Client("1",
-                                    self.namespace.username,
-                                    self.namespace.password,
-                                    self.namespace.tenant_name,
-                                    self.namespace.auth_url)
-        self.neutron = neutron_client.Client("2.0", **self.namespace.to_dict())
+        if pool is None:
+            pool = CloudPool()
+        self.pool = pool
+        if http is None:
+            http = HTTPSession()
+        self.http = http
+        self._clients_lock = threading.RLock()
+        self._endpoints = None
+        self._endpoints_token = None
+
+    @lazy_client
+    def session(self):
+        auth = keystone_auth.Password(self.namespace.auth_url,
+                                      username=self.namespace.username,
+                                      password=self.namespace.password,
+                                      tenant_name=self.namespace.tenant_name)
+        return keystone_session.Session(auth=auth, session=self.http.session)
+
+    @lazy_client
+    def nova(self):
+        return nova_client.Client(self.namespace.username,
+                                  self.namespace.password,
+                                  self.namespace.tenant_name,
+                                  self.namespace.auth_url,
+                                  "compute",
+                                  session=self.session)
+
+    @lazy_client
+    def keystone(self):
+        # NOTE: the client authenticates itself as it does without a session
+        # to keep its auth_ref, but requests go through shared connections.
+        session = keystone_session.Session(session=self.http.session)
+        client = keystone_client.Client(session=session,
+                                        **self.namespace.to_dict())
+        session.auth = client
+        client.authenticate()
+        return client
+
+    @lazy_client
+    def glance(self):
+        g_endpoint = self.get_endpoints()["image"][0]
+        client = glance.Client("2",
+                               endpoint=g_endpoint["publicURL"],
+                               token=self.keystone.auth_token)
+        self.http.mount(client.http_client.session)
+        return client
+
+    @lazy_client
+    def cinder(self):
+        return cinder.Client("1",
+                             self.namespace.username,
+                             self.namespace.password,
+                             self.namespace.tenant_name,
+                             self.namespace.auth_url,
+                             session=self.session)
+
+    @lazy_client
+    def neutron(self):
+        return neutron_client.Client("2.0", session=self.session)
+
+    def get_endpoints(self):
+        """Get endpoints of services from the service catalog.
+
+        The catalog is fetched once for every token of the cloud.
+
+        :returns: a dict with lists of endpoints by types of services
+        """
+        token = self.keystone.auth_token
+        with self._clients_lock:
+            if self._endpoints is None or self._endpoints_token != token:
+                catalog = self.keystone.service_catalog
+                self._endpoints = catalog.get_endpoints()
+                self._endpoints_token = token
+            return self._endpoints
+
+    def configure(self, parameters):
+        """Tune the cloud for parameters of migration tasks.
+
+        :param parameters: a dict with parameters of migration tasks
+        """
+        self.http.configure(parameters)
 
     def ping(self, plugins):
         try:
@@ -150,7 +468,12 @@ class Cloud(object):
 
     def restrict(self, **kwargs):
         namespace = self.namespace.restrict(**kwargs)
-        return self.__class__(self.name, namespace, self.identity)
+        return self.pool.get(namespace, self._make_restricted)
+
+    def _make_restricted(self, namespace):
+        LOG.debug("Restricted cloud is created for %r", namespace)
+        return self.__class__(self.name, namespace, self.identity,
+                              pool=self.pool, http=self.http)
 
     @classmethod
     def from_dict(cls, name, identity, config):
@@ -161,7 +484,9 @@ class Cloud(object):
             tenant_name=endpoint["tenant_name"],
             auth_url=endpoint["auth_url"],
         )
-        return cls(name, namespace, identity)
+        pool = CloudPool.from_dict(config.get("pool", {}))
+        http = HTTPSession.from_dict(config.get("http", {}))
+        return cls(name, namespace, identity, pool=pool, http=http)
 
     def __repr__(self):
         return "<Cloud(namespace={!r})>".format(self.namespace)
@@ -17,11 +17,14 @@ import collections
 import json
 import logging
 import os
+import time
 
 from pumphouse import exceptions
 from pumphouse import utils
 from pumphouse import flows
 from pumphouse import context
+from pumphouse import mapping
+from pumphouse import transfer
 from pumphouse.api import handlers
 from pumphouse.tasks import base as tasks_base
 from pumphouse.tasks import evacuation as evacuation_tasks
@@ -68,6 +71,11 @@ def get_parser():
                         nargs="?",
                         const="flow.dot",
                         help="Dump flow without execution")
+    parser.add_argument("--resume",
+                        metavar="RUN_ID",
+                        help="Resume the stored run skipping tasks executed "
+                             "successfully, requires the flow_persistence "
+                             "parameter")
 
     subparsers = parser.add_subparsers()
     migrate_parser = subparsers.add_parser("migrate",
@@ -168,10 +176,10 @@ def get_parser():
 
 
 def migrate_volumes(ctx, flow, ids):
+    ids = set(ids)
     volume_resources = []
     volumes_flow = unordered_flow.Flow("migrate-detached-volumes")
-    volumes = ctx.src_cloud.cinder.volumes.list(
-        search_opts={'all_tenants': 1, 'status': 'available'})
+    volumes = ctx.inventory.find("volumes", "status", "available")
     for volume in volumes:
         if volume.id in ids:
             resources, volume_flow = volume_tasks.migrate_volume(
@@ -183,7 +191,8 @@ def migrate_volumes(ctx, flow, ids):
 
 
 def migrate_images(ctx, flow, ids):
-    for image in ctx.src_cloud.glance.images.list():
+    ids = set(ids)
+    for image in ctx.inventory.images:
         if image.id in ids:
             image_flow = image_tasks.migrate_image(
                 ctx, image.id)
@@ -208,8 +217,8 @@ def migrate_projects(ctx, flow, ids):
 
 
 def migrate_servers(ctx, flow, ids):
-    for server in ctx.src_cloud.nova.servers.list(
-            search_opts={'all_tenants': 1}):
+    ids = set(ids)
+    for server in ctx.inventory.servers:
         if server.id in ids:
             resources, server_flow = server_tasks.migrate_server(ctx,
                                                                  server.id)
@@ -222,14 +231,14 @@ def get_resources(conf, client):
     return {"resources": list(handlers.cloud_resources(conf, client))}
 
 
-def get_ids_by_tenant(cloud, resource_type, tenant_id):
+def get_ids_by_tenant(inventory, resource_type, tenant_id):
 
     '''This function implements migration strategy 'tenant'
 
     For those types of resources that support grouping by tenant, this function
     returns a list of IDs of resources owned by the given tenant.
 
-    :param cloud:           a collection of clients to talk to cloud services
+    :param inventory:       a snapshot of resources of the cloud
     :param resource_type:   a type of resources designated for migration
     :param tenant_id:       an identifier of tenant that resources belong to
     :returns:               a list of IDs of resources according to passed
@@ -238,25 +247,22 @@ def get_ids_by_tenant(cloud, resource_type, tenant_id):
 
     ids = []
     if resource_type == 'users':
+        # NOTE: members of the tenant are not indexed by the inventory.
         ids = [user.id for user in
-               cloud.keystone.users.list(tenant_id=tenant_id)]
-    elif resource_type == 'images':
-        ids = [image.id for image in
-               cloud.glance.images.list(filters={'owner': tenant_id})]
-    elif resource_type == 'servers':
-        ids = [server.id for server in
-               cloud.nova.servers.list(search_opts={'all_tenants': 1,
-                                                    'tenant': tenant_id})]
+               inventory.cloud.keystone.users.list(tenant_id=tenant_id)]
+    elif resource_type in ('images', 'servers'):
+        ids = [resource.id for resource in
+               inventory.find(resource_type, 'tenant', tenant_id)]
     else:
         LOG.warn("Cannot group %s by tenant", resource_type)
     return ids
 
 
-def get_ids_by_host(cloud, resource_type, hostname):
+def get_ids_by_host(inventory, resource_type, hostname):
 
     '''Selects servers for migration based on hostname of hypervisor
 
-    :param cloud:           a collection of clients to talk to cloud services
+    :param inventory:       a snapshot of resources of the cloud
     :param resource_type:   a type of resources designated for migration
     :param hostname:        a name of physical servers that hosts resources
     '''
@@ -264,40 +270,31 @@ def get_ids_by_host(cloud, resource_type, hostname):
     ids = []
     if resource_type == 'servers':
         ids = [server.id for server in
-               cloud.nova.servers.list(
-                   search_opts={'all_tenants': 1,
-                                'hypervisor_name': hostname})]
+               inventory.find('servers', 'host', hostname)]
     else:
         LOG.warn("Cannot group %s by host", resource_type)
     return ids
 
 
-def get_all_resource_ids(cloud, resource_type):
+def get_all_resource_ids(inventory, resource_type):
 
     '''This function implements migration strategy 'all'
 
     It rerurns a list of IDs of all resources of the given type in source
     cloud.
 
-    :param cloud:            a collection of clients to talk to cloud services
+    :param inventory:        a snapshot of resources of the cloud
     :param resource_type:    a type of resources designated for migration
     '''
 
     ids = []
     if resource_type == 'tenants' or resource_type == 'identity':
-        ids = [tenant.id for tenant in cloud.keystone.tenants.list()]
+        ids = [tenant.id for tenant in inventory.tenants]
     elif resource_type == 'roles':
-        ids = [role.id for role in cloud.keystone.roles.list()]
-    elif resource_type == 'users':
-        ids = [user.id for user in
-               cloud.keystone.users.list()]
-    elif resource_type == 'images':
-        ids = [image.id for image in cloud.glance.images.list()]
-    elif resource_type == 'servers':
-        ids = [server.id for server in
-               cloud.nova.servers.list(search_opts={'all-tenants': 1})]
-    elif resource_type == 'flavors':
-        ids = [flavor.id for flavor in cloud.nova.flavors.list()]
+        ids = [role.id for role in inventory.cloud.keystone.roles.list()]
+    elif resource_type in ('users', 'images', 'servers', 'flavors'):
+        ids = [resource.id for resource in
+               inventory.collection(resource_type)]
     return ids
 
 
@@ -315,9 +312,10 @@ class Events(object):
         LOG.info("Event {!r}: {}, {}".format(event, args, kwargs))
 
 
-def init_client(config, name, client_class, identity_class):
-    identity = identity_class(config["identity"]["connection"])
+def init_client(config, name, client_class, identity_class, parameters):
+    identity = identity_class(**config["identity"])
     client = client_class.from_dict(name, identity, config)
+    client.configure(parameters)
     return client
 
 
@@ -356,6 +354,12 @@ def main():
     Cloud, Identity = load_cloud_driver(is_fake=args.fake)
     clouds_config = args.config["CLOUDS"]
     plugins_config = args.config["PLUGINS"]
+    parameters = dict(plugins_config, **args.config.get("PARAMETERS", {}))
+    transfer.bandwidth.configure(parameters.get("transfer_bandwidth", {}))
+    mapping.registry.configure(
+        parameters.get("id_mapping_path"),
+        verify=parameters.get("id_mapping_verify", False),
+        source=clouds_config["source"]["endpoint"]["auth_url"])
     if args.action == "migrate":
         flow = graph_flow.Flow("migrate-resources")
         store = {}
@@ -363,7 +367,8 @@ def main():
         src = init_client(src_config,
                           "source",
                           Cloud,
-                          Identity)
+                          Identity,
+                          parameters)
         if args.setup:
             workloads = clouds_config["source"].get("workloads", {})
             setup(plugins_config, events, src, "source",
@@ -373,37 +378,44 @@ def main():
         dst = init_client(dst_config,
                           "destination",
                           Cloud,
-                          Identity)
+                          Identity,
+                          parameters)
         migrate_function = RESOURCES_MIGRATIONS[args.resource]
+        ctx = context.Context(parameters, src, dst)
         if args.ids:
             ids = args.ids
         elif args.tenant:
-            ids = get_ids_by_tenant(src, args.resource, args.tenant)
+            ids = get_ids_by_tenant(ctx.inventory, args.resource, args.tenant)
         elif args.host:
-            ids = get_ids_by_host(src, args.resource, args.host)
+            ids = get_ids_by_host(ctx.inventory, args.resource, args.host)
         else:
             raise exceptions.UsageError("Missing tenant ID")
-        ctx = context.Context(plugins_config, src, dst)
+        started = time.time()
         resources_flow = migrate_function(ctx, flow, ids)
+        LOG.info("Flow %s is built in %.2f seconds",
+                 resources_flow.name, time.time() - started)
         if (args.dump):
             with open(args.dump, "w") as f:
                 utils.dump_flow(resources_flow, f, True)
             return 0
 
-        flows.run_flow(resources_flow, ctx.store)
+        flows.run_flow(resources_flow, ctx.store, ctx.config,
+                       run_id=args.resume, resume=args.resume is not None)
     elif args.action == "cleanup":
         cloud_config = clouds_config[args.target]
         cloud = init_client(cloud_config,
                             args.target,
                             Cloud,
-                            Identity)
+                            Identity,
+                            parameters)
         cleanup(plugins_config, events, cloud, args.target)
     elif args.action == "setup":
         src_config = clouds_config["source"]
         src = init_client(src_config,
                           "source",
                           Cloud,
-                          Identity)
+                          Identity,
+                          parameters)
         workloads = clouds_config["source"].get("workloads", {})
         setup(plugins_config, events, src, "source",
               args.num_tenants, args.num_servers, args.num_volumes,
@@ -412,18 +424,21 @@ def main():
         src = init_client(clouds_config["source"],
                           "source",
                           Cloud,
-                          Identity)
+                          Identity,
+                          parameters)
         dst = init_client(clouds_config["destination"],
                           "destination",
                           Cloud,
-                          Identity)
-        ctx = context.Context(plugins_config, src, dst)
+                          Identity,
+                          parameters)
+        ctx = context.Context(parameters, src, dst)
         flow = evacuation_tasks.evacuate_servers(ctx, args.hostname)
         if (args.dump):
             with open(args.dump, "w") as f:
                 utils.dump_flow(flow, f, True)
             return
-        flows.run_flow(flow, ctx.store)
+        flows.run_flow(flow, ctx.store, ctx.config,
+                       run_id=args.resume, resume=args.resume is not None)
     elif args.action == "reassign":
         fuel_config = clouds_config["fuel"]["endpoint"]
         os.environ["SERVER_ADDRESS"] = fuel_config["host"]
@@ -433,31 +448,35 @@ def main():
 
         src_config = clouds_config["source"]
         dst_config = clouds_config["destination"]
-        config = dict(plugins_config, **{
+        config = dict(parameters, **{
             "source": src_config["environment"],
             "destination": dst_config["environment"],
         })
         src = init_client(src_config,
                           "source",
                           Cloud,
-                          Identity)
+                          Identity,
+                          parameters)
         dst = init_client(dst_config,
                           "destination",
                           Cloud,
-                          Identity)
+                          Identity,
+                          parameters)
         ctx = context.Context(config, src, dst)
         flow = reassignment_tasks.reassign_node(ctx, args.hostname)
         if (args.dump):
             with open(args.dump, "w") as f:
                 utils.dump_flow(flow, f, True)
             return
-        flows.run_flow(flow, ctx.store)
+        flows.run_flow(flow, ctx.store, ctx.config,
+                       run_id=args.resume, resume=args.resume is not None)
     elif args.action == "get_resources":
         client = init_client(
             clouds_config[args.target],
             args.target,
             Cloud,
             Identity,
+            parameters,
         )
         print(json.dumps(get_resources(args.config, client)))
 
@@ -14,6 +14,10 @@
 
 import logging
 
+from pumphouse import inventory
+from pumphouse import scheduler
+from pumphouse import transfer
+
 
 LOG = logging.getLogger(__name__)
 
@@ -27,3 +31,29 @@ class Context(object):
             self.store = {}
         else:
             self.store = store
+        self._inventory = None
+        self._transfer = None
+        self._volume_scheduler = None
+
+    @property
+    def inventory(self):
+        """A snapshot of resources of the source cloud shared by the run."""
+        if self._inventory is None:
+            self._inventory = inventory.CloudInventory(self.src_cloud,
+                                                       self.config)
+        return self._inventory
+
+    @property
+    def transfer(self):
+        """Settings of transfers of data between clouds in the run."""
+        if self._transfer is None:
+            self._transfer = transfer.Transfer.from_config(self.config)
+        return self._transfer
+
+    @property
+    def volume_scheduler(self):
+        """Limits of stages of migrations of volumes in the run."""
+        if self._volume_scheduler is None:
+            self._volume_scheduler = scheduler.VolumeScheduler.from_config(
+                self.config)
+        return self._volume_scheduler
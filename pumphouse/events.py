@@ -12,18 +12,42 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import logging
 
 from flask.ext import socketio
 
 
-__all__ = ("emit", "init_app", "on", "run")
+__all__ = ("emit", "init_app", "on", "run", "subscribe")
 
+LOG = logging.getLogger(__name__)
 
 sio = socketio.SocketIO()
+listeners = []
+
+
+def subscribe(listener):
+    """Call the listener for every emitted event.
+
+    The listener receives the same arguments as :func:`emit`.
+
+    :param listener: a callable
+    :returns: the listener
+    """
+    listeners.append(listener)
+    return listener
+
+
+def emit(event, *args, **kwargs):
+    for listener in listeners:
+        try:
+            listener(event, *args, **kwargs)
+        except Exception:
+            LOG.exception("Listener %r failed on event %r", listener, event)
+    return sio.emit(event, *args, **kwargs)
+
 
 # NOTE(akscram): Now we use directly SocketIO and keep their interface
 #                for events in the module.
-emit = sio.emit
 init_app = sio.init_app
 on = sio.on
 run = sio.run
@@ -72,6 +72,10 @@ class ConfigError(Error):
     pass
 
 
+class ChecksumMismatch(Error):
+    pass
+
+
 class UsageError(Error):
     pass
 
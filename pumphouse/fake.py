@@ -13,12 +13,15 @@
 # limitations under the License.
 
 import datetime
+import hashlib
 import random
+import requests
 import six
 import string
 import time
 import uuid
 
+from cinderclient import exceptions as cinder_excs
 from novaclient import exceptions as nova_excs
 from keystoneclient.openstack.common.apiclient import exceptions \
     as keystone_excs
@@ -62,7 +65,7 @@ class Resource(object):
         self.tenant_id = self._get_tenant_id(self.cloud.namespace.tenant_name)
 
     def list(self, search_opts=None, filters=None, tenant_id=None,
-             project_id=None, instance_uuid=None):
+             project_id=None, instance_uuid=None, **kwargs):
         for obj in self._iterate_values():
             self._update_status(obj)
         return self.objects.values()
@@ -275,14 +278,17 @@ class Server(NovaResource):
 
 
 class Image(Resource):
-    def data(self, id):
-        data = AttrDict(self)
-        data._resp = 'xxxxxxxxxxxxxxxxxxxxxxxxxxxxxx'
-        return data
+    # NOTE: the content of a fake image is its ID.
+    def data(self, id, do_checksum=True):
+        return iter([str(id)])
 
     def upload(self, image_id, data):
         if self.cloud.delays:
             time.sleep(random.randint(5, 15))
+        content = "".join(iter(lambda: data.read(65536), ""))
+        image = self.get(image_id)
+        image["checksum"] = hashlib.md5(content).hexdigest()
+        image["size"] = len(content)
 
     def create(self, **kwargs):
         image_uuid = uuid.uuid4()
@@ -293,8 +299,8 @@ class Image(Resource):
             "file": "/v2/images/{}/file".format(str(image_uuid)),
             "owner": self.tenant_id,
             "id": str(image_uuid),
-            "size": 13167616,
-            "checksum": image_uuid.hex,
+            "size": len(str(image_uuid)),
+            "checksum": hashlib.md5(str(image_uuid)).hexdigest(),
             "created_at": datetime.datetime.now().isoformat(),
             "schema": "/v2/schemas/image",
             "visibility": '',
@@ -306,6 +312,37 @@ class Image(Resource):
         return image
 
 
+class Task(Resource):
+    def create(self, type, input):
+        task = AttrDict(self, {
+            "id": str(uuid.uuid4()),
+            "type": type,
+            "status": "processing",
+            "input": input,
+            "result": None,
+            "message": "",
+        })
+        try:
+            response = requests.get(input["import_from"])
+            response.raise_for_status()
+        except requests.RequestException as exc:
+            task["status"] = "failure"
+            task["message"] = str(exc)
+        else:
+            image = self.cloud.glance.images.create(
+                **input["image_properties"])
+            image["checksum"] = hashlib.md5(response.content).hexdigest()
+            image["size"] = len(response.content)
+            task["status"] = "success"
+            task["result"] = {"image_id": image.id}
+        self.objects[task.id] = task
+        return task
+
+
+class Volume(Resource):
+    NotFound = cinder_excs.NotFound
+
+
 class Network(NovaResource):
     def create(self, **kwargs):
         net_uuid = uuid.uuid4()
@@ -462,8 +499,8 @@ class Service(NovaResource):
     def list(self, host=None, binary=None):
         objects = [obj
                    for obj in self.objects
-                   if (host is not None and obj.host == host and
-                       binary is not None and obj.binary == binary)]
+                   if ((host is None or obj.host == host) and
+                       (binary is None or obj.binary == binary))]
         return objects
 
     def disable(self, hostname, binary):
@@ -601,6 +638,11 @@ class Nova(BaseService):
 
 class Glance(BaseService):
     images = Collection(Image)
+    tasks = Collection(Task)
+
+
+class Cinder(BaseService):
+    volumes = Collection(Volume)
 
 
 class Keystone(BaseService):
@@ -626,6 +668,7 @@ class Cloud(object):
         self.nova = Nova(self)
         self.keystone = Keystone(self)
         self.glance = Glance(self)
+        self.cinder = Cinder(self)
         if isinstance(identity, Identity):
             self.identity = identity
         else:
@@ -633,9 +676,15 @@ class Cloud(object):
         if data is None:
             self.initialize_data()
 
+    def configure(self, parameters):
+        pass
+
     def ping(self):
         return True
 
+    def get_endpoints(self):
+        return {}
+
     def initialize_data(self):
         admin_tenant = AttrDict(self.keystone, {
             "name": self.namespace.tenant_name,
@@ -739,12 +788,15 @@ class Cloud(object):
 
 
 class Identity(object):
-    def __init__(self, connection):
+    def __init__(self, connection, **kwargs):
         pass
 
     def fetch(self, user_id):
         pass
 
+    def prefetch(self, user_ids):
+        pass
+
     def push(self):
         pass
 
@@ -12,15 +12,294 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import collections
+import contextlib
+import functools
+import logging
+import threading
+import time
+import uuid
+
 import taskflow.engines
+from taskflow import exceptions as taskflow_excs
+from taskflow.persistence import backends as p_backends
+from taskflow.persistence import logbook
+from taskflow import states
+from taskflow.types import failure
+from taskflow.types import futures
+from taskflow.utils import persistence_utils as p_utils
+from taskflow.utils import threading_utils
 
+from . import exceptions
+from . import mapping
 from . import plugin
+from . import utils
+
 
+LOG = logging.getLogger(__name__)
 
 registry = plugin.Registry()
 register = registry.register
 
+# NOTE: the number of threads of the parallel engine, the HTTP connection
+# pools of clouds are sized to serve all of them at once.
+WORKERS = threading_utils.get_optimal_thread_count()
+
+
+# NOTE: attributes of resources which tasks with limits per host are
+# grouped by.
+HOST_ATTRS = (
+    "OS-EXT-SRV-ATTR:hypervisor_hostname",
+    "os-vol-host-attr:host",
+)
+
+
+def parse_limit(limit):
+    """Parse a limit of a class of tasks.
+
+    :param limit: a number of tasks or a string like "2 per host"
+    :returns: a pair of the number and a flag of the limit per host
+    """
+    if isinstance(limit, (int, long)):
+        return limit, False
+    number, _, scope = str(limit).partition(" per ")
+    if scope not in ("", "host"):
+        raise ValueError("Unknown scope of the limit: {!r}".format(limit))
+    return int(number), bool(scope)
+
+
+def get_host(arguments):
+    for value in arguments.itervalues():
+        if isinstance(value, dict):
+            for attr in HOST_ATTRS:
+                if value.get(attr):
+                    return value[attr]
+    return None
+
+
+class LimitedExecutor(futures.ThreadPoolExecutor):
+    """Executes tasks in a pool of threads with limits by classes of tasks
+
+    A task of a class with a limit, the limit of the nearest base class
+    is used if any, is queued until a slot of the class is free, so
+    waiting tasks don't occupy threads of the pool. Limits per host are
+    counted separately by hosts of servers and volumes in arguments of
+    tasks, tasks without a known host aren't limited. A task with the
+    reserve(arguments, start) method, e.g. a task of a migration of a
+    volume, reserves resources it needs before it gets a thread and calls
+    start with a callable which frees them once they are available. Times
+    between submitting and starting of tasks, including the wait for a
+    free thread, are summed up by classes of tasks.
+
+    :param max_workers: a number of threads
+    :param limits:      a dict with limits by names of classes of tasks
+    """
+    def __init__(self, max_workers=None, limits=None):
+        super(LimitedExecutor, self).__init__(max_workers=max_workers)
+        self.limits = dict((name, parse_limit(limit))
+                           for name, limit in (limits or {}).iteritems())
+        self.lock = threading.Lock()
+        self.running = collections.defaultdict(int)
+        self.queues = collections.defaultdict(collections.deque)
+        self.waited = collections.defaultdict(float)
+        self.started = collections.defaultdict(int)
+
+    def _slot(self, task, arguments):
+        for cls in type(task).__mro__:
+            if cls.__name__ in self.limits:
+                number, per_host = self.limits[cls.__name__]
+                if not per_host:
+                    return (cls.__name__, None), number
+                host = get_host(arguments)
+                if host is None:
+                    # NOTE: unrelated tasks without known hosts must not
+                    # share one slot.
+                    return None, None
+                return (cls.__name__, host), number
+        return None, None
+
+    # NOTE: the parallel engine of taskflow 0.6.1 submits tasks with this
+    # signature, taskflow is pinned to this version in requirements.
+    def submit(self, fn, task, arguments, *args, **kwargs):
+        future = futures.Future()
+        key, limit = self._slot(task, arguments)
+        call = functools.partial(fn, task, arguments, *args, **kwargs)
+        reserve = getattr(task, "reserve", None)
+        if reserve is not None:
+            reserve = functools.partial(reserve, arguments)
+        item = (future, call, type(task).__name__, time.time(), reserve)
+        if key is not None:
+            with self.lock:
+                if self.running[key] >= limit:
+                    self.queues[key].append(item)
+                    return future
+                self.running[key] += 1
+        self._start(key, item)
+        return future
+
+    def _start(self, key, item):
+        future, call, name, submitted, reserve = item
+
+        def run():
+            with self.lock:
+                self.waited[name] += time.time() - submitted
+                self.started[name] += 1
+            return call()
+
+        def start(free=None):
+            pooled = super(LimitedExecutor, self).submit(run)
+            pooled.add_done_callback(
+                functools.partial(self._done, key, future, free))
+
+        if reserve is None:
+            start()
+        else:
+            reserve(start)
+
+    def _done(self, key, future, free, pooled):
+        if free is not None:
+            free()
+        if key is not None:
+            with self.lock:
+                queue = self.queues[key]
+                item = queue.popleft() if queue else None
+                if item is None:
+                    self.running[key] -= 1
+            if item is not None:
+                self._start(key, item)
+        exc = pooled.exception()
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(pooled.result())
+
+    def stats(self):
+        """Get queue-wait times by classes of tasks.
+
+        :returns: a dict with pairs of numbers of started tasks and total
+                  seconds they waited by names of classes of tasks
+        """
+        with self.lock:
+            return dict((name, (self.started[name], self.waited[name]))
+                        for name in self.started)
+
+
+def load_flow_detail(backend, flow, run_id, resume=False):
+    """Get the detail of the flow stored in the run.
+
+    :param backend: a persistence backend of taskflow
+    :param flow:    the flow
+    :param run_id:  an ID of the run
+    :param resume:  if it is True the run must exist, otherwise it is
+                    created
+    :returns: an instance of :class:`taskflow.persistence.logbook.FlowDetail`
+    """
+    with contextlib.closing(backend.get_connection()) as conn:
+        conn.upgrade()
+        if not resume:
+            book = logbook.LogBook(flow.name, uuid=run_id)
+            return p_utils.create_flow_detail(flow, book=book,
+                                              backend=backend)
+        try:
+            book = conn.get_logbook(run_id)
+        except taskflow_excs.NotFound:
+            raise exceptions.NotFound("Run {} is not found".format(run_id))
+    for flow_detail in book:
+        if flow_detail.name == flow.name:
+            return flow_detail
+    raise exceptions.NotFound("Flow {} is not found in run {}"
+                              .format(flow.name, run_id))
+
+
+def reset_unfinished(engine):
+    """Make the engine execute all unfinished tasks of the resumed run.
+
+    Tasks which were failed, reverted or interrupted are executed again,
+    successfully executed ones are skipped and their stored results are
+    used.
+    """
+    engine.compile()
+    engine.prepare()
+    storage = engine.storage
+    for atom in engine.compilation.execution_graph.nodes_iter():
+        if storage.get_atom_state(atom.name) != states.SUCCESS:
+            storage.reset(atom.name)
+        # NOTE: the failure made the engine intend to revert all tasks.
+        storage.set_atom_intention(atom.name, states.EXECUTE)
+
+
+def run_checkpointed(flow, store, executor, persistence, run_id,
+                     resume=False):
+    """Run the flow storing results of tasks in the persistence backend.
+
+    The run stops on the first failure of a task instead of reverting the
+    flow, so it can be resumed later without executing successful tasks
+    again.
+    """
+    backend = p_backends.fetch(dict(persistence))
+    try:
+        flow_detail = load_flow_detail(backend, flow, run_id, resume=resume)
+        engine = taskflow.engines.load(flow, store=store,
+                                       flow_detail=flow_detail,
+                                       backend=backend,
+                                       engine_conf='parallel',
+                                       executor=executor)
+        if resume:
+            reset_unfinished(engine)
+        engine.atom_notifier.register(
+            states.FAILURE, lambda state, details: engine.suspend())
+        LOG.info("Run %s of flow %s is %s", run_id, flow.name,
+                 "resumed" if resume else "started")
+        engine.run()
+        failures = engine.storage.get_failures()
+        if failures:
+            LOG.error("Run %s of flow %s is stopped, resume it by the "
+                      "--resume %s option", run_id, flow.name, run_id)
+            failure.Failure.reraise_if_any(failures.values())
+        return engine.storage.fetch_all()
+    finally:
+        backend.close()
+
+
+def run_flow(flow, store, config=None, run_id=None, resume=False):
+    """Run the flow by the parallel engine.
+
+    If the flow_persistence parameter is set, results of tasks are stored
+    in the run identified by run_id.
 
-def run_flow(flow, store):
-    result = taskflow.engines.run(flow, engine_conf='parallel', store=store)
+    :param flow:   the flow
+    :param store:  a dict with initial values of the flow
+    :param config: a dict with parameters
+    :param run_id: an ID of the run, a new one is generated if it is None
+    :param resume: if it is True the stored run is resumed
+    """
+    config = config or {}
+    persistence = config.get("flow_persistence")
+    if resume and not persistence:
+        raise exceptions.ConfigError("flow_persistence is required to "
+                                     "resume runs")
+    executor = LimitedExecutor(
+        max_workers=config.get("flow_workers", WORKERS),
+        limits=config.get("flow_task_limits"))
+    started = time.time()
+    try:
+        if persistence:
+            result = run_checkpointed(flow, store, executor, persistence,
+                                      run_id or uuid.uuid4().hex,
+                                      resume=resume)
+        else:
+            result = taskflow.engines.run(flow, engine_conf='parallel',
+                                          store=store, executor=executor)
+    finally:
+        executor.shutdown(wait=True)
+    LOG.info("Flow %s is executed in %.2f seconds",
+             flow.name, time.time() - started)
+    for name, (number, waited) in sorted(executor.stats().iteritems()):
+        LOG.info("Tasks %s: %d started, %.2f seconds waited in queue",
+                 name, number, waited)
+    LOG.info("Polling of resources: %(polls)d checks made, %(saved)d "
+             "checks saved", utils.polling_history.stats())
+    if mapping.registry.enabled:
+        LOG.info("Mapping of resources: %(hits)d found, %(misses)d missed",
+                 mapping.registry.stats())
     return result
@@ -0,0 +1,189 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import collections
+import logging
+import threading
+
+
+LOG = logging.getLogger(__name__)
+
+
+def get_attr(resource, attr):
+    if isinstance(resource, dict):
+        return resource.get(attr)
+    return getattr(resource, attr, None)
+
+
+def paginate(list_page, limit):
+    """Iterate over resources listed page by page.
+
+    The iteration stops on a page which is shorter than the limit or
+    doesn't contain new resources, the latter protects from endless
+    loops when a service ignores the marker.
+
+    :param list_page: a callable which accepts marker and limit and
+                      returns a list of resources
+    :param limit:     a maximum number of resources on a page
+    """
+    seen = set()
+    marker = None
+    while True:
+        page = list_page(marker=marker, limit=limit)
+        new = [resource for resource in page
+               if get_attr(resource, "id") not in seen]
+        for resource in new:
+            seen.add(get_attr(resource, "id"))
+            yield resource
+        if len(page) < limit or not new:
+            break
+        marker = get_attr(page[-1], "id")
+
+
+class Collection(object):
+    """Keeps resources of one type indexed by their attributes
+
+    :param resources: an iterable with resources
+    :param indexes:   a dict with names of indexes and attributes of
+                      resources which values are used as keys of them
+    """
+    def __init__(self, resources, indexes):
+        self.resources = list(resources)
+        self.by_id = {}
+        self.indexes = dict((name, collections.defaultdict(list))
+                            for name in indexes)
+        for resource in self.resources:
+            self.by_id[get_attr(resource, "id")] = resource
+            for name, attr in indexes.iteritems():
+                key = get_attr(resource, attr)
+                self.indexes[name][key].append(resource)
+
+    def __iter__(self):
+        return iter(self.resources)
+
+    def __len__(self):
+        return len(self.resources)
+
+    def get(self, resource_id):
+        return self.by_id.get(resource_id)
+
+    def find(self, index, key):
+        return self.indexes[index].get(key, [])
+
+
+class CloudInventory(object):
+    """A snapshot of resources of a cloud
+
+    Resources of every type are listed once on the first access and
+    shared between all users of the inventory during one run.
+
+    :param cloud:   an instance of :class:`pumphouse.cloud.Cloud`
+    :param plugins: a dict with plugins configuration
+    :param limit:   a maximum number of resources requested by one call
+    """
+    default_limit = 1000
+
+    indexes = {
+        "servers": {
+            "tenant": "tenant_id",
+            "host": "OS-EXT-SRV-ATTR:hypervisor_hostname",
+            "status": "status",
+        },
+        "volumes": {
+            "tenant": "os-vol-tenant-attr:tenant_id",
+            "host": "os-vol-host-attr:host",
+            "status": "status",
+        },
+        "images": {
+            "tenant": "owner",
+            "status": "status",
+        },
+        "tenants": {},
+        "users": {
+            "tenant": "tenantId",
+        },
+        "flavors": {},
+        "networks": {
+            "tenant": "tenant_id",
+            "status": "status",
+        },
+    }
+
+    def __init__(self, cloud, plugins=None, limit=None):
+        self.cloud = cloud
+        self.plugins = plugins or {}
+        self.limit = limit or self.default_limit
+        self.collections = {}
+        self.lock = threading.Lock()
+
+    def __getattr__(self, resource_type):
+        if resource_type not in self.indexes:
+            raise AttributeError(resource_type)
+        return self.collection(resource_type)
+
+    def collection(self, resource_type):
+        """Get a collection of resources loading it if needed.
+
+        :param resource_type: a type of resources, e.g. servers
+        :returns: an instance of :class:`Collection`
+        """
+        with self.lock:
+            try:
+                return self.collections[resource_type]
+            except KeyError:
+                pass
+            list_resources = getattr(self, "_list_" + resource_type)
+            collection = Collection(list_resources(),
+                                    self.indexes[resource_type])
+            LOG.info("Inventory of %s loaded for %s: %d resources",
+                     resource_type, self.cloud, len(collection))
+            self.collections[resource_type] = collection
+            return collection
+
+    def get(self, resource_type, resource_id):
+        return self.collection(resource_type).get(resource_id)
+
+    def find(self, resource_type, index, key):
+        return self.collection(resource_type).find(index, key)
+
+    def _list_servers(self):
+        def list_page(marker, limit):
+            return self.cloud.nova.servers.list(
+                search_opts={"all_tenants": 1}, marker=marker, limit=limit)
+        return paginate(list_page, self.limit)
+
+    def _list_volumes(self):
+        def list_page(marker, limit):
+            search_opts = {"all_tenants": 1, "limit": limit}
+            if marker is not None:
+                search_opts["marker"] = marker
+            return self.cloud.cinder.volumes.list(search_opts=search_opts)
+        return paginate(list_page, self.limit)
+
+    def _list_images(self):
+        return self.cloud.glance.images.list(page_size=self.limit)
+
+    def _list_tenants(self):
+        return paginate(self.cloud.keystone.tenants.list, self.limit)
+
+    def _list_users(self):
+        return paginate(self.cloud.keystone.users.list, self.limit)
+
+    def _list_flavors(self):
+        return self.cloud.nova.flavors.list(is_public=None)
+
+    def _list_networks(self):
+        if self.plugins.get("network") == "neutron":
+            return self.cloud.neutron.list_networks()["networks"]
+        return self.cloud.nova.networks.list()
@@ -0,0 +1,177 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import logging
+import sqlite3
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+class Registry(object):
+    """Keeps IDs of migrated resources by IDs of their sources
+
+    Ensure tasks remember resources which they create or find in the
+    destination cloud and look them up by ID on later runs instead of
+    listing and matching all resources of the type. The registry is
+    stored in a SQLite database and is disabled until it is configured.
+    Entries are kept apart for every pair of the source and destination
+    clouds identified by endpoints of their identity services, so the
+    database can be shared by migrations between different clouds.
+
+    In the verify mode every found resource is checked to still match the
+    source one, a stale entry is removed and the task falls back to its
+    usual search.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.conn = None
+        self.verify = False
+        self.source = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.conn is not None
+
+    @staticmethod
+    def identity(cloud):
+        return cloud.namespace.auth_url
+
+    def configure(self, path=None, verify=False, source=None):
+        """Open the database of the registry.
+
+        :param path:   a path of the SQLite database, the registry is
+                       disabled if it is None
+        :param verify: if it is True found resources are checked
+        :param source: an endpoint of the identity service of the source
+                       cloud
+        """
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+            self.verify = verify
+            self.source = source or ""
+            if path is None:
+                return
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            with self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS mapping ("
+                    "source TEXT NOT NULL, "
+                    "destination TEXT NOT NULL, "
+                    "type TEXT NOT NULL, "
+                    "source_id TEXT NOT NULL, "
+                    "destination_id TEXT NOT NULL, "
+                    "updated_at REAL NOT NULL, "
+                    "PRIMARY KEY (source, destination, type, source_id))")
+
+    def get(self, destination, resource_type, source_id):
+        """Get an ID of the resource mapped to the source one.
+
+        :param destination:   an endpoint of the identity service of the
+                              destination cloud
+        :param resource_type: a type of the resource, e.g. flavor
+        :param source_id:     an ID of the source resource
+        :returns: an ID of the resource or None
+        """
+        with self.lock:
+            if self.conn is None:
+                return None
+            row = self.conn.execute(
+                "SELECT destination_id FROM mapping "
+                "WHERE source = ? AND destination = ? AND type = ? "
+                "AND source_id = ?",
+                (self.source, destination, resource_type,
+                 source_id)).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, destination, resource_type, source_id, destination_id):
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO mapping "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.source, destination, resource_type, source_id,
+                     destination_id, time.time()))
+
+    def delete(self, destination, resource_type, source_id):
+        with self.lock:
+            if self.conn is None:
+                return
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM mapping "
+                    "WHERE source = ? AND destination = ? AND type = ? "
+                    "AND source_id = ?",
+                    (self.source, destination, resource_type, source_id))
+
+    def lookup(self, cloud, resource_type, source_id, get_resource,
+               not_found, check=None):
+        """Get the resource mapped to the source one from the cloud.
+
+        :param cloud:         an instance of :class:`pumphouse.cloud.Cloud`
+                              of the destination
+        :param resource_type: a type of the resource, e.g. flavor
+        :param source_id:     an ID of the source resource
+        :param get_resource:  a callable which gets a resource by its ID
+        :param not_found:     an exception or a tuple of exceptions raised
+                              by get_resource for missing resources
+        :param check:         a callable which returns True if the resource
+                              still matches the source one, it is called
+                              in the verify mode
+        :returns: the resource or None if it isn't mapped or is stale
+        """
+        destination = self.identity(cloud)
+        resource_id = self.get(destination, resource_type, source_id)
+        if resource_id is None:
+            self.misses += 1
+            return None
+        try:
+            resource = get_resource(resource_id)
+        except not_found:
+            resource = None
+        if resource is None or (self.verify and check is not None and
+                                not check(resource)):
+            LOG.warning("Stale mapping of %s %s to %s in %s is removed",
+                        resource_type, source_id, resource_id, cloud)
+            self.delete(destination, resource_type, source_id)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return resource
+
+    def remember(self, cloud, resource_type, source_id, destination_id):
+        """Map the source resource to the resource of the cloud.
+
+        :param cloud: an instance of :class:`pumphouse.cloud.Cloud` of the
+                      destination
+        """
+        self.set(self.identity(cloud), resource_type, source_id,
+                 destination_id)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+registry = Registry()
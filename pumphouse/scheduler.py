@@ -0,0 +1,170 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import collections
+import contextlib
+import functools
+import itertools
+import logging
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+
+class VolumeScheduler(object):
+    """Limits concurrency of stages of migrations of volumes
+
+    Every stage of a migration of a volume occupies a slot of the stage
+    and, if the stage is executed by the cinder-volume service, a slot of
+    the backend host of the volume. Waiting stages get free slots in order
+    of priorities of their servers. The server which asked for a slot
+    first, that is the one suspended first, has the highest priority, so
+    its volumes pass through all stages ahead of volumes of servers
+    suspended later and it is booted as soon as possible.
+
+    Slots are either occupied in the context of :meth:`slot`, which blocks
+    the caller while they are busy, or reserved by :meth:`reserve`, which
+    starts the caller once they are free.
+
+    :param stage_limits:  a dict with numbers of slots by names of stages:
+                          clone, upload, relay and create
+    :param backend_limit: a number of slots of every backend host
+    """
+    backend_stages = ("clone", "upload")
+    default_backend_limit = 2
+
+    def __init__(self, stage_limits=None, backend_limit=None):
+        self.stage_limits = stage_limits or {}
+        self.backend_limit = backend_limit
+        self.cond = threading.Condition()
+        self.counter = itertools.count()
+        self.priorities = {}
+        self.running = collections.defaultdict(int)
+        self.waiting = []
+        self.starters = {}
+        self.waited = collections.defaultdict(float)
+
+    def _limits(self, stage, host):
+        limits = [(("stage", stage), self.stage_limits.get(stage))]
+        if host is not None and stage in self.backend_stages:
+            limits.append((("backend", host), self.backend_limit))
+        return [(key, limit) for key, limit in limits if limit]
+
+    def _is_free(self, limits):
+        return all(self.running[key] < limit for key, limit in limits)
+
+    def _can_run(self, request):
+        priority, limits = request
+        if not self._is_free(limits):
+            return False
+        keys = set(key for key, _ in limits)
+        for other_priority, other_limits in self.waiting:
+            if other_priority >= priority:
+                continue
+            other_keys = set(key for key, _ in other_limits)
+            # NOTE: a waiter with a higher priority goes first if it waits
+            # only for slots shared with this one.
+            if keys & other_keys and self._is_free(
+                    [(key, limit) for key, limit in other_limits
+                     if key not in keys]):
+                return False
+        return True
+
+    def reserve(self, stage, server_id, host, start):
+        """Occupy a slot of the stage as soon as it is free.
+
+        The caller isn't blocked while the slot is busy, start is called
+        by the thread which frees it.
+
+        :param stage:     a name of the stage
+        :param server_id: an ID of the server which the volume belongs to
+        :param host:      a backend host of the volume
+        :param start:     a callable which is called with a callable
+                          freeing the slot once the slot is occupied
+        """
+        limits = self._limits(stage, host)
+        if not limits:
+            start(lambda: None)
+            return
+        with self.cond:
+            server_priority = self.priorities.setdefault(server_id,
+                                                         next(self.counter))
+            request = ((server_priority, next(self.counter)), limits)
+            self.waiting.append(request)
+            self.starters[request[0]] = (stage, server_id, time.time(),
+                                         start)
+            started = self._dispatch()
+        self._start(started)
+
+    def _dispatch(self):
+        started = []
+        for request in sorted(self.waiting):
+            if not self._can_run(request):
+                continue
+            priority, limits = request
+            self.waiting.remove(request)
+            for key, _ in limits:
+                self.running[key] += 1
+            stage, server_id, submitted, start = self.starters.pop(priority)
+            waited = time.time() - submitted
+            self.waited[stage] += waited
+            LOG.debug("Volume of server %s waited for the %s stage for "
+                      "%.2f seconds", server_id, stage, waited)
+            started.append((start, functools.partial(self._free, limits)))
+        return started
+
+    def _start(self, started):
+        for start, free in started:
+            start(free)
+
+    def _free(self, limits):
+        with self.cond:
+            for key, _ in limits:
+                self.running[key] -= 1
+            started = self._dispatch()
+        self._start(started)
+
+    @contextlib.contextmanager
+    def slot(self, stage, server_id, host=None):
+        """Occupy a slot of the stage while in the context.
+
+        :param stage:     a name of the stage
+        :param server_id: an ID of the server which the volume belongs to
+        :param host:      a backend host of the volume
+        """
+        frees = []
+        occupied = threading.Event()
+
+        def start(free):
+            frees.append(free)
+            occupied.set()
+
+        self.reserve(stage, server_id, host, start)
+        occupied.wait()
+        try:
+            yield
+        finally:
+            frees[0]()
+
+    def stats(self):
+        with self.cond:
+            return dict(self.waited)
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(stage_limits=config.get("volume_stage_limits"),
+                   backend_limit=config.get("volume_backend_limit",
+                                            cls.default_backend_limit))
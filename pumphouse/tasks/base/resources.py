@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import types
+import weakref
 
 from . import tasks
 
@@ -21,7 +22,9 @@ __all__ = ['Resource', 'Collection']
 
 class SelfDataAttr(object):
     def __init__(self):
-        self._instance_data = {}
+        # NOTE: the descriptor lives as long as its class, so it must not
+        # keep instances alive.
+        self._instance_data = weakref.WeakKeyDictionary()
 
     def __get__(self, instance, owner):
         assert instance is not None
@@ -48,7 +51,11 @@ class Resource(object):
             return type.__new__(mcs, name, bases, cls_vars)
 
     def __init__(self, data=None, runner=None):
+        # NOTE: unbound resources and tasks are attributes of classes and
+        # live as long as the process, so bound subresources and tasks are
+        # kept by the bound resource and are freed with its runner.
         self._resource_subres = {}
+        self._resource_tasks = {}
         self.runner = runner
         self.bound = data is not None
         self.data = data
@@ -65,7 +72,7 @@ class Resource(object):
         assert not self.bound
         assert resource.bound
         try:
-            return self._resource_subres[resource]
+            return resource._resource_subres[self]
         except KeyError:
             assert data is not None or self.data_fn is not None
         if data is None:
@@ -73,7 +80,7 @@ class Resource(object):
             if isinstance(data, types.GeneratorType):
                 data = list(data)
         res = resource.get_runner().get_resource(self, data)
-        self._resource_subres[resource] = res
+        resource._resource_subres[self] = res
         return res
 
     def get_data(self):
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import functools
+import itertools
 import logging
 import pdb
 import traceback
@@ -32,7 +33,7 @@ LOG = logging.getLogger(__name__)
 class Runner(object):
     def __init__(self, env=None):
         self.resources = {}
-        self.tasks = set()
+        self.tasks = []
         self.env = env
 
     def get_resource(self, resource, data):
@@ -56,7 +57,8 @@ class Runner(object):
             return res
 
     def add(self, task):
-        self.tasks.add(task)
+        if task not in self.tasks:
+            self.tasks.append(task)
 
     def run(self):
         print("Hey, I'm gonna run these tasks:")
@@ -110,21 +112,30 @@ class TaskflowRunner(Runner):
         id_ = _make_str_id(task.resource.get_id())
         return "_".join((type(task.resource).__name__, id_, task.name))
 
-    def convert_task(self, task):
-        name = self.get_task_name(task)
+    def convert_task(self, task, names=None):
+        if names is None:
+            names = {}
+        for t in itertools.chain((task,), task.requires, task.after):
+            if t not in names:
+                names[t] = self.get_task_name(t)
+        name = names[task]
         flow_task = TaskFlowTask(
             task,
             post_mortem=self.post_mortem,
             name=name,
             provides=name,
-            rebind=map(self.get_task_name, task.requires | task.after),
+            rebind=[names[t] for t in task.requires | task.after],
         )
         return flow_task
 
     def create_flow(self):
         flow = graph_flow.Flow("main flow")
-        for task in tasks.process_tasks(self.tasks):
-            flow.add(self.convert_task(task))
+        # NOTE: names of collections are made of IDs of all their items, so
+        # every task is named once. Every call of add copies and validates
+        # the whole graph, so all tasks are added at once.
+        names = {}
+        flow.add(*[self.convert_task(task, names)
+                   for task in tasks.process_tasks(self.tasks)])
         return flow
 
     def run(self):
@@ -23,7 +23,6 @@ class UnboundTask(object):
 
     def __init__(self, fn=None, name=None,
                  requires=[], after=[], before=[], includes=[]):
-        self._resource_task = {}
         if fn is not None and self.wrapper is not None:
             self.fn = self.wrapper(fn)
         else:
@@ -57,12 +56,12 @@ class UnboundTask(object):
     def get_for_resource(self, resource, realize=True):
         assert resource.bound
         try:
-            return self._resource_task[resource]
+            return resource._resource_tasks[self]
         except KeyError:
             if not realize:
                 return None
             task = self.realize_with(resource)
-            self._resource_task[resource] = task
+            resource._resource_tasks[self] = task
             return task
 
     def realize_with(self, resource):
@@ -107,6 +106,10 @@ class Task(object):
         self.after = set(after)
         self.before = set(before)
         self.includes = set(includes)
+        # NOTE: required and included tasks in order of their declaration
+        # to expand them in a stable order.
+        self.dependencies = tuple(collections.OrderedDict.fromkeys(
+            itertools.chain(requires, includes)))
 
     def __repr__(self):
         requires = ''
@@ -126,25 +129,44 @@ class Task(object):
 _Pair = collections.namedtuple("_Pair", ["left", "right"])
 
 
-def process_tasks(tasks):
-    def get_tasks(task):
-        for req_task in itertools.chain(task.requires, task.includes):
-            for _task in get_tasks(req_task):
-                yield _task
-        yield task
+def expand_tasks(tasks):
+    """Iterate over tasks and all tasks they require or include.
+
+    Every task is yielded once after all its dependencies, shared
+    dependencies are visited once however many tasks depend on them.
+    The order is stable: dependencies are expanded in order of their
+    declaration.
+    """
+    visited = set()
+    for root in tasks:
+        if root in visited:
+            continue
+        visited.add(root)
+        stack = [(root, iter(root.dependencies))]
+        while stack:
+            task, dependencies = stack[-1]
+            for dependency in dependencies:
+                if dependency not in visited:
+                    visited.add(dependency)
+                    stack.append((dependency,
+                                  iter(dependency.dependencies)))
+                    break
+            else:
+                stack.pop()
+                yield task
+
 
+def process_tasks(tasks):
     def before_after(task1, task2):
         task1.before.add(task2)
         task2.after.add(task1)
-    all_tasks = {}
-    for task in tasks:
-        for _task in get_tasks(task):
-            if _task not in all_tasks:
-                fn, name, resource = _task.fn, _task.name, _task.resource
-                left_task = right_task = Task(fn, name, resource)
-                if _task.includes:
-                    right_task = Task(None, name + "__post", resource)
-                all_tasks[_task] = _Pair(left_task, right_task)
+    all_tasks = collections.OrderedDict()
+    for _task in expand_tasks(tasks):
+        fn, name, resource = _task.fn, _task.name, _task.resource
+        left_task = right_task = Task(fn, name, resource)
+        if _task.includes:
+            right_task = Task(None, name + "__post", resource)
+        all_tasks[_task] = _Pair(left_task, right_task)
     for old_task, (left_task, right_task) in all_tasks.iteritems():
         left_task.requires = set(all_tasks[task].right
                                  for task in old_task.requires)
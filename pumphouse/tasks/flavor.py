@@ -18,6 +18,7 @@ from taskflow.patterns import linear_flow
 
 from pumphouse import exceptions
 from pumphouse import events
+from pumphouse import mapping
 from pumphouse import task
 
 
@@ -32,11 +33,22 @@ class RetrieveFlavor(task.BaseCloudTask):
 
 class EnsureFlavor(task.BaseCloudTask):
     def execute(self, flavor_info):
+        flavor = mapping.registry.lookup(
+            self.cloud, "flavor", flavor_info["id"],
+            self.cloud.nova.flavors.get, exceptions.nova_excs.NotFound,
+            check=lambda flavor: flavor.name == flavor_info["name"])
+        if flavor is not None:
+            return self.verify(flavor.to_dict(), flavor_info)
         flavors = self.cloud.nova.flavors.list()
         for flavor in flavors:
             if flavor.name == flavor_info["name"]:
-                return self.verify(flavor.to_dict(), flavor_info)
+                flavor = self.verify(flavor.to_dict(), flavor_info)
+                mapping.registry.remember(self.cloud, "flavor",
+                                          flavor_info["id"], flavor["id"])
+                return flavor
         flavor = self.create_flavor(flavor_info)
+        mapping.registry.remember(self.cloud, "flavor", flavor_info["id"],
+                                  flavor.id)
         return flavor.to_dict()
 
     def verify(self, flavor, flavor_info):
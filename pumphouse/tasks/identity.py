@@ -33,6 +33,7 @@ class RepairUsersPasswords(task.BaseCloudsTask):
 
         mapping = dict((source.split("-", 2)[1], user_info["id"])
                        for source, user_info in users_infos.iteritems())
+        self.src_cloud.identity.prefetch(mapping)
         self.dst_cloud.identity.update(with_mapping(self.src_cloud.identity))
         self.dst_cloud.identity.push()
 
@@ -12,36 +12,55 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import functools
 import itertools
 import logging
+import operator
+import urlparse
 
 from taskflow.patterns import graph_flow
 
 from pumphouse import task
 from pumphouse import events
 from pumphouse import exceptions
+from pumphouse import mapping
+from pumphouse import plugin
+from pumphouse import transfer as p_transfer
+from pumphouse import utils
 from pumphouse.tasks import utils as task_utils
 
 
 LOG = logging.getLogger(__name__)
 
+image_transfer = plugin.Plugin("image_transfer", default="relay")
+
 
 class LogReporter(task_utils.UploadReporter):
     def report(self, absolute):
         cloud_name, src_image, dst_image = self.context
-        LOG.info("Image %r uploaded on %3.2f%%",
-                 dst_image["id"], absolute * 100)
+        throughput = self.throughput()
+        LOG.info("Image %r uploaded on %3.2f%% at %d bytes/s",
+                 dst_image["id"], absolute * 100, throughput)
         events.emit("update", {
             "id": dst_image["id"],
             "type": "image",
             "cloud": cloud_name,
             "action": None,
             "progress": round(absolute * 100),
+            "throughput": int(throughput),
             "data": dict(dst_image),
         }, namespace="/events")
 
 
 class EnsureImage(task.BaseCloudsTask):
+    # NOTE: shared images are looked up and recorded in the image index.
+    shared = True
+
+    def __init__(self, src_cloud, dst_cloud, *args, **kwargs):
+        self.transfer = kwargs.pop("transfer", None) or p_transfer.Transfer()
+        super(EnsureImage, self).__init__(src_cloud, dst_cloud,
+                                          *args, **kwargs)
+
     def execute(self, image_id, tenant_info, kernel_info, ramdisk_info):
         if tenant_info:
             tenant = self.dst_cloud.keystone.tenants.get(tenant_info["id"])
@@ -49,44 +68,53 @@ class EnsureImage(task.BaseCloudsTask):
         else:
             dst_cloud = self.dst_cloud
         image_info = self.src_cloud.glance.images.get(image_id)
-        images = self.dst_cloud.glance.images.list(filters={
-            # FIXME(akscram): Not all images have the checksum property.
-            "checksum": image_info["checksum"],
-            "name": image_info["name"],
-        })
-        try:
-            # XXX(akscram): More then one images can be here. Now we
-            #               just ignore this fact.
-            image = next(iter(images))
-        except StopIteration:
-            parameters = {
-                "disk_format": image_info["disk_format"],
-                "container_format": image_info["container_format"],
-                "visibility": image_info["visibility"],
-                "min_ram": image_info["min_ram"],
-                "min_disk": image_info["min_disk"],
-                "name": image_info["name"],
-                "protected": image_info["protected"],
-            }
-            if kernel_info:
-                parameters["kernel_id"] = kernel_info["id"]
-            if ramdisk_info:
-                parameters["ramdisk_id"] = ramdisk_info["id"]
-            # TODO(akscram): Some image can contain additional
-            #                parameters which are skipped now.
-            image = dst_cloud.glance.images.create(**parameters)
-            self.created_event(image)
-
-            data = self.src_cloud.glance.images.data(image_info["id"])
-            img_data = task_utils.FileProxy(data, image_info["size"],
-                                            LogReporter((dst_cloud.name,
-                                                         image_info,
-                                                         image)))
-            dst_cloud.glance.images.upload(image["id"], img_data)
-            image = dst_cloud.glance.images.get(image["id"])
-            self.uploaded_event(image)
+        image = mapping.registry.lookup(
+            self.dst_cloud, "image", image_id,
+            self.dst_cloud.glance.images.get,
+            exceptions.glance_excs.HTTPNotFound,
+            check=lambda image: (image["status"] == "active" and
+                                 image["checksum"] == image_info["checksum"]))
+        if image is not None:
+            return dict(image)
+        upload = functools.partial(self.upload, dst_cloud, image_info,
+                                   kernel_info, ramdisk_info)
+        if self.shared:
+            image = self.transfer.images.ensure(
+                self.dst_cloud, image_info, upload,
+                owner=tenant_info["id"] if tenant_info else None)
+        else:
+            image = upload()
+        mapping.registry.remember(self.dst_cloud, "image", image_id,
+                                  image["id"])
         return dict(image)
 
+    def upload(self, dst_cloud, image_info, kernel_info, ramdisk_info):
+        parameters = {
+            "disk_format": image_info["disk_format"],
+            "container_format": image_info["container_format"],
+            "visibility": image_info["visibility"],
+            "min_ram": image_info["min_ram"],
+            "min_disk": image_info["min_disk"],
+            "name": image_info["name"],
+            "protected": image_info["protected"],
+        }
+        if kernel_info:
+            parameters["kernel_id"] = kernel_info["id"]
+        if ramdisk_info:
+            parameters["ramdisk_id"] = ramdisk_info["id"]
+        # TODO(akscram): Some image can contain additional
+        #                parameters which are skipped now.
+        import_image = image_transfer.select_from_config(
+            self.transfer.plugins)
+        return import_image(self, dst_cloud, image_info, parameters)
+
+    def wait_active(self, dst_cloud, image_id):
+        return utils.wait_for(image_id, dst_cloud.glance.images.get,
+                              attribute_getter=operator.itemgetter("status"),
+                              value="active", error_value="killed",
+                              profile="image.upload",
+                              history_key=dst_cloud.name)
+
     def created_event(self, image):
         LOG.info("Image created: %s", image["id"])
         events.emit("create", {
@@ -109,6 +137,106 @@ class EnsureImage(task.BaseCloudsTask):
         }, namespace="/events")
 
 
+def fetch_image_range(cloud, image_id, start, end):
+    resp, body = cloud.glance.images.http_client.get(
+        "/v2/images/{}/file".format(image_id),
+        headers={"Range": "bytes={}-{}".format(start, end)})
+    return resp.status_code == 206, body
+
+
+def download_image(cloud, image_info):
+    """Get an iterator over data of the image.
+
+    Large images are downloaded by concurrent requests of ranges if the
+    cloud is configured to use more than one stream.
+    """
+    http = getattr(cloud, "http", None)
+    if (http is not None and http.download_streams > 1 and
+            image_info["size"] > http.range_size):
+        return iter(p_transfer.RangedDownload(
+            functools.partial(fetch_image_range, cloud, image_info["id"]),
+            image_info["size"], http.download_streams, http.range_size))
+    # NOTE: the checksum is verified by the relay itself.
+    return cloud.glance.images.data(image_info["id"], do_checksum=False)
+
+
+@image_transfer.add("relay")
+def relay_image(task, dst_cloud, image_info, parameters):
+    """Create the image and relay its data through this host."""
+    image = dst_cloud.glance.images.create(**parameters)
+    task.created_event(image)
+
+    data = download_image(task.src_cloud, image_info)
+    image, digests = task.transfer.relay(
+        data, image_info["size"],
+        LogReporter((dst_cloud.name, image_info, image)),
+        lambda img_data: dst_cloud.glance.images.upload(image["id"],
+                                                        img_data),
+        lambda: task.wait_active(dst_cloud, image["id"]),
+        route="{}:{}".format(task.src_cloud.name, task.dst_cloud.name),
+        checksum=image_info.get("checksum"))
+    p_transfer.verify_checksum(digests, image.get("checksum"),
+                               "image {}".format(image["id"]))
+    task.uploaded_event(image)
+    return dict(image, digests=digests)
+
+
+def get_location(image_info, schemes):
+    """Get a URL of the data of the image with one of the schemes.
+
+    :param image_info: a dict with attributes of the source image
+    :param schemes:    a list of allowed schemes of URLs
+    :returns: the URL or None
+    """
+    urls = [location["url"] for location in image_info.get("locations", ())]
+    if image_info.get("direct_url"):
+        urls.append(image_info["direct_url"])
+    for url in urls:
+        if urlparse.urlparse(url).scheme in schemes:
+            return url
+    return None
+
+
+@image_transfer.add("location")
+def import_image(task, dst_cloud, image_info, parameters):
+    """Import the image by the destination from its location.
+
+    The destination cloud copies the data from a location of the source
+    image by the import task of Glance. The data is relayed if the source
+    image has no location with an allowed scheme or the import fails.
+    """
+    url = get_location(image_info, task.transfer.location_schemes)
+    if url is None:
+        LOG.info("Image %s has no usable location, relaying it",
+                 image_info["id"])
+        return relay_image(task, dst_cloud, image_info, parameters)
+    import_task = dst_cloud.glance.tasks.create(type="import", input={
+        "import_from": url,
+        "import_from_format": image_info["disk_format"],
+        "image_properties": parameters,
+    })
+    try:
+        import_task = utils.wait_for(import_task["id"],
+                                     dst_cloud.glance.tasks.get,
+                                     attribute_getter=operator.itemgetter(
+                                         "status"),
+                                     value="success", error_value="failure",
+                                     profile="image.upload",
+                                     history_key=dst_cloud.name)
+    except exceptions.Error:
+        LOG.warning("Import of image %s from %s failed, relaying it",
+                    image_info["id"], url, exc_info=True)
+        return relay_image(task, dst_cloud, image_info, parameters)
+    image = task.wait_active(dst_cloud, import_task["result"]["image_id"])
+    task.created_event(image)
+    if image.get("checksum"):
+        p_transfer.verify_checksum({"md5": image["checksum"]},
+                                   image_info.get("checksum"),
+                                   "image {}".format(image["id"]))
+    task.uploaded_event(image)
+    return dict(image)
+
+
 class EnsureImageWithKernel(EnsureImage):
     def execute(self, image_id, user_info, kernel_info):
         return super(EnsureSingleImage, self).execute(image_id, user_info,
@@ -128,6 +256,10 @@ class EnsureSingleImage(EnsureImage):
 
 
 class DeleteImage(task.BaseCloudTask):
+    def __init__(self, cloud, *args, **kwargs):
+        self.transfer = kwargs.pop("transfer", None)
+        super(DeleteImage, self).__init__(cloud, *args, **kwargs)
+
     def execute(self, image_info, **requires):
         image_id = image_info["id"]
         try:
@@ -136,6 +268,8 @@ class DeleteImage(task.BaseCloudTask):
             LOG.exception("Error deleting: %s", str(image_info))
             raise exc
         else:
+            if self.transfer is not None:
+                self.transfer.images.discard(image_id)
             LOG.info("Deleted: %s", str(image_info))
             self.delete_event(image_info)
 
@@ -159,6 +293,7 @@ def migrate_image_task(context, task_class, image_id, tenant_id, *rebind):
     tenant_ensure = "tenant-{}-ensure".format(tenant_id)
     rebind = itertools.chain((image_binding, tenant_ensure), *rebind)
     task = task_class(context.src_cloud, context.dst_cloud,
+                      transfer=context.transfer,
                       name=image_ensure,
                       provides=image_ensure,
                       rebind=list(rebind))
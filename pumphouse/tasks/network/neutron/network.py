@@ -14,6 +14,9 @@
 
 import logging
 
+from neutronclient.common import exceptions as neutron_excs
+
+from pumphouse import mapping
 from pumphouse import task
 from taskflow.patterns import graph_flow
 from . import utils
@@ -45,12 +48,23 @@ class RetrieveNetworkById(task.BaseCloudTask):
 
 class EnsureNetwork(task.BaseCloudTask):
 
+    def get_network(self, network_id):
+        return self.cloud.neutron.show_network(network_id)['network']
+
     def execute(self, networks, net_info, tenant_info):
+        net = mapping.registry.lookup(
+            self.cloud, "neutron-network", net_info['id'],
+            self.get_network, neutron_excs.NotFound,
+            check=lambda net: net['name'] == net_info['name'])
+        if net is not None:
+            return net
 
         for net in networks:
             if (net['name'] == net_info['name']):
                 LOG.info("Network %s is allready exists, name: %s" %
                          (net_info['id'], net['name']))
+                mapping.registry.remember(self.cloud, "neutron-network",
+                                          net_info['id'], net['id'])
                 return net
 
         restrict_cloud = self.cloud.restrict(
@@ -65,6 +79,8 @@ class EnsureNetwork(task.BaseCloudTask):
         })
 
         LOG.info("Network %s created: %s" % (network['id'], str(network)))
+        mapping.registry.remember(self.cloud, "neutron-network",
+                                  net_info['id'], network['id'])
 
         return network
 
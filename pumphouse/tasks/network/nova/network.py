@@ -18,6 +18,7 @@ import netaddr
 from taskflow.patterns import graph_flow
 
 from pumphouse import exceptions
+from pumphouse import mapping
 from pumphouse import task
 from . import floating_ip as fip_tasks
 
@@ -60,12 +61,21 @@ class EnsureNetwork(task.BaseCloudTask):
 
     def execute(self, all_networks, network_info, tenant_info):
         network_label = network_info["label"]
+        network = mapping.registry.lookup(
+            self.cloud, "network", network_info["id"],
+            self.cloud.nova.networks.get, exceptions.nova_excs.NotFound,
+            check=lambda network: network.label == network_label)
+        if network is not None:
+            return self.verify(network.to_dict(), network_info)
         try:
             network = all_networks["by-label"][network_label]
         except KeyError:
             pass  # We'll create a new one
         else:  # Verify that existing one is a good one and return or fail
-            return self.verify(network, network_info)
+            network = self.verify(network, network_info)
+            mapping.registry.remember(self.cloud, "network",
+                                      network_info["id"], network["id"])
+            return network
         try:
             cidr = network_info['cidr']
             if isinstance(cidr, list):
@@ -78,6 +88,8 @@ class EnsureNetwork(task.BaseCloudTask):
             raise
         else:
             LOG.info("Created: %s", network.to_dict())
+            mapping.registry.remember(self.cloud, "network",
+                                      network_info["id"], network.id)
             return network.to_dict()
 
 
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import itertools
 import logging
+import time
 
+from concurrent import futures
 from taskflow.patterns import graph_flow
 
 from pumphouse.tasks import server_resources
@@ -23,17 +26,24 @@ from pumphouse.tasks import volume as volume_tasks
 from pumphouse.tasks import identity as identity_tasks
 from pumphouse.tasks import network as network_tasks
 from pumphouse.tasks import quota
+from pumphouse import flows
 from pumphouse import plugin
 
 
 LOG = logging.getLogger(__name__)
 
 network_manager = plugin.Plugin("network")
+network_discovery = plugin.Plugin("network")
 
 
-def migrate_project_servers(context, flow, tenant_id):
-    servers = context.src_cloud.nova.servers.list(
+def discover_project_servers(context, tenant_id):
+    return context.src_cloud.nova.servers.list(
         search_opts={'all_tenants': 1, 'tenant_id': tenant_id})
+
+
+def migrate_project_servers(context, flow, tenant_id, servers=None):
+    if servers is None:
+        servers = discover_project_servers(context, tenant_id)
     migrate_server = server_resources.migrate_server
     for server in servers:
         server_binding = "server-{}".format(server.id)
@@ -43,36 +53,71 @@ def migrate_project_servers(context, flow, tenant_id):
             flow.add(server_flow)
 
 
-def migrate_project_keypairs(context, flow, tenant_id):
-    tenant = context.src_cloud.keystone.tenants.get(tenant_id)
-    users = context.src_cloud.keystone.users.list(tenant_id)
-    for user in users:
-        if user.id == context.src_cloud.keystone.auth_ref.user_id:
-            continue
+def discover_project_keypairs(context, tenant_id, executor=None):
+    """Get names of keypairs of all users of the tenant.
+
+    :param executor: an executor to list keypairs of users concurrently
+    :returns: a list of pairs of ID of the user and name of the keypair
+    """
+    def list_keypairs(user):
         # XXX(akscram): Works only for users' passowrd which are equal
         #               to "default".
         cloud = context.src_cloud.restrict(username=user.name,
                                            password="default",
                                            tenant_name=tenant.name)
-        keypairs = cloud.nova.keypairs.list()
-        for keypair in keypairs:
-            keypair_tasks.migrate_keypair(context, flow, tenant_id, user.id,
-                                          keypair.name)
+        return [(user.id, keypair.name)
+                for keypair in cloud.nova.keypairs.list()]
+
+    tenant = context.src_cloud.keystone.tenants.get(tenant_id)
+    users = [user for user in context.src_cloud.keystone.users.list(tenant_id)
+             if user.id != context.src_cloud.keystone.auth_ref.user_id]
+    if executor is None:
+        keypairs = itertools.imap(list_keypairs, users)
+    else:
+        keypairs = executor.map(list_keypairs, users)
+    return list(itertools.chain.from_iterable(keypairs))
+
+
+def migrate_project_keypairs(context, flow, tenant_id, keypairs=None):
+    if keypairs is None:
+        keypairs = discover_project_keypairs(context, tenant_id)
+    for user_id, keypair_name in keypairs:
+        keypair_tasks.migrate_keypair(context, flow, tenant_id, user_id,
+                                      keypair_name)
 
 
-def migrate_project_images(context, flow, tenant_id):
-    images = context.src_cloud.glance.images.list(
-        filters={"owner": tenant_id})
-    for image in list(images):
+def discover_project_images(context, tenant_id):
+    return list(context.src_cloud.glance.images.list(
+        filters={"owner": tenant_id}))
+
+
+def migrate_project_images(context, flow, tenant_id, images=None):
+    if images is None:
+        images = discover_project_images(context, tenant_id)
+    for image in images:
         image_binding = "image-{}".format(image.id)
         if image_binding not in context.store:
             image_flow = image_tasks.migrate_image(context, image.id)
             flow.add(image_flow)
 
 
-def migrate_project_volumes(context, flow, tenant_id):
-    volumes = context.src_cloud.cinder.volumes.list(
-        search_opts={"all_tenants": 1})
+def discover_project_volumes(context, tenant_id):
+    """Get volumes of the tenant.
+
+    Volumes are filtered by the Cinder API if the volumes_tenant_filter
+    parameter is enabled. Otherwise they are taken from the inventory
+    of the source cloud, which lists all volumes only once for all
+    projects.
+    """
+    if context.config.get("volumes_tenant_filter", False):
+        return context.src_cloud.cinder.volumes.list(
+            search_opts={"all_tenants": 1, "project_id": tenant_id})
+    return context.inventory.find("volumes", "tenant", tenant_id)
+
+
+def migrate_project_volumes(context, flow, tenant_id, volumes=None):
+    if volumes is None:
+        volumes = discover_project_volumes(context, tenant_id)
     for volume in volumes:
         volume_tenant_id = getattr(volume, "os-vol-tenant-attr:tenant_id")
         volume_binding = "volume-{}".format(volume.id)
@@ -84,33 +129,56 @@ def migrate_project_volumes(context, flow, tenant_id):
             flow.add(volume_flow)
 
 
-def migrate_project_quota(context, flow, tenant_id):
-    endpoints = context.src_cloud.keystone.service_catalog.get_endpoints()
-    services = endpoints.keys()
+def discover_project_quota(context, tenant_id):
+    endpoints = context.src_cloud.get_endpoints()
+    return [service for service in endpoints.keys()
+            if service in quota.SERVICES]
+
+
+def migrate_project_quota(context, flow, tenant_id, services=None):
+    if services is None:
+        services = discover_project_quota(context, tenant_id)
     for service in services:
-        if service in quota.SERVICES:
-            flow.add(quota.migrate_tenant_quota(context, service, tenant_id))
+        flow.add(quota.migrate_tenant_quota(context, service, tenant_id))
     return flow
 
 
+@network_discovery.add("nova")
+def discover_nova_networks(context, tenant_id):
+    return [network for network in context.src_cloud.nova.networks.list()
+            if network.project_id == tenant_id]
+
+
 @network_manager.add("nova")
-def migrate_nova_networks(context, flow, tenant_id):
-    networks = context.src_cloud.nova.networks.list()
+def migrate_nova_networks(context, flow, tenant_id, networks=None):
+    if networks is None:
+        networks = discover_nova_networks(context, tenant_id)
     for network in networks:
         network_binding = "network-{}".format(network.id)
-        if network_binding not in context.store and \
-                network.project_id == tenant_id:
+        if network_binding not in context.store:
             net_flow, _ = network_tasks.nova.network.migrate_network(
                 context, network.id, network.label, tenant_id)
             flow.add(net_flow)
     return flow
 
 
-@network_manager.add("neutron")
-def migrate_neutron_networks(context, flow, tenant_id):
+@network_discovery.add("neutron")
+def discover_neutron_networks(context, tenant_id):
+    """Get networks of the tenant with their subnets.
+
+    :returns: a list of pairs of a network and a list of its subnets
+    """
     networks = context.src_cloud.neutron.list_networks(
         tenant_id=tenant_id)["networks"]
-    for network in networks:
+    return [(network, context.src_cloud.neutron.list_subnets(
+        network_id=network["id"])["subnets"]) for network in networks]
+
+
+@network_manager.add("neutron")
+def migrate_neutron_networks(context, flow, tenant_id, networks=None):
+    if networks is None:
+        networks = discover_neutron_networks(context, tenant_id)
+    for network, subnets in networks:
         network_id = network["id"]
         network_binding = network_id
         tenant_ensure = "tenant-{}-ensure".format(tenant_id)
@@ -120,13 +188,12 @@ def migrate_neutron_networks(context, flow, tenant_id):
             flow.add(net_flow)
             _migrate_project_subnets(context, flow,
                                      network_id,
-                                     tenant_id)
+                                     tenant_id,
+                                     subnets)
     return flow
 
 
-def _migrate_project_subnets(context, flow, network_id, tenant_id):
-    subnets = context.src_cloud.neutron.list_subnets(
-        network_id=network_id)["subnets"]
+def _migrate_project_subnets(context, flow, network_id, tenant_id, subnets):
     for subnet in subnets:
         subnet_id = subnet["id"]
         subnet_binding = subnet_id
@@ -140,15 +207,47 @@ def _migrate_project_subnets(context, flow, network_id, tenant_id):
 
 
 def migrate_project(context, project_id):
-    flow = graph_flow.Flow("migrate-project-{}".format(project_id))
-    _, identity_flow = identity_tasks.migrate_identity(context, project_id)
-    flow.add(identity_flow)
-    migrate_project_servers(context, flow, project_id)
-    migrate_project_keypairs(context, flow, project_id)
-    migrate_project_images(context, flow, project_id)
-    migrate_project_volumes(context, flow, project_id)
-    migrate_project_quota(context, flow, project_id)
+    """Build a flow which migrates the project with all its resources.
+
+    Resources of the project are discovered concurrently on a pool of
+    threads, then the flow is assembled from them in the same order.
+
+    :param context: an instance of :class:`pumphouse.context.Context`
+    :param project_id: an ID of the project in the source cloud
+    :returns: a flow
+    """
+    started = time.time()
+    workers = context.config.get("discovery_workers", flows.WORKERS)
+    discover_project_networks = network_discovery.select_from_config(
+        context.config)
     migrate_project_networks = network_manager.select_from_config(
         context.config)
-    migrate_project_networks(context, flow, project_id)
+    flow = graph_flow.Flow("migrate-project-{}".format(project_id))
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        discovered = [
+            executor.submit(discover, context, project_id)
+            for discover in (discover_project_servers,
+                             discover_project_images,
+                             discover_project_volumes,
+                             discover_project_quota,
+                             discover_project_networks)
+        ]
+        _, identity_flow = identity_tasks.migrate_identity(context,
+                                                           project_id)
+        keypairs = discover_project_keypairs(context, project_id,
+                                             executor=executor)
+        servers, images, volumes, services, networks = [
+            future.result() for future in discovered]
+    discovered_at = time.time()
+    LOG.info("Resources of project %s are discovered in %.2f seconds",
+             project_id, discovered_at - started)
+    flow.add(identity_flow)
+    migrate_project_servers(context, flow, project_id, servers)
+    migrate_project_keypairs(context, flow, project_id, keypairs)
+    migrate_project_images(context, flow, project_id, images)
+    migrate_project_volumes(context, flow, project_id, volumes)
+    migrate_project_quota(context, flow, project_id, services)
+    migrate_project_networks(context, flow, project_id, networks)
+    LOG.info("Flow for project %s is built in %.2f seconds after the "
+             "discovery", project_id, time.time() - discovered_at)
     return flow
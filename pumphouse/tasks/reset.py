@@ -31,6 +31,7 @@ from pumphouse import events
 from pumphouse import exceptions
 from pumphouse.tasks import base
 from pumphouse import utils
+from pumphouse import watcher
 
 LOG = logging.getLogger(__name__)
 
@@ -865,8 +866,11 @@ class Volume(EventResource):
             self.data["size"],
             display_name=self.data["display_name"],
         )
-        volume = utils.wait_for(volume.id, self.env.cloud.cinder.volumes.get,
-                                value="available")
+        volume = utils.wait_for(volume.id,
+                                watcher.watch(self.env.cloud, "volumes").get,
+                                value="available",
+                                profile="volume.create",
+                                history_key=self.env.cloud.name)
         self.data = dict(volume._info,
                          **make_kwargs(
                              server=self.data.get("server"),
@@ -879,8 +883,11 @@ class Volume(EventResource):
             self.env.cloud.nova.volumes.create_server_volume(
                 self.data["server"]["id"], self.data["id"], device)
             volume = utils.wait_for(self.data["id"],
-                                    self.env.cloud.cinder.volumes.get,
-                                    value="in-use")
+                                    watcher.watch(self.env.cloud,
+                                                  "volumes").get,
+                                    value="in-use",
+                                    profile="volume.attach",
+                                    history_key=self.env.cloud.name)
             self.data = volume._info
 
     @task
@@ -891,8 +898,11 @@ class Volume(EventResource):
                                                              self.data["id"])
         if self.data["attachments"]:
             volume = utils.wait_for(self.data["id"],
-                                    self.env.cloud.cinder.volumes.get,
-                                    value="available")
+                                    watcher.watch(self.env.cloud,
+                                                  "volumes").get,
+                                    value="available",
+                                    profile="volume.detach",
+                                    history_key=self.env.cloud.name)
             self.data = volume._info
 
     @task(before=[create], requires=[detach])
@@ -989,7 +999,9 @@ class Server(EventResource):
 
         do_get = _do_get(server.id)
         next(do_get)
-        server = utils.wait_for(server.id, do_get.send, value="ACTIVE")
+        server = utils.wait_for(server.id, do_get.send, value="ACTIVE",
+                                profile="server.boot",
+                                history_key=self.env.cloud.name)
         server = server.to_dict()
         for floating_ip in self.floating_ips:
             floating_ip["server"] = server
@@ -1002,8 +1014,11 @@ class Server(EventResource):
           includes=[nics.each().delete])
     def delete(self):
         self.env.cloud.nova.servers.delete(self.data["id"])
-        utils.wait_for(self.data["id"], self.env.cloud.nova.servers.get,
-                       stop_excs=(nova_excs.NotFound,))
+        utils.wait_for(self.data["id"],
+                       watcher.watch(self.env.cloud, "servers").get,
+                       stop_excs=(nova_excs.NotFound,),
+                       profile="server.delete",
+                       history_key=self.env.cloud.name)
         self.post_event("delete")
 
 
@@ -19,6 +19,7 @@ from taskflow.patterns import linear_flow
 from pumphouse import task
 from pumphouse import events
 from pumphouse import exceptions
+from pumphouse import mapping
 
 
 LOG = logging.getLogger(__name__)
@@ -37,6 +38,18 @@ class EnsureSecGroup(task.BaseCloudTask):
         cloud = self.cloud.restrict(tenant_name=tenant_info["name"],
                                     username=user_info["name"],
                                     password="default")
+        secgroup = mapping.registry.lookup(
+            cloud, "secgroup", secgroup_info["id"],
+            cloud.nova.security_groups.get, exceptions.nova_excs.NotFound,
+            check=lambda secgroup: secgroup.name == secgroup_info["name"])
+        if secgroup is None:
+            secgroup = self.find_or_create(cloud, secgroup_info)
+            mapping.registry.remember(cloud, "secgroup", secgroup_info["id"],
+                                      secgroup.id)
+        secgroup = self._add_rules(secgroup.id, secgroup_info)
+        return secgroup.to_dict()
+
+    def find_or_create(self, cloud, secgroup_info):
         try:
             secgroup = cloud.nova.security_groups.find(
                 name=secgroup_info["name"])
@@ -47,8 +60,7 @@ class EnsureSecGroup(task.BaseCloudTask):
             self.created_event(secgroup.to_dict())
         else:
             LOG.warn("Already exists: %s", secgroup.to_dict())
-        secgroup = self._add_rules(secgroup.id, secgroup_info)
-        return secgroup.to_dict()
+        return secgroup
 
     def created_event(self, secgroup_info):
         events.emit("create", {
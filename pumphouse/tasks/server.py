@@ -28,6 +28,7 @@ from pumphouse.tasks import snapshot as snapshot_tasks
 from pumphouse.tasks import volume as volume_tasks
 from pumphouse.tasks import utils as task_utils
 from pumphouse import utils
+from pumphouse import watcher
 from pumphouse import plugin
 
 
@@ -58,7 +59,10 @@ class EvacuateServer(task.BaseCloudTask):
                                              self.disk_over_commit)
         server = self.cloud.nova.servers.get(server_id)
         self.evacuation_event(server.to_dict())
-        server = utils.wait_for(server.id, self.cloud.nova.servers.get)
+        server = utils.wait_for(server.id,
+                                watcher.watch(self.cloud, "servers").get,
+                                profile="server.evacuate",
+                                history_key=self.cloud.name)
         migrated_server_info = server.to_dict()
         self.evacuation_event(migrated_server_info)
         return migrated_server_info
@@ -119,8 +123,11 @@ class RetrieveServer(task.BaseCloudTask):
 class SuspendServer(task.BaseCloudTask):
     def execute(self, server_info):
         self.cloud.nova.servers.suspend(server_info["id"])
-        server = utils.wait_for(server_info["id"], self.cloud.nova.servers.get,
-                                value="SUSPENDED")
+        server = utils.wait_for(server_info["id"],
+                                watcher.watch(self.cloud, "servers").get,
+                                value="SUSPENDED",
+                                profile="server.suspend",
+                                history_key=self.cloud.name)
         suspend_server_info = server.to_dict()
         self.suspend_event(suspend_server_info)
         return suspend_server_info
@@ -136,8 +143,11 @@ class SuspendServer(task.BaseCloudTask):
 
     def revert(self, server_info, result, flow_failures):
         self.cloud.nova.servers.resume(server_info["id"])
-        server = utils.wait_for(server_info["id"], self.cloud.nova.servers.get,
-                                value="ACTIVE")
+        server = utils.wait_for(server_info["id"],
+                                watcher.watch(self.cloud, "servers").get,
+                                value="ACTIVE",
+                                profile="server.resume",
+                                history_key=self.cloud.name)
         resume_server_info = server.to_dict()
         self.resume_event(resume_server_info)
         return resume_server_info
@@ -168,14 +178,19 @@ class BootServerFromImage(task.BaseCloudTask):
             block_device_mapping=dict(server_dm),
             nics=server_nics,
             key_name=key_name)
-        server = utils.wait_for(server, self.cloud.nova.servers.get,
-                                value="ACTIVE")
+        server = utils.wait_for(server.id,
+                                watcher.watch(self.cloud, "servers").get,
+                                value="ACTIVE",
+                                profile="server.boot",
+                                history_key=self.cloud.name)
         spawn_server_info = server.to_dict()
         for volume_id in dict(server_dm).values():
             volume = self.cloud.cinder.volumes.get(volume_id)
             volume = utils.wait_for(volume.id,
-                                    self.cloud.cinder.volumes.get,
-                                    value="in-use")
+                                    watcher.watch(self.cloud, "volumes").get,
+                                    value="in-use",
+                                    profile="volume.attach",
+                                    history_key=self.cloud.name)
             self.attach_event(volume.id,
                               server.id)
         self.spawn_event(spawn_server_info)
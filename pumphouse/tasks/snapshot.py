@@ -18,6 +18,7 @@ from taskflow.patterns import linear_flow
 
 from pumphouse import task
 from pumphouse import utils
+from pumphouse import watcher
 from pumphouse import events
 from pumphouse.tasks import image as image_tasks
 
@@ -39,8 +40,10 @@ class SnapshotServer(task.BaseCloudTask):
         else:
             snapshot = self.cloud.glance.images.get(snapshot_id)
             snapshot = utils.wait_for(snapshot.id,
-                                      self.cloud.glance.images.get,
-                                      value="active")
+                                      watcher.watch(self.cloud, "images").get,
+                                      value="active",
+                                      profile="snapshot.create",
+                                      history_key=self.cloud.name)
             LOG.info("Created: %s", snapshot)
             self.created_event(snapshot)
             return snapshot.id
@@ -69,6 +72,7 @@ def migrate_snapshot(context, server):
                             rebind=[server_binding]))
     flow.add(image_tasks.EnsureSingleImage(context.src_cloud,
                                            context.dst_cloud,
+                                           transfer=context.transfer,
                                            name=snapshot_ensure,
                                            provides=snapshot_ensure,
                                            rebind=[snapshot_binding,
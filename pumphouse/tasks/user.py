@@ -18,6 +18,7 @@ from taskflow.patterns import linear_flow
 
 from pumphouse import exceptions
 from pumphouse import events
+from pumphouse import mapping
 from pumphouse import task
 
 
@@ -27,12 +28,18 @@ LOG = logging.getLogger(__name__)
 class RetrieveUser(task.BaseCloudTask):
     def execute(self, user_id):
         user = self.cloud.keystone.users.get(user_id)
-        self.cloud.identity.fetch(user.id)
         return user.to_dict()
 
 
 class EnsureUser(task.BaseCloudTask):
     def execute(self, user_info, tenant_info):
+        user = mapping.registry.lookup(
+            self.cloud, "user", user_info["id"],
+            self.cloud.keystone.users.get,
+            exceptions.keystone_excs.NotFound,
+            check=lambda user: user.name == user_info["name"])
+        if user is not None:
+            return user.to_dict()
         try:
             user = self.cloud.keystone.users.find(name=user_info["name"])
             # TODO(akscram): Current password should be replaced by temporary.
@@ -50,6 +57,8 @@ class EnsureUser(task.BaseCloudTask):
                 enabled=user_info["enabled"],
             )
             self.created_event(user)
+        mapping.registry.remember(self.cloud, "user", user_info["id"],
+                                  user.id)
         return user.to_dict()
 
     def created_event(self, user):
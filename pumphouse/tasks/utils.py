@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import logging
+import time
 
 from taskflow import task
 
@@ -40,10 +41,20 @@ class UploadReporter(object):
         self.step_size = self.size * self.period
         self.last_step = 0
         self.uploaded = 0.0
+        self.started = time.time()
 
     def set_size(self, size):
         self.size = size
         self.step_size = self.size * self.period
+        self.last_step = 0
+        self.uploaded = 0.0
+        self.started = time.time()
+
+    def throughput(self):
+        elapsed = time.time() - self.started
+        if elapsed <= 0:
+            return 0.0
+        return self.uploaded / elapsed
 
     def update(self, chunk):
         if not self.size:
@@ -56,22 +67,3 @@ class UploadReporter(object):
 
     def report(self, absolute):
         raise NotImplementedError()
-
-
-class FileProxy(object):
-    def __init__(self, data, size, reporter):
-        self.resp = data
-        self.reporter = reporter
-        self.reporter.set_size(size)
-
-    def close(self):
-        self.resp.close()
-
-    def isclosed(self):
-        return self.resp.isclosed()
-
-    def read(self, amt=None):
-        data = self.resp.next()
-        if data:
-            self.reporter.update(len(data))
-        return data
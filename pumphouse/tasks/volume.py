@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and#
 # limitations under the License.
 
+import contextlib
 import logging
 
 from taskflow.patterns import graph_flow
@@ -20,7 +21,9 @@ from taskflow.task import Task
 from pumphouse import task
 from pumphouse import events
 from pumphouse import utils
+from pumphouse import watcher
 from pumphouse import exceptions
+from pumphouse import scheduler as p_scheduler
 from pumphouse.tasks import utils as utils_tasks
 from pumphouse.tasks import image as image_tasks
 
@@ -28,6 +31,49 @@ from pumphouse.tasks import image as image_tasks
 LOG = logging.getLogger(__name__)
 
 
+class Scheduled(object):
+    """Makes a task occupy a slot of its stage in a volume scheduler
+
+    If the task is run by :class:`pumphouse.flows.LimitedExecutor` the
+    slot is reserved before the task gets a worker, so tasks waiting for
+    slots don't occupy workers. Otherwise the task waits for the slot in
+    the context of :meth:`slot`.
+
+    :param scheduler: an instance of
+                      :class:`pumphouse.scheduler.VolumeScheduler`
+    :param server_id: an ID of the server which the volume belongs to
+    """
+    stage = None
+
+    def __init__(self, *args, **kwargs):
+        self.scheduler = (kwargs.pop("scheduler", None) or
+                          p_scheduler.VolumeScheduler())
+        self.server_id = kwargs.pop("server_id", None)
+        self.reserved = False
+        super(Scheduled, self).__init__(*args, **kwargs)
+
+    @staticmethod
+    def get_host(volume_info):
+        if volume_info is None:
+            return None
+        return volume_info.get("os-vol-host-attr:host")
+
+    def reserve(self, arguments, start):
+        self.reserved = True
+        self.scheduler.reserve(self.stage, self.server_id,
+                               self.get_host(arguments.get("volume_info")),
+                               start)
+
+    @contextlib.contextmanager
+    def slot(self, volume_info=None):
+        if self.reserved:
+            yield
+            return
+        with self.scheduler.slot(self.stage, self.server_id,
+                                 self.get_host(volume_info)):
+            yield
+
+
 class RetrieveVolume(task.BaseCloudTask):
 
     def execute(self, volume_id):
@@ -51,17 +97,24 @@ class CreateVolumeSnapshot(task.BaseCloudTask):
 
         snapshot = utils.wait_for(
             snapshot.id,
-            self.cloud.cinder.volume_snapshots.get,
+            watcher.watch(self.cloud, "snapshots").get,
             value='available',
             timeout=timeout,
-            error_value='error')
+            error_value='error',
+            profile="snapshot.create",
+            history_key=self.cloud.name)
 
         return snapshot._info
 
 
-class UploadVolume(task.BaseCloudTask):
+class UploadVolume(Scheduled, task.BaseCloudTask):
+    stage = "upload"
 
     def execute(self, volume_info, timeout):
+        with self.slot(volume_info):
+            return self.upload(volume_info, timeout)
+
+    def upload(self, volume_info, timeout):
         volume_id = volume_info["id"]
         try:
             resp, upload_info = self.cloud.cinder.volumes.upload_to_image(
@@ -80,9 +133,11 @@ class UploadVolume(task.BaseCloudTask):
             LOG.exception("Image not found: %s", image_id)
             raise exceptions.NotFound()
         image = utils.wait_for(image.id,
-                               self.cloud.glance.images.get,
+                               watcher.watch(self.cloud, "images").get,
                                value="active",
-                               timeout=timeout)
+                               timeout=timeout,
+                               profile="image.upload",
+                               history_key=self.cloud.name)
         self.upload_to_glance_event(dict(image))
         return image.id
 
@@ -112,9 +167,17 @@ class CreateVolumeTask(task.BaseCloudTask):
         }, namespace="/events")
 
 
-class CreateVolumeFromImage(CreateVolumeTask):
+class CreateVolumeFromImage(Scheduled, CreateVolumeTask):
+    stage = "create"
+
     def execute(self, volume_info, image_info,
                 user_info, tenant_info, timeout):
+        with self.slot():
+            return self.create(volume_info, image_info, user_info,
+                               tenant_info, timeout)
+
+    def create(self, volume_info, image_info, user_info, tenant_info,
+               timeout):
         image_id = image_info["id"]
         if user_info:
             restrict_cloud = self.cloud.restrict(
@@ -135,16 +198,24 @@ class CreateVolumeFromImage(CreateVolumeTask):
             raise exc
         else:
             volume = utils.wait_for(volume.id,
-                                    self.cloud.cinder.volumes.get,
+                                    watcher.watch(self.cloud, "volumes").get,
                                     value="available",
                                     timeout=timeout,
-                                    check_interval=3)
+                                    check_interval=3,
+                                    profile="volume.create",
+                                    history_key=self.cloud.name)
             self.create_volume_event(volume._info)
         return volume._info
 
 
-class CreateVolumeClone(CreateVolumeTask):
+class CreateVolumeClone(Scheduled, CreateVolumeTask):
+    stage = "clone"
+
     def execute(self, volume_info, timeout, **requires):
+        with self.slot(volume_info):
+            return self.clone(volume_info, timeout)
+
+    def clone(self, volume_info, timeout):
         try:
             volume = self.cloud.cinder.volumes.create(
                 volume_info["size"], source_volid=volume_info["id"])
@@ -152,9 +223,12 @@ class CreateVolumeClone(CreateVolumeTask):
             LOG.exception("Source volume not found: %s", volume_info)
             raise exc
         else:
-            volume = utils.wait_for(volume.id, self.cloud.cinder.volumes.get,
+            volume = utils.wait_for(volume.id,
+                                    watcher.watch(self.cloud, "volumes").get,
                                     value='available', timeout=timeout,
-                                    check_interval=3)
+                                    check_interval=3,
+                                    profile="volume.clone",
+                                    history_key=self.cloud.name)
             self.create_volume_event(volume._info)
         return volume._info
 
@@ -169,9 +243,12 @@ class DeleteVolume(task.BaseCloudTask):
             LOG.exception("Cannot delete: %s", str(volume._info))
             raise exc
         else:
-            volume = utils.wait_for(volume.id, self.cloud.cinder.volumes.get,
+            volume = utils.wait_for(volume.id,
+                                    watcher.watch(self.cloud, "volumes").get,
                                     stop_excs=(
-                                        exceptions.cinder_excs.NotFound,))
+                                        exceptions.cinder_excs.NotFound,),
+                                    profile="volume.delete",
+                                    history_key=self.cloud.name)
             LOG.info("Deleted: %s", str(volume_info))
             self.delete_volume_event(volume_info)
 
@@ -200,6 +277,18 @@ class DeleteSourceVolume(DeleteVolume):
             pass
 
 
+class EnsureVolumeImage(Scheduled, image_tasks.EnsureSingleImage):
+    # NOTE: transit images are uploaded every time, they are deleted after
+    # use and must not be shared with other tasks.
+    shared = False
+    stage = "relay"
+
+    def execute(self, image_id, user_info):
+        with self.slot():
+            return super(EnsureVolumeImage, self).execute(image_id,
+                                                          user_info)
+
+
 class BlockDeviceMapping(Task):
     def execute(self, volume_src, volume_dst, server_id):
         dev_mapping = volume_dst["id"]
@@ -234,12 +323,13 @@ def migrate_detached_volume(context, volume_id, user_id, tenant_id):
                           provides=volume_upload,
                           rebind=[volume_binding],
                           inject={"timeout": int(timeout)})),
-    flow.add(image_tasks.EnsureSingleImage(context.src_cloud,
-                                           context.dst_cloud,
-                                           name=image_ensure,
-                                           provides=image_ensure,
-                                           rebind=[volume_upload,
-                                                   tenant_ensure]))
+    flow.add(EnsureVolumeImage(context.src_cloud,
+                               context.dst_cloud,
+                               transfer=context.transfer,
+                               name=image_ensure,
+                               provides=image_ensure,
+                               rebind=[volume_upload,
+                                       tenant_ensure]))
     flow.add(CreateVolumeFromImage(context.dst_cloud,
                                    name=volume_ensure,
                                    provides=volume_ensure,
@@ -271,6 +361,10 @@ def migrate_attached_volume(context, server_id, volume_id,
     timeout = context.config.get("volume_tasks_timeout", 120)
     image_src_delete = "{}-img-src-delete".format(volume_binding)
     image_dst_delete = "{}-img-dst-delete".format(volume_binding)
+    scheduling = {
+        "scheduler": context.volume_scheduler,
+        "server_id": server_id,
+    }
 
     flow = graph_flow.Flow("migrate-{}".format(volume_binding))
     flow.add(RetrieveVolume(context.src_cloud,
@@ -282,18 +376,22 @@ def migrate_attached_volume(context, server_id, volume_id,
                                provides=volume_clone,
                                rebind=[volume_binding],
                                requires=[server_suspend],
-                               inject={"timeout": int(timeout)}),
+                               inject={"timeout": int(timeout)},
+                               **scheduling),
              UploadVolume(context.src_cloud,
                           name=volume_image,
                           provides=volume_image,
                           rebind=[volume_clone],
-                          inject={"timeout": int(timeout)}),
-             image_tasks.EnsureSingleImage(context.src_cloud,
-                                           context.dst_cloud,
-                                           name=image_ensure,
-                                           provides=image_ensure,
-                                           rebind=[volume_image,
-                                                   tenant_ensure]),
+                          inject={"timeout": int(timeout)},
+                          **scheduling),
+             EnsureVolumeImage(context.src_cloud,
+                               context.dst_cloud,
+                               transfer=context.transfer,
+                               name=image_ensure,
+                               provides=image_ensure,
+                               rebind=[volume_image,
+                                       tenant_ensure],
+                               **scheduling),
              CreateVolumeFromImage(context.dst_cloud,
                                    name=volume_ensure,
                                    provides=volume_ensure,
@@ -301,7 +399,8 @@ def migrate_attached_volume(context, server_id, volume_id,
                                            image_ensure,
                                            user_ensure,
                                            tenant_ensure],
-                                   inject={"timeout": int(timeout)}),
+                                   inject={"timeout": int(timeout)},
+                                   **scheduling),
              DeleteVolume(context.src_cloud,
                           name=volume_delete,
                           rebind=[volume_clone],
@@ -311,6 +410,7 @@ def migrate_attached_volume(context, server_id, volume_id,
                                          rebind=[volume_image],
                                          requires=[image_ensure]),
              image_tasks.DeleteImage(context.dst_cloud,
+                                     transfer=context.transfer,
                                      name=image_dst_delete,
                                      rebind=[image_ensure],
                                      requires=[volume_ensure]),
@@ -0,0 +1,662 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import contextlib
+import hashlib
+import itertools
+import logging
+import mmap
+import os
+import Queue
+import tempfile
+import threading
+import time
+
+from pumphouse import exceptions
+
+
+LOG = logging.getLogger(__name__)
+
+_EOF = object()
+
+
+class TokenBucket(object):
+    """Limits a rate of data passing through it
+
+    Consumers take tokens for every byte and sleep while the bucket is
+    in debt, so the rate is shared between all of them.
+
+    :param rate:  a number of bytes per second, unlimited if it is None
+    :param burst: a number of bytes which can pass at once after a pause,
+                  defaults to the rate
+    """
+    def __init__(self, rate=None, burst=None):
+        self.lock = threading.Lock()
+        self.tokens = 0
+        self.configure(rate, burst)
+
+    def configure(self, rate=None, burst=None):
+        with self.lock:
+            self.rate = rate
+            self.burst = burst or rate
+            self.tokens = min(self.tokens, self.burst or 0)
+            self.updated = time.time()
+
+    def consume(self, amount):
+        with self.lock:
+            if not self.rate:
+                return
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            delay = -self.tokens / float(self.rate)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class Bandwidth(object):
+    """Token buckets limiting transfers between pairs of clouds
+
+    Limits are set by a dict with rates in bytes per second by routes
+    in the form of "<source name>:<destination name>", e.g.
+    "source:destination".
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def bucket(self, route):
+        with self.lock:
+            try:
+                return self.buckets[route]
+            except KeyError:
+                bucket = self.buckets[route] = TokenBucket()
+                return bucket
+
+    def configure(self, limits):
+        """Set limits of routes.
+
+        :param limits: a dict with rates by routes, None removes a limit
+        """
+        for route, rate in limits.iteritems():
+            LOG.info("Bandwidth of %s is limited by %s bytes/s", route, rate)
+            self.bucket(route).configure(rate)
+
+    def limits(self):
+        with self.lock:
+            return dict((route, bucket.rate)
+                        for route, bucket in self.buckets.iteritems())
+
+
+bandwidth = Bandwidth()
+
+
+def throttle(data, bucket):
+    for chunk in data:
+        bucket.consume(len(chunk))
+        yield chunk
+
+
+class Digests(object):
+    """Computes digests of data passing through it
+
+    :param algorithms: a list of names of algorithms from :mod:`hashlib`
+    """
+    def __init__(self, algorithms):
+        self.hashes = [(name, hashlib.new(name)) for name in algorithms]
+
+    def wrap(self, data):
+        for chunk in data:
+            for _, digest in self.hashes:
+                digest.update(chunk)
+            yield chunk
+
+    def hexdigests(self):
+        return dict((name, digest.hexdigest())
+                    for name, digest in self.hashes)
+
+
+def verify_checksum(digests, expected, description):
+    """Compare the MD5 digest of data with the expected one.
+
+    :param digests:     a dict with digests by names of algorithms
+    :param expected:    the expected MD5 digest, nothing is checked if it
+                        is empty
+    :param description: a description of the data for the error message
+    :raises: :class:`pumphouse.exceptions.ChecksumMismatch`
+    """
+    if expected and digests["md5"] != expected:
+        raise exceptions.ChecksumMismatch(
+            "Checksum of {} is {}, expected {}".format(
+                description, digests["md5"], expected))
+
+
+class RangedDownload(object):
+    """Downloads data by concurrent requests of byte ranges
+
+    The data is split into parts which are downloaded by a number of
+    threads and yielded in order. Threads download ahead only within a
+    window of parts, so no more than the window of parts is kept in
+    memory. If the first range is not honored, the response to it is
+    the whole data and the download goes on by this single stream.
+
+    :param fetch_range: a callable which accepts the first and the last
+                        byte of a range and returns a pair of a flag set if
+                        the range is honored and an iterator over the data
+    :param size:        a size of the data in bytes
+    :param streams:     a number of concurrent requests
+    :param part_size:   a size of a range in bytes
+    """
+    def __init__(self, fetch_range, size, streams, part_size):
+        self.fetch_range = fetch_range
+        self.size = size
+        self.streams = streams
+        self.part_size = part_size
+        self.window = streams * 2
+        self.cond = threading.Condition()
+        self.parts = {}
+        self.next_part = 1
+        self.position = 1
+        self.aborted = False
+
+    def _range(self, index):
+        start = index * self.part_size
+        return start, min(start + self.part_size, self.size) - 1
+
+    def _download(self, count):
+        while True:
+            with self.cond:
+                index = self.next_part
+                self.next_part += 1
+                if index >= count:
+                    return
+                while (index >= self.position + self.window and
+                       not self.aborted):
+                    self.cond.wait()
+                if self.aborted:
+                    return
+            try:
+                partial, data = self.fetch_range(*self._range(index))
+                if not partial:
+                    raise exceptions.Error("Range {} is not honored"
+                                           .format(self._range(index)))
+                part = "".join(data)
+            except Exception as exc:
+                LOG.exception("Unable to download the part %d", index)
+                part = exc
+            with self.cond:
+                self.parts[index] = part
+                self.cond.notify_all()
+
+    def __iter__(self):
+        count = (self.size + self.part_size - 1) // self.part_size
+        partial, data = self.fetch_range(*self._range(0))
+        if not partial:
+            LOG.info("Ranges are not honored, the data is downloaded by a "
+                     "single stream")
+            for chunk in data:
+                yield chunk
+            return
+        workers = [threading.Thread(target=self._download, args=(count,))
+                   for _ in xrange(min(self.streams - 1, count - 1))]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        try:
+            for chunk in data:
+                yield chunk
+            for index in xrange(1, count):
+                with self.cond:
+                    while index not in self.parts:
+                        self.cond.wait()
+                    part = self.parts.pop(index)
+                    self.position = index + 1
+                    self.cond.notify_all()
+                if isinstance(part, Exception):
+                    raise part
+                yield part
+        finally:
+            with self.cond:
+                self.aborted = True
+                self.cond.notify_all()
+
+
+class Stream(object):
+    """Relays data from the source iterator to a file-like object
+
+    A reader thread pulls chunks from the source into a bounded queue of
+    reusable buffers while the consumer reads them, so downloading from
+    the source and uploading to the destination overlap.
+
+    :param data:       an iterator over chunks of the source data
+    :param size:       a size of the data in bytes
+    :param reporter:   an instance of
+                       :class:`pumphouse.tasks.utils.UploadReporter`
+    :param chunk_size: a size of every buffer in bytes
+    :param depth:      a number of buffers
+    """
+    def __init__(self, data, size, reporter, chunk_size, depth):
+        self.data = data
+        self.reporter = reporter
+        self.reporter.set_size(size)
+        self.chunk_size = chunk_size
+        self.free = Queue.Queue()
+        for _ in xrange(depth):
+            self.free.put(bytearray(chunk_size))
+        self.filled = Queue.Queue()
+        self.current = None
+        self.length = self.offset = 0
+        self.finished = False
+        self.closed = False
+        self.reader = threading.Thread(target=self._fill)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def _fill(self):
+        try:
+            buf, length = self.free.get(), 0
+            for chunk in self.data:
+                offset = 0
+                while offset < len(chunk):
+                    if self.closed:
+                        return
+                    size = min(len(chunk) - offset, self.chunk_size - length)
+                    buf[length:length + size] = chunk[offset:offset + size]
+                    offset += size
+                    length += size
+                    if length == self.chunk_size:
+                        self.filled.put((buf, length))
+                        buf, length = self.free.get(), 0
+            if length:
+                self.filled.put((buf, length))
+            self.filled.put(_EOF)
+        except Exception as exc:
+            if not self.closed:
+                LOG.exception("Unable to read the source data")
+                self.filled.put(exc)
+        finally:
+            # NOTE: the source is closed by the reader, a generator can't
+            # be closed by another thread while it is executing.
+            close = getattr(self.data, "close", None)
+            if close is not None:
+                close()
+
+    def read(self, amt=None):
+        if amt is None:
+            amt = float("inf")
+        parts = []
+        while amt > 0 and not self.finished:
+            if self.current is None:
+                item = self.filled.get()
+                if item is _EOF:
+                    self.finished = True
+                    break
+                if isinstance(item, Exception):
+                    self.finished = True
+                    raise item
+                self.current, self.length = item
+                self.offset = 0
+            size = int(min(amt, self.length - self.offset))
+            parts.append(str(self.current[self.offset:self.offset + size]))
+            self.offset += size
+            amt -= size
+            if self.offset == self.length:
+                self.free.put(self.current)
+                self.current = None
+        data = "".join(parts)
+        if data:
+            self.reporter.update(len(data))
+        return data
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # NOTE: return all buffers to unblock the reader, it stops as soon
+        # as it gets one.
+        while True:
+            try:
+                item = self.filled.get_nowait()
+            except Queue.Empty:
+                break
+            if isinstance(item, tuple):
+                self.free.put(item[0])
+        if self.current is not None:
+            self.free.put(self.current)
+            self.current = None
+
+    def isclosed(self):
+        return self.closed or self.finished
+
+
+class SpoolReader(object):
+    """Reads spooled data from a memory-mapped file
+
+    :param path:     a path to the spool file
+    :param size:     a size of the data in bytes
+    :param reporter: an instance of
+                     :class:`pumphouse.tasks.utils.UploadReporter`
+    :param bucket:   an instance of :class:`TokenBucket`
+    """
+    def __init__(self, path, size, reporter, bucket=None):
+        self.file = open(path, "rb")
+        self.size = size
+        if size:
+            self.map = mmap.mmap(self.file.fileno(), size,
+                                 access=mmap.ACCESS_READ)
+        else:
+            self.map = None
+        self.offset = 0
+        self.reporter = reporter
+        self.reporter.set_size(size)
+        self.bucket = bucket
+
+    def read(self, amt=None):
+        if self.map is None:
+            return ""
+        if amt is None:
+            amt = self.size - self.offset
+        data = self.map[self.offset:self.offset + amt]
+        self.offset += len(data)
+        if data:
+            if self.bucket is not None:
+                self.bucket.consume(len(data))
+            self.reporter.update(len(data))
+        return data
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def isclosed(self):
+        return self.file.closed
+
+
+class Spool(object):
+    """Local directories to keep copies of transferred data
+
+    A directory is chosen for the data if it has enough free space and
+    the total size of spooled data doesn't exceed the limit.
+
+    :param directories: a list of paths to directories
+    :param max_size:    a maximum total size of spooled data in bytes
+    """
+    def __init__(self, directories, max_size=None):
+        self.directories = directories
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.used = dict((directory, 0) for directory in directories)
+
+    def free_space(self, directory):
+        stat = os.statvfs(directory)
+        return stat.f_bavail * stat.f_frsize
+
+    def allocate(self, size):
+        """Choose a directory for the data.
+
+        :param size: a size of the data in bytes
+        :returns: a path to the directory or None if there is no space
+        """
+        with self.lock:
+            if (self.max_size is not None and
+                    sum(self.used.values()) + size > self.max_size):
+                return None
+            for directory in self.directories:
+                if self.free_space(directory) - self.used[directory] >= size:
+                    self.used[directory] += size
+                    return directory
+        return None
+
+    def release(self, directory, size):
+        with self.lock:
+            self.used[directory] -= size
+
+    @contextlib.contextmanager
+    def spooled(self, data, size):
+        """Write the data to a spool file which is removed on exit.
+
+        :param data: an iterator over chunks of the data
+        :param size: a size of the data in bytes
+        :returns: a path to the spool file or None if there is no space
+        """
+        directory = self.allocate(size)
+        if directory is None:
+            LOG.warning("No space to spool %d bytes", size)
+            yield None
+            return
+        try:
+            fd, path = tempfile.mkstemp(prefix="pumphouse-", suffix=".spool",
+                                        dir=directory)
+            try:
+                with os.fdopen(fd, "wb") as spool_file:
+                    for chunk in data:
+                        spool_file.write(chunk)
+                yield path
+            finally:
+                os.unlink(path)
+        finally:
+            self.release(directory, size)
+
+
+class ImageIndex(object):
+    """Active images of the destination cloud by their content
+
+    Images are keyed by their checksum, size, visibility and, if they
+    aren't public, owner. The index is loaded on the first use and
+    updated by every image uploaded through it. Only one image with the
+    same key is uploaded at a time, other callers wait for it and get
+    the uploaded image.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.images = None
+        self.pending = {}
+        self.hits = 0
+
+    @staticmethod
+    def key(image, owner):
+        if image.get("visibility") == "public":
+            owner = None
+        return (image["checksum"], image["size"], image.get("visibility"),
+                owner)
+
+    def _load(self, cloud):
+        images = {}
+        for image in cloud.glance.images.list():
+            if image.get("status") == "active" and image.get("checksum"):
+                images.setdefault(self.key(image, image.get("owner")), image)
+        self.images = images
+        LOG.info("Index of images loaded for %s: %d images",
+                 cloud, len(self.images))
+
+    def ensure(self, cloud, image_info, upload, owner=None):
+        """Get an image with the same content or upload it.
+
+        :param cloud:      an instance of :class:`pumphouse.cloud.Cloud` of
+                           the destination
+        :param image_info: a dict with attributes of the source image
+        :param upload:     a callable which uploads the image and returns
+                           the uploaded one
+        :param owner:      an ID of the tenant of the destination which
+                           owns the image
+        :returns: the image from the destination cloud
+        """
+        if not image_info.get("checksum"):
+            return upload()
+        key = self.key(image_info, owner)
+        while True:
+            with self.lock:
+                if self.images is None:
+                    self._load(cloud)
+                image = self.images.get(key)
+                if image is not None:
+                    self.hits += 1
+                    return image
+                event = self.pending.get(key)
+                if event is None:
+                    event = self.pending[key] = threading.Event()
+                    break
+            LOG.debug("Waiting for the upload of the image %s",
+                      image_info["id"])
+            event.wait()
+        try:
+            image = upload()
+            with self.lock:
+                self.images[key] = image
+        finally:
+            with self.lock:
+                del self.pending[key]
+            event.set()
+        return image
+
+    def discard(self, image_id):
+        """Remove the deleted image from the index.
+
+        :param image_id: an ID of the image in the destination cloud
+        """
+        with self.lock:
+            if self.images is None:
+                return
+            for key, image in self.images.items():
+                if image["id"] == image_id:
+                    del self.images[key]
+
+
+class Transfer(object):
+    """Settings of transfers of data between clouds
+
+    Data is relayed through a stream unless a spool is given. In that
+    case the data is written to a spool file first and failed uploads
+    are retried from it.
+
+    :param chunk_size: a size of buffers of streams in bytes
+    :param depth:      a number of buffers of every stream
+    :param spool:      an instance of :class:`Spool`
+    :param retries:    a number of retries of failed uploads from a spool
+    :param checksums:  a list of names of algorithms of digests computed
+                       in addition to MD5, e.g. sha256
+    :param plugins:    a dict with plugins configuration
+    :param location_schemes: a list of schemes of URLs of source images
+                             which can be imported by the destination
+    """
+    default_chunk_size = 64 * 1024
+    default_depth = 16
+    default_retries = 3
+    default_location_schemes = ("http", "https")
+
+    def __init__(self, chunk_size=None, depth=None, spool=None,
+                 retries=None, checksums=None, plugins=None,
+                 location_schemes=None):
+        self.chunk_size = chunk_size or self.default_chunk_size
+        self.depth = depth or self.default_depth
+        self.spool = spool
+        if retries is None:
+            retries = self.default_retries
+        self.retries = retries
+        self.checksums = ["md5"] + [name for name in checksums or ()
+                                    if name != "md5"]
+        self.plugins = plugins or {}
+        self.location_schemes = (location_schemes or
+                                 self.default_location_schemes)
+        self.images = ImageIndex()
+
+    @classmethod
+    def from_config(cls, config):
+        spool = None
+        if config.get("transfer_spool_dirs"):
+            spool = Spool(config["transfer_spool_dirs"],
+                          max_size=config.get("transfer_spool_size"))
+        return cls(chunk_size=config.get("transfer_chunk_size"),
+                   depth=config.get("transfer_buffers"),
+                   spool=spool,
+                   retries=config.get("transfer_upload_retries"),
+                   checksums=config.get("transfer_checksums"),
+                   plugins=config,
+                   location_schemes=config.get("image_location_schemes"))
+
+    def stream(self, data, size, reporter):
+        """Start relaying the data.
+
+        :param data:     an iterator over chunks of the data
+        :param size:     a size of the data in bytes
+        :param reporter: an instance of
+                         :class:`pumphouse.tasks.utils.UploadReporter`
+        :returns: an instance of :class:`Stream`
+        """
+        return Stream(data, size, reporter, self.chunk_size, self.depth)
+
+    def relay(self, data, size, reporter, upload, confirm, route=None,
+              checksum=None):
+        """Relay the data to the destination.
+
+        Digests of the data are computed on the fly and the MD5 one is
+        compared with the checksum as soon as all data is read.
+
+        :param data:     an iterator over chunks of the data
+        :param size:     a size of the data in bytes
+        :param reporter: an instance of
+                         :class:`pumphouse.tasks.utils.UploadReporter`
+        :param upload:   a callable which accepts a file-like object and
+                         uploads it to the destination
+        :param confirm:  a callable which waits for the uploaded data to be
+                         accepted by the destination, the spool file is kept
+                         until it returns
+        :param route:    a route of the data in :data:`bandwidth`
+        :param checksum: the expected MD5 digest of the data
+        :returns: a pair of the result of confirm and a dict with digests
+                  of the data by names of algorithms
+        :raises: :class:`pumphouse.exceptions.ChecksumMismatch`
+        """
+        digests = Digests(self.checksums)
+        data = digests.wrap(data)
+        bucket = None
+        if route is not None:
+            bucket = bandwidth.bucket(route)
+        if self.spool is not None:
+            # NOTE: spooled data is throttled only by its upload.
+            with self.spool.spooled(data, size) as path:
+                if path is not None:
+                    verify_checksum(digests.hexdigests(), checksum,
+                                    "spooled data")
+                    self._upload_spooled(path, size, reporter, upload,
+                                         bucket)
+                    return confirm(), digests.hexdigests()
+        if bucket is not None:
+            data = throttle(data, bucket)
+        stream = self.stream(data, size, reporter)
+        try:
+            upload(stream)
+        finally:
+            stream.close()
+        verify_checksum(digests.hexdigests(), checksum, "relayed data")
+        return confirm(), digests.hexdigests()
+
+    def _upload_spooled(self, path, size, reporter, upload, bucket):
+        for attempt in itertools.count(1):
+            reader = SpoolReader(path, size, reporter, bucket)
+            try:
+                upload(reader)
+            except Exception:
+                if attempt > self.retries:
+                    raise
+                LOG.warning("Upload of %s failed, retrying %d of %d",
+                            path, attempt, self.retries, exc_info=True)
+            else:
+                return
+            finally:
+                reader.close()
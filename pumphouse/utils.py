@@ -16,13 +16,15 @@ import itertools
 import logging
 import logging.config
 import operator
+import random
 import string
 import sys
+import threading
 import time
 import traceback
 import yaml
 import re
-from collections import defaultdict
+from collections import defaultdict, deque
 
 from requests import exceptions as req_excs
 
@@ -51,9 +53,96 @@ def load_class(import_path):
 status_attr = operator.attrgetter("status")
 
 
+class PollingProfile(object):
+    """Describes how often a resource is checked while waiting for it
+
+    :param interval:     a number of seconds before the second check
+    :param factor:       a multiplier of the interval after every check
+    :param max_interval: a maximum number of seconds between checks
+    :param jitter:       a fraction of the interval randomly added to or
+                         subtracted from it
+    """
+    def __init__(self, interval=1, factor=1.5, max_interval=30, jitter=0.1):
+        self.interval = interval
+        self.factor = factor
+        self.max_interval = max_interval
+        self.jitter = jitter
+
+    def intervals(self):
+        interval = self.interval
+        while True:
+            yield interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            interval = min(interval * self.factor, self.max_interval)
+
+
+POLLING_PROFILES = {
+    "server.boot": PollingProfile(interval=2, max_interval=15),
+    "server.evacuate": PollingProfile(interval=2, max_interval=15),
+    "server.suspend": PollingProfile(interval=1, max_interval=5),
+    "server.resume": PollingProfile(interval=1, max_interval=5),
+    "server.delete": PollingProfile(interval=1, max_interval=5),
+    "volume.create": PollingProfile(interval=2, max_interval=30),
+    "volume.clone": PollingProfile(interval=3, factor=2, max_interval=60),
+    "volume.attach": PollingProfile(interval=1, max_interval=5),
+    "volume.detach": PollingProfile(interval=1, max_interval=5),
+    "volume.delete": PollingProfile(interval=1, max_interval=10),
+    "snapshot.create": PollingProfile(interval=3, factor=2, max_interval=60),
+    "image.upload": PollingProfile(interval=3, factor=2, max_interval=60),
+}
+
+
+class PollingHistory(object):
+    """Keeps durations of waits for resources
+
+    The median of recent durations of waits with the same profile in the
+    same cloud is used to schedule the first check of a resource. The
+    history also counts checks which were saved in comparison with
+    checking every check_interval seconds.
+
+    :param size:        a number of durations kept for every profile
+    :param first_check: a fraction of the median duration to wait before
+                        the first check
+    """
+    def __init__(self, size=50, first_check=0.8):
+        self.size = size
+        self.first_check = first_check
+        self.lock = threading.Lock()
+        self.durations = defaultdict(lambda: deque(maxlen=self.size))
+        self.polls = 0
+        self.saved = 0
+
+    def first_delay(self, key):
+        with self.lock:
+            durations = sorted(self.durations.get(key, ()))
+        if not durations:
+            return 0
+        return durations[len(durations) // 2] * self.first_check
+
+    def record(self, key, duration, polls, check_interval):
+        with self.lock:
+            self.durations[key].append(duration)
+            self.polls += polls
+            self.saved += max(0, int(duration // check_interval) + 1 - polls)
+
+    def stats(self):
+        return {"polls": self.polls, "saved": self.saved}
+
+
+polling_history = PollingHistory()
+
+
 def wait_for(resource, update_resource,
              attribute_getter=status_attr, value=None, error_value=None,
-             timeout=60, check_interval=1, expect_excs=None, stop_excs=None):
+             timeout=60, check_interval=1, expect_excs=None, stop_excs=None,
+             profile=None, history_key=None):
+    """Wait for the resource to get the value of the attribute.
+
+    The resource is checked every check_interval seconds unless the name
+    of a polling profile from POLLING_PROFILES is given. With a profile
+    intervals grow exponentially and the first check is delayed by the
+    history of previous waits with the same profile and history_key,
+    e.g. the name of the cloud.
+    """
     if expect_excs:
         expect_excs = tuple(expect_excs) + (req_excs.ConnectionError,)
     else:
@@ -63,9 +152,20 @@ def wait_for(resource, update_resource,
             value = "ACTIVE"
         if error_value is None:
             error_value = "ERROR"
+    if profile is not None:
+        key = (history_key, profile)
+        intervals = POLLING_PROFILES[profile].intervals()
+        first_delay = polling_history.first_delay(key)
+    else:
+        intervals = itertools.repeat(check_interval)
+        first_delay = 0
+    polls = 0
     start = time.time()
+    if first_delay:
+        time.sleep(min(first_delay, timeout))
     while True:
         LOG.debug("Trying to get resource: %s", resource)
+        polls += 1
         try:
             upd_resource = update_resource(resource)
         except stop_excs:
@@ -78,11 +178,14 @@ def wait_for(resource, update_resource,
             LOG.debug("Got resource: %s", upd_resource)
             result = attribute_getter(upd_resource)
             if result == value:
+                if profile is not None:
+                    polling_history.record(key, time.time() - start, polls,
+                                           check_interval)
                 return upd_resource
             if result == error_value:
                 raise exceptions.Error(
                     "Resource %s fell into error state" % resource)
-        time.sleep(check_interval)
+        time.sleep(next(intervals))
         if time.time() - start > timeout:
             raise exceptions.TimeoutException()
 
@@ -0,0 +1,221 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+import functools
+import logging
+import threading
+import time
+import weakref
+
+from pumphouse import inventory
+
+
+LOG = logging.getLogger(__name__)
+
+
+class StatusWatcher(object):
+    """Shares listings of resources between all waiters for them
+
+    Instead of getting every resource, waiters call :meth:`get` which
+    returns the resource from the next listing of all resources of the
+    type. The first waiter lists resources, others wait for the result,
+    so there is one listing per tick however many waiters there are.
+    While fewer than min_waiters resources were asked for during the last
+    active_interval seconds they are got one by one, a listing is worth
+    it only for many waiters. Resources absent from the listing, e.g.
+    deleted ones, are got one by one. If the listing fails all waiters
+    get resources one by one until the retry interval is over.
+
+    The :meth:`get` method can be used as the update_resource argument
+    of :func:`pumphouse.utils.wait_for`.
+
+    :param list_resources:  a callable which returns a list of resources,
+                            if it is None resources are always got one by
+                            one
+    :param get_resource:    a callable which gets one resource by its ID
+    :param interval:        a minimum number of seconds between listings
+    :param retry_interval:  a number of seconds while resources are got
+                            one by one after a failed listing
+    :param min_waiters:     a minimum number of waited resources which
+                            are listed instead of being got one by one
+    :param active_interval: a number of seconds while a resource is
+                            considered waited after it was asked for
+    """
+    default_interval = 1
+    default_retry_interval = 60
+    default_min_waiters = 3
+    default_active_interval = 60
+
+    def __init__(self, list_resources, get_resource, interval=None,
+                 retry_interval=None, min_waiters=None,
+                 active_interval=None):
+        self.list_resources = list_resources
+        self.get_resource = get_resource
+        self.interval = interval or self.default_interval
+        self.retry_interval = retry_interval or self.default_retry_interval
+        if min_waiters is None:
+            min_waiters = self.default_min_waiters
+        self.min_waiters = min_waiters
+        self.active_interval = (active_interval or
+                                self.default_active_interval)
+        self.cond = threading.Condition()
+        self.waited = {}
+        self.resources = {}
+        self.generation = 0
+        self.listing = False
+        self.listed_at = 0
+        self.disabled_until = 0
+        self.lists = 0
+        self.gets = 0
+        self.hits = 0
+
+    def get(self, resource_id):
+        """Get the resource from the next listing.
+
+        :param resource_id: an ID of the resource
+        :returns: the resource
+        """
+        now = time.time()
+        if (self.list_resources is None or now < self.disabled_until or
+                self._waiters(resource_id, now) < self.min_waiters):
+            return self._get(resource_id)
+        with self.cond:
+            # NOTE: a listing in progress could start before the caller
+            # changed the resource, only a listing started after this call
+            # is accepted.
+            generation = self.generation + (2 if self.listing else 1)
+            while self.generation < generation and self.listing:
+                self.cond.wait()
+            listed = self.generation >= generation
+            if not listed:
+                self.listing = True
+        if listed:
+            return self._lookup(resource_id)
+        try:
+            self._list()
+        finally:
+            with self.cond:
+                self.listing = False
+                self.cond.notify_all()
+        return self._lookup(resource_id)
+
+    def _waiters(self, resource_id, now):
+        with self.cond:
+            self.waited[resource_id] = now
+            expired = now - self.active_interval
+            for waited_id, asked_at in self.waited.items():
+                if asked_at < expired:
+                    del self.waited[waited_id]
+            return len(self.waited)
+
+    def _list(self):
+        delay = self.listed_at + self.interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            resources = dict((inventory.get_attr(resource, "id"), resource)
+                             for resource in self.list_resources())
+        except Exception:
+            LOG.warning("Unable to list resources, they will be got one by "
+                        "one for %d seconds", self.retry_interval,
+                        exc_info=True)
+            resources = {}
+            self.disabled_until = time.time() + self.retry_interval
+        with self.cond:
+            self.resources = resources
+            self.generation += 1
+            self.listed_at = time.time()
+            self.lists += 1
+
+    def _lookup(self, resource_id):
+        try:
+            resource = self.resources[resource_id]
+        except KeyError:
+            return self._get(resource_id)
+        self.hits += 1
+        return resource
+
+    def _get(self, resource_id):
+        self.gets += 1
+        return self.get_resource(resource_id)
+
+    def stats(self):
+        return {
+            "lists": self.lists,
+            "gets": self.gets,
+            "hits": self.hits,
+        }
+
+
+def list_servers(cloud):
+    def list_page(marker, limit):
+        return cloud.nova.servers.list(search_opts={"all_tenants": 1},
+                                       marker=marker, limit=limit)
+    return list(inventory.paginate(list_page,
+                                   inventory.CloudInventory.default_limit))
+
+
+def paginate_cinder(manager):
+    def list_page(marker, limit):
+        search_opts = {"all_tenants": 1, "limit": limit}
+        if marker is not None:
+            search_opts["marker"] = marker
+        return manager.list(search_opts=search_opts)
+    return list(inventory.paginate(list_page,
+                                   inventory.CloudInventory.default_limit))
+
+
+def list_volumes(cloud):
+    return paginate_cinder(cloud.cinder.volumes)
+
+
+def list_snapshots(cloud):
+    return paginate_cinder(cloud.cinder.volume_snapshots)
+
+
+# NOTE: images are got one by one, their listing can't be narrowed down to
+# the waited ones and would walk the whole catalog on every tick.
+RESOURCES = {
+    "servers": (list_servers, lambda cloud: cloud.nova.servers.get),
+    "volumes": (list_volumes, lambda cloud: cloud.cinder.volumes.get),
+    "snapshots": (list_snapshots,
+                  lambda cloud: cloud.cinder.volume_snapshots.get),
+    "images": (None, lambda cloud: cloud.glance.images.get),
+}
+
+_watchers = weakref.WeakKeyDictionary()
+_watchers_lock = threading.Lock()
+
+
+def watch(cloud, resource_type):
+    """Get the watcher of resources of the type in the cloud.
+
+    :param cloud:         an instance of :class:`pumphouse.cloud.Cloud`
+    :param resource_type: a type of resources: servers, volumes,
+                          snapshots or images
+    :returns: an instance of :class:`StatusWatcher`
+    """
+    with _watchers_lock:
+        watchers = _watchers.setdefault(cloud, {})
+        try:
+            return watchers[resource_type]
+        except KeyError:
+            list_resources, get_getter = RESOURCES[resource_type]
+            if list_resources is not None:
+                # NOTE: the watcher must not keep the cloud alive.
+                proxy = weakref.proxy(cloud)
+                list_resources = functools.partial(list_resources, proxy)
+            watcher = watchers[resource_type] = StatusWatcher(
+                list_resources, get_getter(cloud))
+            return watcher
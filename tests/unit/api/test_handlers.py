@@ -0,0 +1,132 @@
+import json
+import unittest
+
+from mock import Mock, patch
+
+from pumphouse.api import app
+from pumphouse.api import handlers
+from pumphouse.api import view
+
+
+class TestCloudHypervisors(unittest.TestCase):
+    def setUp(self):
+        self.cloud = Mock()
+        self.cloud.name = "source"
+        services = [
+            Mock(host="host1", state="up", status="enabled"),
+            Mock(host="host2", state="up", status="disabled"),
+            Mock(host="host3", state="down", status="enabled"),
+        ]
+        self.cloud.nova.services.list.return_value = services
+        self.cloud.nova.hypervisors.list.return_value = [
+            Mock(service={"host": host})
+            for host in ("host1", "host2", "host3", "host4")
+        ]
+
+    def test_statuses(self):
+        hosts = list(handlers.cloud_hypervisors({}, self.cloud))
+        self.cloud.nova.services.list.assert_called_once_with(
+            binary="nova-compute")
+        self.assertEqual(
+            [("host1", "available"), ("host2", "blocked"),
+             ("host3", "error"), ("host4", "error")],
+            [(host["id"], host["data"]["status"]) for host in hosts])
+
+
+class TestResources(unittest.TestCase):
+    def setUp(self):
+        self.app = app.create_app()
+        self.app.config.update(CLOUDS={"source": {}}, CLOUDS_RESET=False)
+        self.client = self.app.test_client()
+        self.view = view.ResourcesView()
+        self.resources = [{"id": "t1", "cloud": "source", "type": "tenant",
+                           "data": {"id": "t1"}}]
+        for patcher in (
+            patch.object(view, "resources_view", self.view),
+            patch.object(handlers, "cloud_resources",
+                         return_value=self.resources),
+            patch.object(handlers.hooks, "source"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        handlers.hooks.source.cloud_urls = {"horizon": "http://horizon"}
+
+    def test_etag(self):
+        response = self.client.get("/resources")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(self.resources,
+                         json.loads(response.data)["source"]["resources"])
+        etag = response.headers["ETag"]
+        response = self.client.get("/resources",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(1, handlers.cloud_resources.call_count)
+        self.view.handle("delete", {"id": "t1", "cloud": "source",
+                                    "type": "tenant"})
+        response = self.client.get("/resources",
+                                   headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual([],
+                         json.loads(response.data)["source"]["resources"])
+
+    def test_unavailable(self):
+        handlers.cloud_resources.side_effect = Exception
+        response = self.client.get("/resources")
+        self.assertEqual(503, response.status_code)
+
+
+class TestRuns(unittest.TestCase):
+    def setUp(self):
+        self.app = app.create_app()
+        self.app.config.update(CLOUDS={"source": {}, "destination": {}},
+                               PARAMETERS={})
+        self.client = self.app.test_client()
+        patcher = patch.object(handlers.gevent, "spawn")
+        self.spawn = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_not_persistent(self):
+        response = self.client.post("/tenants/t1")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("", response.data)
+        response = self.client.post("/tenants/t1?resume=r1")
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(1, self.spawn.call_count)
+
+    def test_persistent(self):
+        self.app.config["PARAMETERS"]["flow_persistence"] = {
+            "connection": "memory"}
+        response = self.client.post("/tenants/t1")
+        self.assertTrue(json.loads(response.data)["run_id"])
+        response = self.client.post("/tenants/t1?resume=r1")
+        self.assertEqual({"run_id": "r1"}, json.loads(response.data))
+
+
+class TestBandwidth(unittest.TestCase):
+    def setUp(self):
+        self.app = app.create_app()
+        self.client = self.app.test_client()
+        patcher = patch.object(handlers.transfer, "bandwidth",
+                               handlers.transfer.Bandwidth())
+        self.bandwidth = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_configure(self):
+        response = self.client.put("/bandwidth",
+                                   data=json.dumps({"source:destination":
+                                                    1024}))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({"source:destination": 1024},
+                         json.loads(response.data))
+        self.assertEqual(1024,
+                         self.bandwidth.bucket("source:destination").rate)
+        response = self.client.get("/bandwidth")
+        self.assertEqual({"source:destination": 1024},
+                         json.loads(response.data))
+
+    def test_invalid(self):
+        for data in ("[]", '{"source:destination": -1}',
+                     '{"source:destination": 0}', "rate"):
+            response = self.client.put("/bandwidth", data=data)
+            self.assertEqual(400, response.status_code)
+        self.assertEqual({}, self.bandwidth.limits())
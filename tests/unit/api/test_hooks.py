@@ -0,0 +1,52 @@
+import unittest
+
+from mock import Mock, patch
+
+from pumphouse.api import hooks
+
+
+class TestClouds(unittest.TestCase):
+    def setUp(self):
+        self.service = Mock()
+        self.service.check.return_value = True
+        self.clouds = hooks.Clouds(interval=10, ttl=30, max_backoff=40)
+        self.clouds.register("source", self.service)
+        self.time = 100
+        for target, attr in ((hooks.time, "time"), (hooks.gevent, "spawn")):
+            patcher = patch.object(target, attr)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        hooks.time.time.side_effect = lambda: self.time
+
+    def test_connect_without_checks(self):
+        service, client = self.clouds.connect("source")
+        self.assertIs(self.service, service)
+        self.assertIs(self.service.make.return_value, client)
+        hooks.gevent.spawn.assert_called_once_with(self.clouds._heartbeat,
+                                                   "source")
+        self.time += 30
+        self.assertIs(client, self.clouds.connect("source")[1])
+        self.assertFalse(self.service.check.called)
+
+    def test_connect_stale(self):
+        _, client = self.clouds.connect("source")
+        self.time += 31
+        self.assertIs(client, self.clouds.connect("source")[1])
+        self.service.check.assert_called_once_with(client)
+        self.clouds.connect("source")
+        self.assertEqual(1, self.service.check.call_count)
+
+    def test_beat_backoff(self):
+        _, client = self.clouds.connect("source")
+        self.assertEqual(10, self.clouds.beat("source", 10))
+        self.service.check.return_value = False
+        self.assertEqual(20, self.clouds.beat("source", 10))
+        self.service.make.assert_called_with(identity=client.identity)
+        self.assertEqual(40, self.clouds.beat("source", 20))
+        self.assertEqual(40, self.clouds.beat("source", 40))
+        self.service.check.side_effect = Exception
+        self.assertEqual(40, self.clouds.beat("source", 40))
+        self.service.check.side_effect = None
+        self.service.check.return_value = True
+        self.assertEqual(10, self.clouds.beat("source", 40))
+        self.assertTrue(self.clouds.is_healthy("source"))
@@ -0,0 +1,58 @@
+import unittest
+
+from pumphouse.api import view
+
+
+def resource(resource_id, **data):
+    return {
+        "id": resource_id,
+        "cloud": "source",
+        "type": "server",
+        "data": dict(data, id=resource_id),
+    }
+
+
+class TestResourcesView(unittest.TestCase):
+    def setUp(self):
+        self.view = view.ResourcesView()
+        self.view.reconcile("source", [resource("s1", status="ACTIVE")])
+
+    def snapshot(self):
+        return self.view.snapshot(["source"])
+
+    def test_reconcile(self):
+        etag, resources = self.snapshot()
+        self.assertEqual({"source": [resource("s1", status="ACTIVE")]},
+                         resources)
+        self.view.reconcile("source", [resource("s1", status="ACTIVE")])
+        self.assertEqual(etag, self.snapshot()[0])
+        self.view.reconcile("source", [])
+        self.assertNotEqual(etag, self.snapshot()[0])
+
+    def test_events(self):
+        etag, _ = self.snapshot()
+        self.view.handle("create", dict(resource("s2", status="BUILD"),
+                                        action="migration"),
+                         namespace="/events")
+        self.view.handle("update", {"id": "s2", "cloud": "source",
+                                    "type": "server", "progress": 50})
+        self.view.handle("update", {"id": "s2", "cloud": "source",
+                                    "type": "server",
+                                    "data": {"status": "ACTIVE"}})
+        self.view.handle("delete", {"id": "s1", "cloud": "source",
+                                    "type": "server"})
+        new_etag, resources = self.snapshot()
+        self.assertNotEqual(etag, new_etag)
+        self.assertEqual([resource("s2", status="ACTIVE")],
+                         resources["source"])
+
+    def test_events_of_unknown_cloud(self):
+        etag, _ = self.snapshot()
+        self.view.handle("create", dict(resource("s2"), cloud="destination"))
+        self.view.handle("log", {"level": "error"})
+        self.assertEqual(etag, self.snapshot()[0])
+
+    def test_reset_invalidates(self):
+        self.view.handle("reset completed", {"cloud": "source"})
+        self.assertFalse(self.view.is_ready("source"))
+        self.assertEqual({"source": []}, self.snapshot()[1])
@@ -2,6 +2,7 @@ from mock import Mock, patch, call
 import unittest
 
 from pumphouse import exceptions
+from pumphouse import mapping
 from pumphouse.tasks import flavor
 from pumphouse import task
 
@@ -93,6 +94,25 @@ class TestEnsureFlavor(TestFlavor):
         self.assertRaises(exceptions.Conflict, ensure_flavor.execute,
                           self.flavor_info)
 
+    @patch.object(mapping, "registry", new_callable=mapping.Registry)
+    def test_execute_mapped(self, registry):
+        registry.configure(":memory:")
+        self.cloud.namespace.auth_url = "http://destination"
+        self.flavor.id = "456"
+        self.flavor.to_dict.return_value = dict(self.flavor_info, id="456")
+
+        ensure_flavor = flavor.EnsureFlavor(self.cloud)
+        ensure_flavor.execute(self.flavor_info)
+        self.assertEqual("456", registry.get("http://destination",
+                                             "flavor", self.dummy_id))
+
+        self.cloud.nova.flavors.list.reset_mock()
+        self.cloud.nova.flavors.create.reset_mock()
+        ensure_flavor.execute(self.flavor_info)
+        self.cloud.nova.flavors.get.assert_called_once_with("456")
+        self.assertFalse(self.cloud.nova.flavors.list.called)
+        self.assertFalse(self.cloud.nova.flavors.create.called)
+
 
 class TestMigrateFlavor(TestFlavor):
 
@@ -11,6 +11,10 @@ from pumphouse.tasks import user as user_tasks
 from pumphouse.tasks import tenant as tenant_tasks
 
 
+class FakeIdentity(dict):
+    pass
+
+
 class TestIdentity(unittest.TestCase):
     def setUp(self):
         self.src_cloud = Mock()
@@ -35,7 +39,8 @@ class TestIdentity(unittest.TestCase):
             self.users_ids[0]: self.user1_info,
             self.users_ids[1]: self.user2_info,
         }
-        self.src_cloud.identity = self.users_infos
+        self.src_cloud.identity = FakeIdentity(self.users_infos)
+        self.src_cloud.identity.prefetch = Mock()
         self.context = Mock(src_cloud=self.src_cloud,
                             dst_cloud=self.dst_cloud,
                             store={},
@@ -80,6 +85,10 @@ class TestRepairUsersPasswords(TestIdentity):
             ]
         )
         self.dst_cloud.identity.push.assert_called_once_with()
+        self.assertItemsEqual(
+            self.src_cloud.identity.prefetch.call_args[0][0],
+            self.users_ids,
+        )
 
 
 class TestMigrateIdentityBase(TestIdentity):
@@ -0,0 +1,213 @@
+import BaseHTTPServer
+import hashlib
+import threading
+import unittest
+
+from mock import Mock, patch
+
+from pumphouse import cloud
+from pumphouse import exceptions
+from pumphouse import fake
+from pumphouse.tasks import image
+from pumphouse import transfer
+
+
+class TestEnsureImage(unittest.TestCase):
+    def setUp(self):
+        self.image_info = {
+            "id": "img1",
+            "name": "image",
+            "checksum": hashlib.md5("datadata").hexdigest(),
+            "size": 8,
+            "disk_format": "qcow2",
+            "container_format": "bare",
+            "visibility": "public",
+            "min_ram": 0,
+            "min_disk": 0,
+            "protected": False,
+        }
+        self.dst_image = {"id": "img2", "name": "image", "status": "active"}
+        self.src_cloud = Mock()
+        self.src_cloud.http.download_streams = 1
+        self.src_cloud.glance.images.get.return_value = self.image_info
+        self.src_cloud.glance.images.data.return_value = iter(["data"] * 2)
+        self.dst_cloud = Mock()
+        self.dst_cloud.glance.images.list.return_value = []
+        self.dst_cloud.glance.images.create.return_value = self.dst_image
+        self.dst_cloud.glance.images.get.return_value = self.dst_image
+        self.uploaded = []
+        self.dst_cloud.glance.images.upload.side_effect = \
+            lambda image_id, data: self.uploaded.append(data.read(1024))
+        self.task = image.EnsureSingleImage(
+            self.src_cloud, self.dst_cloud,
+            transfer=transfer.Transfer(chunk_size=4, depth=1))
+
+    @patch("pumphouse.events.emit")
+    def test_execute_uploads(self, emit):
+        result = self.task.execute("img1", None)
+        self.assertEqual("img2", result["id"])
+        self.assertEqual(self.image_info["checksum"], result["digests"]["md5"])
+        self.assertEqual(["datadata"], self.uploaded)
+        self.assertTrue(emit.called)
+        self.src_cloud.glance.images.data.assert_called_once_with(
+            "img1", do_checksum=False)
+
+    @patch("pumphouse.events.emit")
+    def test_execute_source_mismatch(self, emit):
+        self.image_info["checksum"] = "0" * 32
+        self.assertRaises(exceptions.ChecksumMismatch,
+                          self.task.execute, "img1", None)
+
+    @patch("pumphouse.events.emit")
+    def test_execute_destination_mismatch(self, emit):
+        self.dst_image["checksum"] = "0" * 32
+        self.assertRaises(exceptions.ChecksumMismatch,
+                          self.task.execute, "img1", None)
+
+    def test_execute_existing(self):
+        existing = {"id": "img3", "name": "image", "status": "active",
+                    "visibility": "public", "owner": "t1",
+                    "checksum": hashlib.md5("datadata").hexdigest(), "size": 8}
+        self.dst_cloud.glance.images.list.return_value = [existing]
+        result = self.task.execute("img1", None)
+        self.assertEqual(existing, result)
+        self.assertFalse(self.dst_cloud.glance.images.upload.called)
+
+    @patch("pumphouse.events.emit")
+    def test_execute_existing_renamed(self, emit):
+        existing = {"id": "img3", "name": "renamed", "status": "active",
+                    "visibility": "public",
+                    "checksum": hashlib.md5("datadata").hexdigest(), "size": 8}
+        self.dst_cloud.glance.images.list.return_value = [existing]
+        result = self.task.execute("img1", None)
+        self.assertEqual(existing, result)
+        self.assertFalse(self.dst_cloud.glance.images.upload.called)
+
+    @patch("pumphouse.events.emit")
+    def test_execute_transit(self, emit):
+        existing = {"id": "img3", "name": "image", "status": "active",
+                    "visibility": "public",
+                    "checksum": hashlib.md5("datadata").hexdigest(), "size": 8}
+        self.dst_cloud.glance.images.list.return_value = [existing]
+        self.task.shared = False
+        result = self.task.execute("img1", None)
+        self.assertEqual("img2", result["id"])
+        self.assertFalse(self.dst_cloud.glance.images.list.called)
+
+    @patch("pumphouse.events.emit")
+    def test_execute_uploads_once(self, emit):
+        self.task.execute("img1", None)
+        self.task.execute("img1", None)
+        self.assertEqual(1, self.dst_cloud.glance.images.upload.call_count)
+        self.assertEqual(1, self.dst_cloud.glance.images.list.call_count)
+
+
+class TestDownloadImage(unittest.TestCase):
+    def setUp(self):
+        self.cloud = Mock()
+        self.cloud.http.download_streams = 3
+        self.cloud.http.range_size = 4
+        self.content = "0123456789"
+        self.image_info = {"id": "img1", "size": len(self.content)}
+        self.ranges = []
+
+        def get(url, headers):
+            self.assertEqual("/v2/images/img1/file", url)
+            start, end = map(int, headers["Range"][6:].split("-"))
+            self.ranges.append((start, end))
+            return (Mock(status_code=206),
+                    iter([self.content[start:end + 1]]))
+
+        self.cloud.glance.images.http_client.get.side_effect = get
+
+    def test_ranges(self):
+        data = image.download_image(self.cloud, self.image_info)
+        self.assertEqual(self.content, "".join(data))
+        self.assertEqual([(0, 3), (4, 7), (8, 9)], sorted(self.ranges))
+
+    def test_ranges_not_honored(self):
+        self.cloud.glance.images.http_client.get.side_effect = None
+        self.cloud.glance.images.http_client.get.return_value = (
+            Mock(status_code=200), iter([self.content]))
+        data = image.download_image(self.cloud, self.image_info)
+        self.assertEqual(self.content, "".join(data))
+        self.assertEqual(1, self.cloud.glance.images.http_client.get
+                         .call_count)
+
+    def test_single_stream(self):
+        self.cloud.http.download_streams = 1
+        data = image.download_image(self.cloud, self.image_info)
+        self.assertIs(self.cloud.glance.images.data.return_value, data)
+        self.cloud.glance.images.data.assert_called_once_with(
+            "img1", do_checksum=False)
+
+
+class TestImportImage(unittest.TestCase):
+    def setUp(self):
+        namespace = cloud.Namespace(username="admin", password="admin",
+                                    tenant_name="admin",
+                                    auth_url="http://keystone")
+        identity = {"connection": "sqlite://"}
+        self.src_cloud = fake.Cloud("source", namespace, identity)
+        self.dst_cloud = fake.Cloud("destination", namespace, identity)
+        self.image = self.src_cloud.glance.images.create(
+            name="cirros", disk_format="qcow2", container_format="bare",
+            visibility="public")
+        content = self.image.id
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/image":
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:{}/".format(self.server.server_port)
+        self.task = image.EnsureSingleImage(
+            self.src_cloud, self.dst_cloud,
+            transfer=transfer.Transfer(
+                plugins={"image_transfer": "location"}))
+        patcher = patch("pumphouse.events.emit")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_location(self):
+        image_info = {"direct_url": "file:///var/lib/glance/images/1",
+                      "locations": [{"url": "swift+http://swift/1"},
+                                    {"url": "http://glance/1"}]}
+        self.assertEqual("http://glance/1",
+                         image.get_location(image_info, ["http"]))
+        self.assertEqual("swift+http://swift/1",
+                         image.get_location(image_info, ["swift+http"]))
+        self.assertIsNone(image.get_location({}, ["http"]))
+
+    @patch.object(fake.Image, "upload")
+    def test_import(self, upload):
+        self.image["direct_url"] = self.url + "image"
+        result = self.task.execute(self.image.id, None)
+        self.assertFalse(upload.called)
+        self.assertEqual(self.image["checksum"], result["checksum"])
+        self.assertEqual(1, len(self.dst_cloud.glance.tasks.list()))
+
+    def test_import_fails(self):
+        self.image["direct_url"] = self.url + "missing"
+        result = self.task.execute(self.image.id, None)
+        self.assertEqual(self.image["checksum"], result["digests"]["md5"])
+        self.assertEqual("failure",
+                         self.dst_cloud.glance.tasks.list()[0]["status"])
+
+    def test_without_location(self):
+        result = self.task.execute(self.image.id, None)
+        self.assertEqual(self.image["checksum"], result["digests"]["md5"])
+        self.assertEqual([], self.dst_cloud.glance.tasks.list())
@@ -0,0 +1,99 @@
+import unittest
+
+from concurrent import futures
+from mock import Mock, call, patch
+from taskflow.patterns import graph_flow
+
+from pumphouse.tasks import project_resources
+
+
+class TestProjectResources(unittest.TestCase):
+    def setUp(self):
+        self.tenant_id = "tenant-id"
+        self.context = Mock(store={}, config={"network": "nova",
+                                              "discovery_workers": 2})
+        self.cloud = self.context.src_cloud
+        self.cloud.keystone.auth_ref.user_id = "admin-id"
+        self.cloud.restrict.return_value = self.cloud
+
+
+class TestDiscoverProjectKeypairs(TestProjectResources):
+    def test_discover(self):
+        admin, user = Mock(id="admin-id"), Mock(id="user-id")
+        user.name = "user"
+        self.cloud.keystone.users.list.return_value = [admin, user]
+        keypair = Mock()
+        keypair.name = "key"
+        self.cloud.nova.keypairs.list.return_value = [keypair]
+        with futures.ThreadPoolExecutor(max_workers=2) as executor:
+            keypairs = project_resources.discover_project_keypairs(
+                self.context, self.tenant_id, executor=executor)
+        self.assertEqual([("user-id", "key")], keypairs)
+        self.cloud.restrict.assert_called_once_with(
+            username="user", password="default",
+            tenant_name=self.cloud.keystone.tenants.get.return_value.name)
+
+
+class TestDiscoverProjectVolumes(TestProjectResources):
+    def test_inventory(self):
+        volumes = project_resources.discover_project_volumes(self.context,
+                                                             self.tenant_id)
+        self.context.inventory.find.assert_called_once_with(
+            "volumes", "tenant", self.tenant_id)
+        self.assertEqual(self.context.inventory.find.return_value, volumes)
+        self.assertFalse(self.cloud.cinder.volumes.list.called)
+
+    def test_tenant_filter(self):
+        self.context.config["volumes_tenant_filter"] = True
+        volumes = project_resources.discover_project_volumes(self.context,
+                                                             self.tenant_id)
+        self.cloud.cinder.volumes.list.assert_called_once_with(
+            search_opts={"all_tenants": 1, "project_id": self.tenant_id})
+        self.assertEqual(self.cloud.cinder.volumes.list.return_value,
+                         volumes)
+
+
+class TestMigrateProject(TestProjectResources):
+    def test_migrate_project(self):
+        calls = Mock()
+        patches = {}
+        for kind in ("servers", "images", "volumes", "quota"):
+            patches["discover_project_" + kind] = getattr(calls, kind)
+            patches["migrate_project_" + kind] = getattr(calls,
+                                                         "migrate_" + kind)
+        patches["migrate_project_keypairs"] = calls.migrate_keypairs
+        patches["discover_project_keypairs"] = calls.keypairs
+        for name, mock in patches.items():
+            patcher = patch.object(project_resources, name, mock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        networks = {"nova": calls.networks}
+        migrations = {"nova": calls.migrate_networks}
+        identity_flow = graph_flow.Flow("identity")
+        for patcher in (
+            patch.dict(project_resources.network_discovery.implementations,
+                       networks),
+            patch.dict(project_resources.network_manager.implementations,
+                       migrations),
+            patch.object(project_resources.identity_tasks,
+                         "migrate_identity",
+                         return_value=(None, identity_flow)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        flow = project_resources.migrate_project(self.context,
+                                                 self.tenant_id)
+
+        migrations = [c for c in calls.mock_calls
+                      if c[0].startswith("migrate_")]
+        expected = [
+            getattr(call, "migrate_" + kind)(
+                self.context, flow, self.tenant_id,
+                getattr(calls, kind).return_value)
+            for kind in ("servers", "keypairs", "images", "volumes", "quota",
+                         "networks")
+        ]
+        self.assertEqual(expected, migrations)
+        calls.servers.assert_called_once_with(self.context, self.tenant_id)
+        calls.networks.assert_called_once_with(self.context, self.tenant_id)
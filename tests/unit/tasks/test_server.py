@@ -155,6 +155,8 @@ class TestBootServer(TestServer):
             nics=self.server_nics,
             block_device_mapping=dict(self.server_dm))
         self.assertEqual(self.server_info, server_info)
+        self.cloud.nova.servers.get.assert_called_once_with(
+            self.test_server_id)
 
 
 class TestTerminateServer(TestServer):
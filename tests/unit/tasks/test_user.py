@@ -2,6 +2,7 @@ import unittest
 
 from pumphouse.tasks import user
 from mock import patch, Mock, call
+from pumphouse import mapping
 from pumphouse import task
 from pumphouse.exceptions import keystone_excs
 
@@ -63,7 +64,7 @@ class TestRetrieveUser(TestUser):
 
         retrieve_user.execute(self.user_id)
         self.users.get.assert_called_once_with(self.user_id)
-        self.cloud.identity.fetch.assert_called_once_with(self.user_id)
+        self.assertFalse(self.cloud.identity.fetch.called)
         self.user.to_dict.assert_called_once_with()
 
 
@@ -83,6 +84,19 @@ class TestEnsureUser(TestUser):
     def test_execute_exception_no_tenant_info(self):
         self.ensure_user(user.EnsureUser(self.cloud), None)
 
+    @patch.object(mapping, "registry", new_callable=mapping.Registry)
+    def test_execute_mapped_renamed(self, registry):
+        registry.configure(":memory:")
+        self.cloud.namespace.auth_url = "http://destination"
+        registry.remember(self.cloud, "user", self.user_id, "uid789")
+        self.user.name = "Renamed"
+
+        ensure_user = user.EnsureUser(self.cloud)
+        ensure_user.execute(self.user_info, self.tenant_info)
+        self.users.get.assert_called_once_with("uid789")
+        self.assertFalse(self.users.find.called)
+        self.assertFalse(self.users.create.called)
+
 
 class TestEnsureOrphanUser(TestUser):
     def test_execute(self):
@@ -22,6 +22,14 @@ class UploadReporterTestCase(unittest.TestCase):
                     0.625, 0.75, 0.8125, 0.9375, 1.0]
         self.assertEqual(expected, self.reports)
 
+    @mock.patch("pumphouse.tasks.utils.time.time")
+    def test_throughput(self, time):
+        time.return_value = 100
+        self.reporter.set_size(1024)
+        time.return_value = 102
+        self.reporter.update(512)
+        self.assertEqual(256, self.reporter.throughput())
+
     def test_zero_size(self):
         self.reporter.update(1024)
         self.assertEqual([], self.reports)
@@ -36,34 +44,3 @@ class SyncPointTestCase(unittest.TestCase):
     def test_sync_point(self, mock_debug):
         self.point.execute(fake="fake")
         mock_debug.assert_called_once_with(mock.ANY, mock.ANY, mock.ANY)
-
-
-class FileProxyTestCase(unittest.TestCase):
-    def setUp(self):
-        self.data = mock.Mock()
-        self.resp = self.data
-        self.size = "1024"
-        self.data.next.side_effect = ["*" * 512] + ["*" * 512] + [None]
-        self.reporter = mock.Mock()
-        self.fproxy = utils.FileProxy(self.data, self.size, self.reporter)
-
-    def test_read(self):
-        chunk_one = self.fproxy.read(512)
-        chunk_two = self.fproxy.read(512)
-        chunk_none = self.fproxy.read(512)
-        chunk_data = "*" * 512
-        self.assertEqual(chunk_data, chunk_one)
-        self.assertEqual(chunk_data, chunk_two)
-        self.assertIsNone(chunk_none)
-        chunk_calls = [mock.call(512), mock.call(512)]
-        self.reporter.update.assert_calls(chunk_calls)
-        self.data.next.assert_calls(chunk_calls + [mock.call(512)])
-
-    def test_close(self):
-        self.fproxy.close()
-        self.resp.close.assert_called_once_with()
-
-    def test_isclosed(self):
-        self.resp.isclosed.return_value = True
-        isclosed = self.fproxy.isclosed()
-        self.assertTrue(isclosed)
@@ -145,6 +145,19 @@ class TestUploadVolume(TestVolume):
         with self.assertRaises(exceptions.NotFound):
             upload_volume.execute(self.volume_info, self.timeout)
 
+    def test_reserved(self):
+        scheduler = Mock()
+        upload_volume = volume.UploadVolume(self.cloud, scheduler=scheduler,
+                                            server_id="s1")
+        start = Mock()
+        self.volume_info["os-vol-host-attr:host"] = "host1"
+        upload_volume.reserve({"volume_info": self.volume_info}, start)
+        scheduler.reserve.assert_called_once_with("upload", "s1", "host1",
+                                                  start)
+        upload_volume.upload_to_glance_event = Mock()
+        upload_volume.execute(self.volume_info, self.timeout)
+        self.assertFalse(scheduler.slot.called)
+
 
 class TestCreateVolumeFromImage(TestVolume):
     def test_execute(self):
@@ -254,7 +267,7 @@ class TestMigrateVolume(TestVolume):
 
 
 class TestMigrateDetachedVolume(TestMigrateVolume):
-    @patch("pumphouse.tasks.image.EnsureSingleImage")
+    @patch.object(volume, "EnsureVolumeImage")
     @patch.object(volume, "CreateVolumeFromImage")
     @patch.object(volume, "UploadVolume")
     @patch.object(volume, "RetrieveVolume")
@@ -289,6 +302,7 @@ class TestMigrateDetachedVolume(TestMigrateVolume):
             inject={"timeout": int(self.timeout)})
         ensure_img_mock.assert_called_once_with(
             self.context.src_cloud, self.context.dst_cloud,
+            transfer=self.context.transfer,
             name=self.image_ensure, provides=self.image_ensure,
             rebind=[self.volume_upload, self.tenant_ensure])
         flow_mock.assert_called_once_with(
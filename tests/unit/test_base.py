@@ -1,8 +1,13 @@
+import gc
 import unittest
+import warnings
 
 import mock
 
 from pumphouse import base
+from pumphouse import cloud
+from pumphouse import fake
+from pumphouse.tasks import base as tasks_base
 from pumphouse.tasks import reset
 
 
@@ -27,7 +32,7 @@ class TestBase(unittest.TestCase):
         self.target = "fakecloud"
         self.driver = mock.Mock(return_value=self.identity)
         self.driver.return_value = self.identity
-        self.driver.from_dict.return_value = ()
+        self.driver.from_dict.return_value = mock.Mock()
 
         self.cloud_driver = self.driver
         self.identity_driver = self.driver
@@ -72,6 +77,8 @@ class TestService(TestBase):
         self.service.make(identity=self.identity2)
         self.identity_driver.from_dict.assert_called_once_with(
             self.target, self.identity2, {"endpoint": self.cloud_endpoint})
+        cloud = self.identity_driver.from_dict.return_value
+        cloud.configure.assert_called_once_with({})
 
     @mock.patch("pumphouse.tasks.base.TaskflowRunner")
     def test_reset_with_workloads(self, mock_runner):
@@ -165,5 +172,46 @@ class TestService(TestBase):
         )
 
 
+class Events(object):
+    def emit(self, *args, **kwargs):
+        pass
+
+
+class TestServiceSoak(unittest.TestCase):
+    num_resets = 100
+
+    def setUp(self):
+        namespace = cloud.Namespace(username="admin", password="admin",
+                                    tenant_name="admin",
+                                    auth_url="http://keystone")
+        self.cloud = fake.Cloud("source", namespace,
+                                {"connection": "sqlite://"})
+        self.service = fake.Service({"identity": {}}, {"network": "nova"},
+                                    "source", fake.Cloud, fake.Identity)
+        self.events = Events()
+
+    def count_objects(self):
+        gc.collect()
+        objects = gc.get_objects()
+        bound = [obj for obj in objects
+                 if isinstance(obj, tasks_base.Resource) and obj.bound]
+        return len(objects), len(bound)
+
+    def test_reset_frees_resources(self):
+        with warnings.catch_warnings():
+            # NOTE: recorded warnings would be counted as leaked objects.
+            warnings.simplefilter("ignore")
+            self.service.reset(self.events, self.cloud)
+            num_objects, num_bound = self.count_objects()
+            self.assertEqual(num_bound, 0)
+            for _ in range(self.num_resets):
+                self.service.reset(self.events, self.cloud)
+        num_leaked, num_bound = self.count_objects()
+        num_leaked -= num_objects
+        self.assertEqual(num_bound, 0)
+        # NOTE: a leak of anything per reset exceeds the number of resets.
+        self.assertLess(num_leaked, self.num_resets)
+
+
 if __name__ == '__main__':
     unittest.main()
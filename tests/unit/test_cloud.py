@@ -1,3 +1,5 @@
+import BaseHTTPServer
+import threading
 import unittest
 
 from pumphouse import cloud
@@ -68,5 +70,199 @@ class IdentityTestCase(unittest.TestCase):
         iter(self.identity)
 
 
+class IdentityBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.identity = cloud.Identity("sqlite://", batch_size=2)
+        self.identity.engine.execute("CREATE TABLE user "
+                                     "(id VARCHAR(64), password VARCHAR(128))")
+        for i in range(5):
+            self.identity.engine.execute(
+                "INSERT INTO user VALUES ('user{0}', 'hash{0}')".format(i))
+        self.queries = []
+        sqla.event.listen(self.identity.engine, "before_cursor_execute",
+                          lambda *args: self.queries.append(args[2]))
+
+    def test_prefetch(self):
+        self.identity.prefetch(["user0", "user1", "user2", "user9"])
+        self.assertEqual(2, len(self.queries))
+        self.assertEqual("hash1", self.identity["user1"])
+        self.assertIsNone(self.identity["user9"])
+        self.identity.prefetch(["user1", "user9"])
+        self.assertEqual(2, len(self.queries))
+
+    def test_push(self):
+        self.identity.update(("user{}".format(i), "new{}".format(i))
+                             for i in range(3))
+        self.identity.push()
+        self.assertEqual(2, len(self.queries))
+        self.identity.push()
+        self.assertEqual(2, len(self.queries))
+        rows = self.identity.engine.execute(
+            "SELECT id, password FROM user ORDER BY id").fetchall()
+        self.assertEqual([("user0", "new0"), ("user1", "new1"),
+                          ("user2", "new2"), ("user3", "hash3"),
+                          ("user4", "hash4")], rows)
+
+
+class CloudPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = cloud.CloudPool(size=2, ttl=60)
+        self.factory = MagicMock(side_effect=lambda ns: ("cloud", ns))
+
+    def test_reuse(self):
+        first = self.pool.get("ns1", self.factory)
+        second = self.pool.get("ns1", self.factory)
+        self.assertIs(first, second)
+        self.factory.assert_called_once_with("ns1")
+        self.assertEqual(1, self.pool.hits)
+        self.assertEqual(1, self.pool.misses)
+
+    def test_lru_eviction(self):
+        self.pool.get("ns1", self.factory)
+        self.pool.get("ns2", self.factory)
+        self.pool.get("ns1", self.factory)
+        self.pool.get("ns3", self.factory)
+        self.assertEqual(["ns1", "ns3"], list(self.pool.clouds))
+        self.assertEqual(1, self.pool.evictions)
+
+    @patch("pumphouse.cloud.time.time")
+    def test_ttl_expiration(self, mock_time):
+        mock_time.return_value = 100
+        self.pool.get("ns1", self.factory)
+        mock_time.return_value = 200
+        self.pool.get("ns1", self.factory)
+        self.assertEqual(2, self.factory.call_count)
+        self.assertEqual({"size": 1, "hits": 0, "misses": 2,
+                          "evictions": 1}, self.pool.stats())
+
+    def test_failed_factory(self):
+        self.factory.side_effect = Exception
+        self.assertRaises(Exception, self.pool.get, "ns1", self.factory)
+        self.assertEqual({}, self.pool.creating)
+        self.assertEqual([], list(self.pool.clouds))
+
+
+class CloudTestCase(unittest.TestCase):
+    def setUp(self):
+        self.namespace = cloud.Namespace(
+            username="user",
+            password="password",
+            tenant_name="tenant",
+            auth_url="auth",
+        )
+        clients = ("nova_client", "keystone_client", "glance", "cinder",
+                   "neutron_client")
+        self.clients = {}
+        for client in clients:
+            patcher = patch("pumphouse.cloud." + client)
+            self.clients[client] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_lazy_clients(self):
+        src = cloud.Cloud("source", self.namespace, None)
+        for client in self.clients.values():
+            self.assertFalse(client.Client.called)
+        nova = src.nova
+        self.assertIs(nova, src.nova)
+        self.clients["nova_client"].Client.assert_called_once_with(
+            "user", "password", "tenant", "auth", "compute",
+            session=src.session)
+        self.assertFalse(self.clients["keystone_client"].Client.called)
+        self.assertFalse(self.clients["glance"].Client.called)
+
+    def test_endpoints_per_token(self):
+        src = cloud.Cloud("source", self.namespace, None)
+        keystone = self.clients["keystone_client"].Client.return_value
+        keystone.auth_token = "token1"
+        src.get_endpoints()
+        src.glance
+        self.assertEqual(1, keystone.service_catalog.get_endpoints.call_count)
+        keystone.auth_token = "token2"
+        src.get_endpoints()
+        self.assertEqual(2, keystone.service_catalog.get_endpoints.call_count)
+
+    def test_restrict_shares_pool(self):
+        src = cloud.Cloud("source", self.namespace, None)
+        restricted = src.restrict(username="user1", tenant_name="tenant1")
+        self.assertIs(src.pool, restricted.pool)
+        self.assertIs(src.http, restricted.http)
+        self.assertEqual("tenant1", restricted.namespace.tenant_name)
+        self.assertIs(restricted, src.restrict(username="user1",
+                                               tenant_name="tenant1"))
+        self.assertIs(restricted, restricted.restrict(tenant_name="tenant1"))
+
+    def test_from_dict_pool(self):
+        config = {
+            "endpoint": self.namespace.to_dict(),
+            "pool": {"size": 4, "ttl": 30},
+            "http": {"pool_size": 16},
+        }
+        src = cloud.Cloud.from_dict("source", None, config)
+        self.assertEqual(4, src.pool.size)
+        self.assertEqual(30, src.pool.ttl)
+        self.assertEqual(16, src.http.pool_size)
+
+    def test_shared_session(self):
+        src = cloud.Cloud("source", self.namespace, None)
+        self.assertIs(src.http.session, src.session.session)
+        src.keystone
+        keystone_kwargs = self.clients["keystone_client"].Client.call_args[1]
+        self.assertIs(src.http.session, keystone_kwargs["session"].session)
+        src.neutron
+        self.clients["neutron_client"].Client.assert_called_once_with(
+            "2.0", session=src.session)
+
+
+class KeepAliveHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPSessionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0),
+                                                KeepAliveHandler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = "http://127.0.0.1:{}/".format(self.server.server_port)
+
+    def test_connections_reused(self):
+        http = cloud.HTTPSession(pool_size=2)
+        for _ in range(3):
+            http.session.get(self.url)
+        self.assertEqual({"hosts": 1, "connections": 1, "requests": 3,
+                          "reused": 2}, http.stats())
+
+    def test_default_pool_size(self):
+        http = cloud.HTTPSession()
+        self.assertEqual(cloud.flows.WORKERS, http.pool_size)
+
+    def test_configured_pool_size(self):
+        workers = cloud.flows.WORKERS + 10
+        http = cloud.HTTPSession()
+        adapter = http.adapter
+        http.configure({"flow_workers": workers})
+        self.assertEqual(workers, http.pool_size)
+        self.assertIsNot(adapter, http.adapter)
+        self.assertIs(http.adapter, http.session.get_adapter(self.url))
+        self.assertEqual(cloud.flows.WORKERS,
+                         cloud.HTTPSession().pool_size)
+
+    def test_explicit_pool_size(self):
+        http = cloud.HTTPSession(pool_size=2)
+        http.configure({"flow_workers": cloud.flows.WORKERS + 10})
+        self.assertEqual(2, http.pool_size)
+
+
 if __name__ == '__main__':
     unittest.main()
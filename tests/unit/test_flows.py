@@ -0,0 +1,176 @@
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mock import Mock
+from taskflow.patterns import linear_flow
+from taskflow.patterns import unordered_flow
+from taskflow import task
+
+from pumphouse import exceptions
+from pumphouse import flows
+
+
+class Sleep(task.Task):
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def execute(self, server_info):
+        with Sleep.lock:
+            Sleep.running += 1
+            Sleep.peak = max(Sleep.peak, Sleep.running)
+        threading.Event().wait(0.05)
+        with Sleep.lock:
+            Sleep.running -= 1
+        return server_info["id"]
+
+
+class SleepSubclass(Sleep):
+    pass
+
+
+class TestParseLimit(unittest.TestCase):
+    def test_number(self):
+        self.assertEqual((4, False), flows.parse_limit(4))
+        self.assertEqual((4, False), flows.parse_limit("4"))
+
+    def test_per_host(self):
+        self.assertEqual((2, True), flows.parse_limit("2 per host"))
+
+    def test_unknown_scope(self):
+        self.assertRaises(ValueError, flows.parse_limit, "2 per tenant")
+
+
+class TestLimitedExecutor(unittest.TestCase):
+    def setUp(self):
+        Sleep.running = Sleep.peak = 0
+
+    def make_flow(self, hosts, task_cls=Sleep):
+        flow = unordered_flow.Flow("test")
+        store = {}
+        for i, host in enumerate(hosts):
+            name = "server-{}".format(i)
+            store[name] = {
+                "id": name,
+                "OS-EXT-SRV-ATTR:hypervisor_hostname": host,
+            }
+            flow.add(task_cls(name="sleep-{}".format(i),
+                              provides="result-{}".format(i),
+                              rebind=[name]))
+        return flow, store
+
+    def test_class_limit(self):
+        flow, store = self.make_flow(["h1"] * 4, SleepSubclass)
+        result = flows.run_flow(flow, store, {
+            "flow_workers": 4,
+            "flow_task_limits": {"Sleep": 1},
+        })
+        self.assertEqual(1, Sleep.peak)
+        self.assertEqual("server-3", result["result-3"])
+
+    def test_per_host_limit(self):
+        flow, store = self.make_flow(["h1", "h1", "h2", "h2"])
+        flows.run_flow(flow, store, {
+            "flow_workers": 4,
+            "flow_task_limits": {"Sleep": "1 per host"},
+        })
+        self.assertLessEqual(Sleep.peak, 2)
+
+    def test_per_host_limit_without_host(self):
+        executor = flows.LimitedExecutor(max_workers=2,
+                                         limits={"Sleep": "1 per host"})
+        self.assertEqual((None, None), executor._slot(Sleep(name="s"), {}))
+        self.assertEqual((("Sleep", "h1"), 1), executor._slot(
+            Sleep(name="s"),
+            {"server_info": {"OS-EXT-SRV-ATTR:hypervisor_hostname": "h1"}}))
+        executor.shutdown(wait=True)
+
+    def test_reserve(self):
+        reserved = []
+
+        class Reserved(Sleep):
+            def reserve(self, arguments, start):
+                reserved.append(start)
+
+        executor = flows.LimitedExecutor(max_workers=1)
+        waiting = executor.submit(lambda t, a: "waiting", Reserved(name="r"),
+                                  {})
+        running = executor.submit(lambda t, a: "running", Sleep(name="s"), {})
+        self.assertEqual("running", running.result(1))
+        self.assertFalse(waiting.done())
+        free = Mock()
+        reserved[0](free)
+        self.assertEqual("waiting", waiting.result(1))
+        executor.shutdown(wait=True)
+        free.assert_called_once_with()
+
+    def test_stats(self):
+        executor = flows.LimitedExecutor(max_workers=1,
+                                         limits={"Sleep": 1})
+        futures = [executor.submit(lambda t, a: a["server_info"]["id"],
+                                   Sleep(name=str(i)),
+                                   {"server_info": {"id": i}})
+                   for i in range(3)]
+        self.assertEqual([0, 1, 2], [f.result() for f in futures])
+        executor.shutdown(wait=True)
+        number, waited = executor.stats()["Sleep"]
+        self.assertEqual(3, number)
+        self.assertGreaterEqual(waited, 0)
+
+
+class Count(task.Task):
+    def __init__(self, calls, fail=False, *args, **kwargs):
+        super(Count, self).__init__(*args, **kwargs)
+        self.calls = calls
+        self.fail = fail
+
+    def execute(self):
+        self.calls.append(self.name)
+        if self.fail:
+            raise RuntimeError(self.name)
+        return self.name
+
+
+class TestCheckpointedRun(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        self.config = {
+            "flow_persistence": {
+                "connection": "dir",
+                "path": self.path,
+            },
+        }
+
+    def make_flow(self, calls, fail=False):
+        return linear_flow.Flow("test").add(
+            Count(calls, name="first", provides="first"),
+            Count(calls, fail=fail, name="second", provides="second"),
+            Count(calls, name="third", provides="third"),
+        )
+
+    def test_resume(self):
+        calls = []
+        self.assertRaises(RuntimeError, flows.run_flow,
+                          self.make_flow(calls, fail=True), {}, self.config,
+                          run_id="run")
+        self.assertEqual(["first", "second"], calls)
+
+        calls = []
+        result = flows.run_flow(self.make_flow(calls), {}, self.config,
+                                run_id="run", resume=True)
+        self.assertEqual(["second", "third"], calls)
+        self.assertEqual("first", result["first"])
+        self.assertEqual("third", result["third"])
+
+    def test_resume_unknown_run(self):
+        self.assertRaises(exceptions.NotFound, flows.run_flow,
+                          self.make_flow([]), {}, self.config,
+                          run_id="run", resume=True)
+
+    def test_resume_without_persistence(self):
+        self.assertRaises(exceptions.ConfigError, flows.run_flow,
+                          self.make_flow([]), {}, {}, run_id="run",
+                          resume=True)
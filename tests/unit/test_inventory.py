@@ -0,0 +1,65 @@
+import unittest
+
+from mock import Mock
+
+from pumphouse import inventory
+
+
+class TestPaginate(unittest.TestCase):
+    def test_pages(self):
+        resources = [{"id": str(i)} for i in range(5)]
+
+        def list_page(marker, limit):
+            start = 0 if marker is None else int(marker) + 1
+            return resources[start:start + limit]
+
+        list_page = Mock(side_effect=list_page)
+        self.assertEqual(resources, list(inventory.paginate(list_page, 2)))
+        self.assertEqual(3, list_page.call_count)
+        list_page.assert_called_with(marker="3", limit=2)
+
+    def test_marker_ignored(self):
+        resources = [{"id": str(i)} for i in range(3)]
+        list_page = Mock(return_value=resources)
+        self.assertEqual(resources, list(inventory.paginate(list_page, 3)))
+        self.assertEqual(2, list_page.call_count)
+
+
+class TestCloudInventory(unittest.TestCase):
+    def setUp(self):
+        self.cloud = Mock()
+        self.servers = [
+            Mock(id="s1", tenant_id="t1", status="ACTIVE",
+                 **{"OS-EXT-SRV-ATTR:hypervisor_hostname": "h1"}),
+            Mock(id="s2", tenant_id="t2", status="ACTIVE",
+                 **{"OS-EXT-SRV-ATTR:hypervisor_hostname": "h1"}),
+            Mock(id="s3", tenant_id="t1", status="SHUTOFF",
+                 **{"OS-EXT-SRV-ATTR:hypervisor_hostname": "h2"}),
+        ]
+        self.cloud.nova.servers.list.return_value = self.servers
+        self.inventory = inventory.CloudInventory(self.cloud, limit=10)
+
+    def test_indexes(self):
+        self.assertIs(self.servers[1], self.inventory.get("servers", "s2"))
+        self.assertEqual([self.servers[0], self.servers[2]],
+                         self.inventory.find("servers", "tenant", "t1"))
+        self.assertEqual(self.servers[:2],
+                         self.inventory.find("servers", "host", "h1"))
+        self.assertEqual([self.servers[2]],
+                         self.inventory.find("servers", "status", "SHUTOFF"))
+        self.assertEqual([], self.inventory.find("servers", "tenant", "t3"))
+        self.assertEqual(self.servers, list(self.inventory.servers))
+        self.cloud.nova.servers.list.assert_called_once_with(
+            search_opts={"all_tenants": 1}, marker=None, limit=10)
+
+    def test_networks(self):
+        networks = [{"id": "n1", "tenant_id": "t1", "status": "ACTIVE"}]
+        self.cloud.neutron.list_networks.return_value = {
+            "networks": networks,
+        }
+        self.inventory.plugins = {"network": "neutron"}
+        self.assertEqual(networks,
+                         self.inventory.find("networks", "tenant", "t1"))
+
+    def test_unknown_type(self):
+        self.assertRaises(AttributeError, getattr, self.inventory, "keys")
@@ -0,0 +1,63 @@
+import unittest
+
+from mock import Mock
+
+from pumphouse import mapping
+
+
+class TestRegistry(unittest.TestCase):
+    destination = "http://destination"
+
+    def setUp(self):
+        self.registry = mapping.Registry()
+        self.registry.configure(":memory:", source="http://source")
+        self.cloud = Mock()
+        self.cloud.namespace.auth_url = self.destination
+        self.get_resource = Mock(return_value={"id": "dst", "name": "a"})
+
+    def lookup(self):
+        return self.registry.lookup(self.cloud, "flavor", "src",
+                                    self.get_resource, KeyError,
+                                    check=lambda r: r["name"] == "a")
+
+    def get(self, destination=destination, resource_type="flavor"):
+        return self.registry.get(destination, resource_type, "src")
+
+    def test_disabled(self):
+        registry = mapping.Registry()
+        registry.remember(self.cloud, "flavor", "src", "dst")
+        self.assertFalse(registry.enabled)
+        self.assertIsNone(registry.get(self.destination, "flavor", "src"))
+
+    def test_remember(self):
+        self.registry.remember(self.cloud, "flavor", "src", "dst")
+        self.assertEqual("dst", self.get())
+        self.assertIsNone(self.get(destination="http://other"))
+        self.assertIsNone(self.get(resource_type="user"))
+
+    def test_other_source(self):
+        self.registry.remember(self.cloud, "flavor", "src", "dst")
+        self.registry.source = "http://other"
+        self.assertIsNone(self.lookup())
+        self.assertFalse(self.get_resource.called)
+
+    def test_lookup(self):
+        self.assertIsNone(self.lookup())
+        self.registry.remember(self.cloud, "flavor", "src", "dst")
+        self.assertEqual(self.get_resource.return_value, self.lookup())
+        self.get_resource.assert_called_once_with("dst")
+        self.assertEqual({"hits": 1, "misses": 1}, self.registry.stats())
+
+    def test_lookup_missing(self):
+        self.registry.remember(self.cloud, "flavor", "src", "dst")
+        self.get_resource.side_effect = KeyError
+        self.assertIsNone(self.lookup())
+        self.assertIsNone(self.get())
+
+    def test_lookup_verify(self):
+        self.registry.remember(self.cloud, "flavor", "src", "dst")
+        self.get_resource.return_value = {"id": "dst", "name": "b"}
+        self.assertEqual(self.get_resource.return_value, self.lookup())
+        self.registry.verify = True
+        self.assertIsNone(self.lookup())
+        self.assertIsNone(self.get())
@@ -0,0 +1,90 @@
+import threading
+import unittest
+
+from pumphouse import scheduler
+
+
+class TestVolumeScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = scheduler.VolumeScheduler(
+            stage_limits={"upload": 1}, backend_limit=1)
+
+    def run_in_thread(self, stage, server_id, host, started, release):
+        def run():
+            with self.scheduler.slot(stage, server_id, host):
+                started.append(server_id)
+                release.wait()
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def wait_waiting(self, number):
+        while True:
+            with self.scheduler.cond:
+                if len(self.scheduler.waiting) >= number:
+                    return
+
+    def test_not_limited(self):
+        with self.scheduler.slot("relay", "s1"):
+            with self.scheduler.slot("relay", "s2"):
+                pass
+        self.assertEqual({}, self.scheduler.stats())
+
+    def test_stage_limit(self):
+        started, release = [], threading.Event()
+        with self.scheduler.slot("upload", "s1", "host1"):
+            thread = self.run_in_thread("upload", "s2", "host2",
+                                        started, release)
+            self.wait_waiting(1)
+            self.assertEqual([], started)
+        release.set()
+        thread.join()
+        self.assertEqual(["s2"], started)
+        self.assertIn("upload", self.scheduler.stats())
+
+    def test_backend_limit(self):
+        started, release = [], threading.Event()
+        with self.scheduler.slot("clone", "s1", "host1"):
+            with self.scheduler.slot("clone", "s2", "host2"):
+                thread = self.run_in_thread("clone", "s3", "host1",
+                                            started, release)
+                self.wait_waiting(1)
+                self.assertEqual([], started)
+        release.set()
+        thread.join()
+        self.assertEqual(["s3"], started)
+
+    def test_priority(self):
+        started, release = [], threading.Event()
+        release.set()
+        # NOTE: s1 asks first and has the highest priority
+        with self.scheduler.slot("clone", "s1", "host1"):
+            pass
+        with self.scheduler.slot("upload", "s3", "host3"):
+            later = self.run_in_thread("upload", "s2", "host2",
+                                       started, release)
+            self.wait_waiting(1)
+            earlier = self.run_in_thread("upload", "s1", "host1",
+                                         started, release)
+            self.wait_waiting(2)
+        later.join()
+        earlier.join()
+        self.assertEqual(["s1", "s2"], started)
+
+    def test_reserve(self):
+        started = []
+        with self.scheduler.slot("upload", "s1", "host1"):
+            self.scheduler.reserve("upload", "s2", "host2", started.append)
+            self.assertEqual([], started)
+            self.assertEqual(1, len(self.scheduler.waiting))
+        self.assertEqual(1, len(started))
+        self.assertEqual(1, self.scheduler.running[("stage", "upload")])
+        started[0]()
+        self.assertEqual(0, self.scheduler.running[("stage", "upload")])
+
+    def test_from_config(self):
+        volume_scheduler = scheduler.VolumeScheduler.from_config({
+            "volume_stage_limits": {"relay": 4},
+        })
+        self.assertEqual({"relay": 4}, volume_scheduler.stage_limits)
+        self.assertEqual(2, volume_scheduler.backend_limit)
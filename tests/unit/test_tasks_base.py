@@ -137,3 +137,44 @@ class TasksBaseTestCase(unittest.TestCase):
             map(mock.call, servers),
         )
         self.assertEqual(len(env.method_calls), 2 + len(servers))
+
+
+class ProcessTasksTestCase(unittest.TestCase):
+    def make_task(self, name, requires=(), includes=()):
+        return base.tasks.Task(None, name, None, requires=requires,
+                               includes=includes)
+
+    def test_expand_tasks(self):
+        tenant = self.make_task("tenant")
+        image = self.make_task("image")
+        server1 = self.make_task("server1", requires=[tenant, image])
+        server2 = self.make_task("server2", requires=[image, tenant])
+        workload = self.make_task("workload", requires=[server1],
+                                  includes=[server2])
+
+        self.assertEqual([tenant, image, server1, server2, workload],
+                         list(base.tasks.expand_tasks([workload, server2])))
+
+    def test_expand_shared_dependencies(self):
+        # NOTE: every layer doubles the number of paths to the bottom.
+        bottom = top = self.make_task("bottom")
+        for i in xrange(64):
+            left = self.make_task("left", requires=[top])
+            right = self.make_task("right", requires=[top])
+            top = self.make_task("top", requires=[left, right])
+
+        tasks = list(base.tasks.expand_tasks([top]))
+        self.assertEqual(1 + 64 * 3, len(tasks))
+        self.assertIs(bottom, tasks[0])
+        self.assertIs(top, tasks[-1])
+
+    def test_process_tasks(self):
+        server = self.make_task("server")
+        workload = self.make_task("workload", includes=[server])
+
+        tasks = list(base.tasks.process_tasks([workload]))
+        self.assertEqual(["server", "workload", "workload__post"],
+                         [task.name for task in tasks])
+        new_server, new_workload, post_workload = tasks
+        self.assertEqual(set([new_server]), new_workload.before)
+        self.assertEqual(set([new_server]), post_workload.after)
@@ -0,0 +1,393 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mock import Mock, patch
+
+from pumphouse import exceptions
+from pumphouse import transfer
+
+
+class TestTokenBucket(unittest.TestCase):
+    @patch.object(transfer.time, "sleep")
+    @patch.object(transfer.time, "time")
+    def test_consume(self, time, sleep):
+        time.return_value = 100
+        bucket = transfer.TokenBucket(rate=10)
+        bucket.consume(5)
+        sleep.assert_called_once_with(0.5)
+        time.return_value = 102
+        sleep.reset_mock()
+        bucket.consume(5)
+        self.assertFalse(sleep.called)
+
+    @patch.object(transfer.time, "sleep")
+    def test_unlimited(self, sleep):
+        bucket = transfer.TokenBucket()
+        bucket.consume(1024)
+        bucket.configure(rate=1)
+        bucket.configure(rate=None)
+        bucket.consume(1024)
+        self.assertFalse(sleep.called)
+
+
+class TestBandwidth(unittest.TestCase):
+    def test_configure(self):
+        bandwidth = transfer.Bandwidth()
+        bucket = bandwidth.bucket("source:destination")
+        self.assertIsNone(bucket.rate)
+        bandwidth.configure({"source:destination": 1024})
+        self.assertEqual(1024, bucket.rate)
+        self.assertEqual({"source:destination": 1024}, bandwidth.limits())
+
+    @patch.object(transfer, "bandwidth")
+    def test_relay_throttled(self, bandwidth):
+        bucket = bandwidth.bucket.return_value
+        upload = Mock(side_effect=lambda data: data.read())
+        transfer.Transfer().relay(iter(["ab", "cde"]), 5, Mock(), upload,
+                                  Mock(), route="src:dst")
+        bandwidth.bucket.assert_called_once_with("src:dst")
+        self.assertEqual([((2,),), ((3,),)], bucket.consume.call_args_list)
+
+    @patch.object(transfer, "bandwidth")
+    def test_relay_spooled_throttled_once(self, bandwidth):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        bucket = bandwidth.bucket.return_value
+        upload = Mock(side_effect=lambda data: data.read())
+        settings = transfer.Transfer(spool=transfer.Spool([directory]))
+        settings.relay(iter(["ab", "cde"]), 5, Mock(), upload, Mock(),
+                       route="src:dst")
+        self.assertEqual(5, sum(args[0] for args, _ in
+                                bucket.consume.call_args_list))
+
+
+class TestDigests(unittest.TestCase):
+    def test_relay(self):
+        settings = transfer.Transfer(checksums=["sha256"])
+        upload = Mock(side_effect=lambda data: data.read())
+        result, digests = settings.relay(
+            iter(["ab", "c"]), 3, Mock(), upload, Mock(return_value="image"),
+            checksum=hashlib.md5("abc").hexdigest())
+        self.assertEqual("image", result)
+        self.assertEqual({"md5": hashlib.md5("abc").hexdigest(),
+                          "sha256": hashlib.sha256("abc").hexdigest()},
+                         digests)
+
+    def test_relay_mismatch(self):
+        upload = Mock(side_effect=lambda data: data.read())
+        confirm = Mock()
+        self.assertRaises(exceptions.ChecksumMismatch,
+                          transfer.Transfer().relay, iter(["abc"]), 3,
+                          Mock(), upload, confirm, checksum="0" * 32)
+        self.assertFalse(confirm.called)
+
+    def test_verify_without_checksum(self):
+        transfer.verify_checksum({"md5": "0" * 32}, None, "data")
+
+
+class TestRangedDownload(unittest.TestCase):
+    def setUp(self):
+        self.content = "".join(chr(ord("a") + i) for i in range(26))
+
+    def fetch_range(self, start, end):
+        return True, iter([self.content[start:end + 1]])
+
+    def test_order(self):
+        delays = {1: threading.Event()}
+
+        def fetch_range(start, end):
+            # NOTE: the second part is finished after all others.
+            if start == 5:
+                delays[1].wait(1)
+            elif start == 25:
+                delays[1].set()
+            return self.fetch_range(start, end)
+
+        download = transfer.RangedDownload(fetch_range, 26, 4, 5)
+        self.assertEqual(self.content, "".join(download))
+
+    def test_window(self):
+        fetched = []
+
+        def fetch_range(start, end):
+            fetched.append(start)
+            return self.fetch_range(start, end)
+
+        download = iter(transfer.RangedDownload(fetch_range, 26, 2, 1))
+        self.assertEqual("a", next(download))
+        for _ in range(100):
+            if len(fetched) == 5:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual([0, 1, 2, 3, 4], sorted(fetched))
+        self.assertEqual(self.content[1:], "".join(download))
+
+    def test_failed_part(self):
+        def fetch_range(start, end):
+            if start == 10:
+                raise IOError("Connection reset")
+            return self.fetch_range(start, end)
+
+        download = transfer.RangedDownload(fetch_range, 26, 2, 5)
+        self.assertRaises(IOError, "".join, download)
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.chunks = ["a" * 5, "b" * 3, "c" * 9]
+        self.reporter = Mock()
+
+    def make_stream(self, data, chunk_size=4, depth=2):
+        return transfer.Stream(data, 17, self.reporter, chunk_size, depth)
+
+    def test_read_amt(self):
+        stream = self.make_stream(iter(self.chunks))
+        self.assertEqual("aaaaab", stream.read(6))
+        self.assertEqual("bbccccccccc", stream.read(100))
+        self.assertEqual("", stream.read(6))
+        self.assertTrue(stream.isclosed())
+        self.reporter.set_size.assert_called_once_with(17)
+        self.assertEqual(17, sum(call[0][0] for call in
+                                 self.reporter.update.call_args_list))
+
+    def test_read_all(self):
+        stream = self.make_stream(iter(self.chunks), chunk_size=1024)
+        self.assertEqual("".join(self.chunks), stream.read())
+
+    def test_source_error(self):
+        def data():
+            yield "a" * 4
+            raise IOError("Connection reset")
+
+        stream = self.make_stream(data())
+        self.assertEqual("aaaa", stream.read(4))
+        self.assertRaises(IOError, stream.read, 4)
+
+    def test_close(self):
+        data = Mock()
+        data.__iter__ = Mock(return_value=iter(["a" * 4] * 100))
+        stream = self.make_stream(data, depth=1)
+        self.assertEqual("aaaa", stream.read(4))
+        stream.close()
+        stream.reader.join(1)
+        self.assertFalse(stream.reader.is_alive())
+        data.close.assert_called_once_with()
+        self.assertTrue(stream.isclosed())
+        free = stream.free.qsize()
+        stream.close()
+        self.assertEqual(free, stream.free.qsize())
+
+    def test_close_generator(self):
+        reading = threading.Event()
+        closing = threading.Event()
+        closed = []
+
+        def data():
+            try:
+                yield "a" * 4
+                reading.set()
+                closing.wait()
+                yield "b" * 4
+            finally:
+                closed.append(True)
+
+        stream = self.make_stream(data(), depth=1)
+        self.assertEqual("aaaa", stream.read(4))
+        reading.wait()
+        stream.close()
+        closing.set()
+        stream.reader.join(1)
+        self.assertFalse(stream.reader.is_alive())
+        self.assertEqual([True], closed)
+        self.assertTrue(stream.filled.empty())
+
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.spool = transfer.Spool([self.directory], max_size=16)
+        self.reporter = Mock()
+
+    def test_spooled(self):
+        with self.spool.spooled(iter(["abc", "def"]), 6) as path:
+            self.assertEqual(6, self.spool.used[self.directory])
+            reader = transfer.SpoolReader(path, 6, self.reporter)
+            self.assertEqual("abcd", reader.read(4))
+            self.assertEqual("ef", reader.read())
+            self.assertEqual("", reader.read(4))
+            reader.close()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(0, self.spool.used[self.directory])
+
+    def test_size_limit(self):
+        with self.spool.spooled(iter(["a" * 17]), 17) as path:
+            self.assertIsNone(path)
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_free_space(self):
+        self.spool.max_size = None
+        with patch.object(self.spool, "free_space", return_value=10):
+            with self.spool.spooled(iter(["a" * 11]), 11) as path:
+                self.assertIsNone(path)
+
+    def test_relay_retries(self):
+        uploads = []
+
+        def upload(reader):
+            uploads.append(reader.read())
+            if len(uploads) < 3:
+                raise IOError("Connection reset")
+
+        settings = transfer.Transfer(spool=self.spool, retries=2)
+        confirm = Mock(side_effect=lambda: os.listdir(self.directory))
+        spooled, digests = settings.relay(iter(["abc", "def"]), 6,
+                                          self.reporter, upload, confirm)
+        self.assertEqual(["abcdef"] * 3, uploads)
+        self.assertEqual(1, len(spooled))
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_relay_mismatch(self):
+        upload = Mock()
+        settings = transfer.Transfer(spool=self.spool)
+        self.assertRaises(exceptions.ChecksumMismatch, settings.relay,
+                          iter(["abc"]), 3, self.reporter, upload, Mock(),
+                          checksum="0" * 32)
+        self.assertFalse(upload.called)
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_relay_fails(self):
+        upload = Mock(side_effect=IOError)
+        confirm = Mock()
+        settings = transfer.Transfer(spool=self.spool, retries=1)
+        self.assertRaises(IOError, settings.relay, iter(["abc"]), 3,
+                          self.reporter, upload, confirm)
+        self.assertEqual(2, upload.call_count)
+        self.assertFalse(confirm.called)
+        self.assertEqual([], os.listdir(self.directory))
+
+
+class TestImageIndex(unittest.TestCase):
+    def setUp(self):
+        self.cloud = Mock()
+        self.cloud.glance.images.list.return_value = [
+            {"id": "i1", "status": "active", "checksum": "c1", "size": 1},
+            {"id": "i2", "status": "queued", "checksum": "c2", "size": 2},
+            {"id": "i3", "status": "active", "checksum": None, "size": 3},
+        ]
+        self.index = transfer.ImageIndex()
+
+    def test_existing(self):
+        upload = Mock()
+        image = self.index.ensure(self.cloud, {"checksum": "c1", "size": 1},
+                                  upload)
+        self.assertEqual("i1", image["id"])
+        self.assertFalse(upload.called)
+
+    def test_upload(self):
+        upload = Mock(return_value={"id": "i4"})
+        image_info = {"id": "s2", "checksum": "c2", "size": 2}
+        self.assertEqual("i4", self.index.ensure(self.cloud, image_info,
+                                                 upload)["id"])
+        self.assertEqual("i4", self.index.ensure(self.cloud, image_info,
+                                                 upload)["id"])
+        upload.assert_called_once_with()
+        self.cloud.glance.images.list.assert_called_once_with()
+
+    def test_without_checksum(self):
+        upload = Mock()
+        image_info = {"id": "s3", "checksum": None, "size": 3}
+        self.index.ensure(self.cloud, image_info, upload)
+        self.index.ensure(self.cloud, image_info, upload)
+        self.assertEqual(2, upload.call_count)
+
+    def test_single_flight(self):
+        started = threading.Event()
+        finish = threading.Event()
+        image_info = {"id": "s5", "checksum": "c5", "size": 5}
+        results = []
+
+        def upload():
+            started.set()
+            finish.wait()
+            return {"id": "i5"}
+
+        def ensure():
+            results.append(self.index.ensure(self.cloud, image_info, upload))
+
+        first = threading.Thread(target=ensure)
+        first.start()
+        started.wait()
+        second = threading.Thread(target=ensure)
+        second.start()
+        finish.set()
+        first.join()
+        second.join()
+        self.assertEqual([{"id": "i5"}] * 2, results)
+        self.assertEqual(1, self.index.hits)
+
+    def test_private(self):
+        self.cloud.glance.images.list.return_value = [
+            {"id": "i1", "status": "active", "checksum": "c1", "size": 1,
+             "name": "image", "visibility": "private", "owner": "t1"},
+        ]
+        image_info = {"id": "s1", "checksum": "c1", "size": 1,
+                      "name": "image", "visibility": "private",
+                      "owner": "src"}
+        upload = Mock(return_value={"id": "i2"})
+        self.assertEqual("i1", self.index.ensure(self.cloud, image_info,
+                                                 upload, owner="t1")["id"])
+        self.assertEqual("i2", self.index.ensure(self.cloud, image_info,
+                                                 upload, owner="t2")["id"])
+        upload.assert_called_once_with()
+
+    def test_failed_load(self):
+        self.cloud.glance.images.list.side_effect = [
+            IOError, self.cloud.glance.images.list.return_value]
+        upload = Mock()
+        self.assertRaises(IOError, self.index.ensure, self.cloud,
+                          {"checksum": "c1", "size": 1}, upload)
+        image = self.index.ensure(self.cloud, {"checksum": "c1", "size": 1},
+                                  upload)
+        self.assertEqual("i1", image["id"])
+        self.assertFalse(upload.called)
+
+    def test_discard(self):
+        upload = Mock(return_value={"id": "i4"})
+        self.index.ensure(self.cloud, {"checksum": "c1", "size": 1}, upload)
+        self.index.discard("i1")
+        image = self.index.ensure(self.cloud, {"checksum": "c1", "size": 1},
+                                  upload)
+        self.assertEqual("i4", image["id"])
+        upload.assert_called_once_with()
+
+    def test_failed_upload(self):
+        image_info = {"id": "s5", "checksum": "c5", "size": 5}
+        upload = Mock(side_effect=[IOError, {"id": "i5"}])
+        self.assertRaises(IOError, self.index.ensure, self.cloud,
+                          image_info, upload)
+        self.assertEqual("i5", self.index.ensure(self.cloud, image_info,
+                                                 upload)["id"])
+
+
+class TestTransfer(unittest.TestCase):
+    def test_from_config(self):
+        settings = transfer.Transfer.from_config({"transfer_chunk_size": 8})
+        self.assertEqual(8, settings.chunk_size)
+        self.assertEqual(transfer.Transfer.default_depth, settings.depth)
+        self.assertIsNone(settings.spool)
+        stream = settings.stream(iter(["data"]), 4, Mock())
+        self.assertEqual("data", stream.read(8))
+
+    def test_from_config_spool(self):
+        settings = transfer.Transfer.from_config({
+            "transfer_spool_dirs": ["/tmp"],
+            "transfer_spool_size": 1024,
+        })
+        self.assertEqual(["/tmp"], settings.spool.directories)
+        self.assertEqual(1024, settings.spool.max_size)
+        self.assertEqual(transfer.Transfer.default_retries, settings.retries)
@@ -58,6 +58,7 @@ class TestWaitFor(unittest.TestCase):
 
         time_patcher = patch("pumphouse.utils.time")
         self.time = time_patcher.start()
+        self.addCleanup(time_patcher.stop)
         self.time.time.side_effect = [100, 200, 300]
 
     def test_wait_for_success_on_first_pass(self):
@@ -109,5 +110,67 @@ class TestWaitFor(unittest.TestCase):
                 check_interval=self.check_interval
             )
 
+
+class TestPolling(unittest.TestCase):
+    def setUp(self):
+        self.history = utils.PollingHistory(size=3, first_check=0.5)
+        history_patcher = patch("pumphouse.utils.polling_history",
+                                self.history)
+        history_patcher.start()
+        self.addCleanup(history_patcher.stop)
+        time_patcher = patch("pumphouse.utils.time")
+        self.time = time_patcher.start()
+        self.addCleanup(time_patcher.stop)
+        self.resource = Mock(status="ACTIVE")
+        self.update_resource = Mock(return_value=self.resource)
+
+    def test_profile_intervals(self):
+        profile = utils.PollingProfile(interval=1, factor=2, max_interval=5,
+                                       jitter=0)
+        intervals = profile.intervals()
+        self.assertEqual([next(intervals) for _ in range(5)],
+                         [1, 2, 4, 5, 5])
+
+    def test_profile_jitter(self):
+        profile = utils.PollingProfile(interval=10, jitter=0.1)
+        interval = next(profile.intervals())
+        self.assertTrue(9 <= interval <= 11)
+
+    def test_history_median(self):
+        key = ("src", "server.boot")
+        self.assertEqual(self.history.first_delay(key), 0)
+        for duration in (10, 30, 20, 40):
+            self.history.record(key, duration, 1, 1)
+        self.assertEqual(self.history.first_delay(key), 15)
+        self.assertEqual(self.history.first_delay(("dst", "server.boot")),
+                         0)
+
+    def test_wait_for_profile_saves_polls(self):
+        self.time.time.side_effect = [100, 120, 140]
+        self.update_resource.side_effect = [Mock(status="BUILD"),
+                                            self.resource]
+        result = utils.wait_for("id", self.update_resource,
+                                profile="server.boot", history_key="src")
+        self.assertEqual(result, self.resource)
+        self.assertEqual(self.update_resource.call_count, 2)
+        self.assertEqual(self.history.stats(), {"polls": 2, "saved": 39})
+        self.assertEqual(self.history.first_delay(("src", "server.boot")),
+                         20)
+
+    def test_wait_for_profile_first_delay(self):
+        self.history.record(("src", "server.boot"), 40, 1, 1)
+        self.time.time.side_effect = [100, 120]
+        utils.wait_for("id", self.update_resource,
+                       profile="server.boot", history_key="src")
+        self.time.sleep.assert_called_once_with(20)
+        self.update_resource.assert_called_once_with("id")
+
+    def test_wait_for_without_profile(self):
+        self.time.time.side_effect = [100]
+        utils.wait_for("id", self.update_resource)
+        self.assertFalse(self.time.sleep.called)
+        self.assertEqual(self.history.stats(), {"polls": 0, "saved": 0})
+
+
 if __name__ == '__main__':
     unittest.main()
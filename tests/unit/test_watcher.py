@@ -0,0 +1,159 @@
+import threading
+import unittest
+
+from mock import Mock, patch
+
+from pumphouse import watcher
+
+
+class TestStatusWatcher(unittest.TestCase):
+    def setUp(self):
+        self.resources = [{"id": "r1", "status": "ACTIVE"},
+                          {"id": "r2", "status": "BUILD"}]
+        self.list_resources = Mock(return_value=self.resources)
+        self.get_resource = Mock()
+        self.watcher = watcher.StatusWatcher(self.list_resources,
+                                             self.get_resource,
+                                             interval=0.01, min_waiters=1)
+
+    def test_shared_listing(self):
+        results = {}
+        barrier = threading.Event()
+
+        def list_resources():
+            barrier.wait()
+            return self.resources
+
+        self.list_resources.side_effect = list_resources
+
+        def get(resource_id):
+            results[resource_id] = self.watcher.get(resource_id)
+
+        threads = [threading.Thread(target=get, args=(resource_id,))
+                   for resource_id in ("r1", "r2")]
+        for thread in threads:
+            thread.start()
+        barrier.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({"r1": self.resources[0], "r2": self.resources[1]},
+                         results)
+        self.assertLessEqual(self.list_resources.call_count, 2)
+        self.assertFalse(self.get_resource.called)
+
+    def test_listing_in_progress(self):
+        started = threading.Event()
+        finish = threading.Event()
+        listings = [[{"id": "r1", "status": "ACTIVE"}],
+                    [{"id": "r1", "status": "MIGRATING"}]]
+
+        def list_resources():
+            if not started.is_set():
+                started.set()
+                finish.wait()
+            return listings.pop(0)
+
+        self.list_resources.side_effect = list_resources
+        waiting = threading.Event()
+        wait = self.watcher.cond.wait
+
+        def wait_listing(*args):
+            waiting.set()
+            return wait(*args)
+
+        self.watcher.cond.wait = wait_listing
+        first = threading.Thread(target=self.watcher.get, args=("r1",))
+        first.start()
+        started.wait()
+        results = []
+        second = threading.Thread(
+            target=lambda: results.append(self.watcher.get("r1")))
+        second.start()
+        waiting.wait()
+        finish.set()
+        first.join()
+        second.join()
+        self.assertEqual([{"id": "r1", "status": "MIGRATING"}], results)
+        self.assertEqual(2, self.list_resources.call_count)
+
+    def test_missing_resource(self):
+        self.get_resource.side_effect = KeyError
+        self.assertRaises(KeyError, self.watcher.get, "r3")
+        self.get_resource.assert_called_once_with("r3")
+
+    def test_failed_listing(self):
+        self.list_resources.side_effect = Exception
+        self.assertIs(self.get_resource.return_value,
+                      self.watcher.get("r1"))
+        self.watcher.get("r1")
+        self.assertEqual(1, self.list_resources.call_count)
+        self.assertEqual({"lists": 1, "gets": 2, "hits": 0},
+                         self.watcher.stats())
+
+    def test_few_waiters(self):
+        self.watcher.min_waiters = 3
+        self.watcher.get("r1")
+        self.watcher.get("r2")
+        self.assertFalse(self.list_resources.called)
+        self.assertEqual(2, self.get_resource.call_count)
+        self.watcher.get("r3")
+        self.assertIs(self.resources[0], self.watcher.get("r1"))
+        self.assertEqual(2, self.list_resources.call_count)
+        self.assertEqual(3, self.get_resource.call_count)
+
+    @patch.object(watcher.time, "time")
+    def test_expired_waiters(self, time):
+        self.watcher.min_waiters = 2
+        self.watcher.active_interval = 10
+        time.return_value = 100
+        self.watcher.get("r1")
+        time.return_value = 111
+        self.watcher.get("r2")
+        self.assertFalse(self.list_resources.called)
+        self.assertEqual(2, self.get_resource.call_count)
+
+    def test_no_listing(self):
+        self.watcher.list_resources = None
+        self.assertIs(self.get_resource.return_value,
+                      self.watcher.get("r1"))
+        self.get_resource.assert_called_once_with("r1")
+
+    @patch.object(watcher.time, "sleep")
+    def test_interval(self, sleep):
+        self.watcher.interval = 10
+        self.watcher.get("r1")
+        self.assertFalse(sleep.called)
+        self.watcher.get("r2")
+        self.assertTrue(sleep.called)
+        self.assertEqual(2, self.list_resources.call_count)
+
+
+class TestWatch(unittest.TestCase):
+    def test_watch(self):
+        cloud = Mock()
+        servers = watcher.watch(cloud, "servers")
+        self.assertIs(servers, watcher.watch(cloud, "servers"))
+        self.assertIsNot(servers, watcher.watch(cloud, "volumes"))
+        servers.min_waiters = 1
+        cloud.nova.servers.list.return_value = [Mock(id="s1")]
+        self.assertEqual("s1", servers.get("s1").id)
+        cloud.nova.servers.list.assert_called_once_with(
+            search_opts={"all_tenants": 1}, marker=None, limit=1000)
+
+    def test_watch_volumes(self):
+        cloud = Mock()
+        volumes = watcher.watch(cloud, "volumes")
+        volumes.min_waiters = 1
+        cloud.cinder.volumes.list.return_value = [Mock(id="v1")]
+        self.assertEqual("v1", volumes.get("v1").id)
+        cloud.cinder.volumes.list.assert_called_once_with(
+            search_opts={"all_tenants": 1, "limit": 1000})
+
+    def test_watch_images(self):
+        cloud = Mock()
+        images = watcher.watch(cloud, "images")
+        images.min_waiters = 1
+        self.assertIs(cloud.glance.images.get.return_value,
+                      images.get("i1"))
+        cloud.glance.images.get.assert_called_once_with("i1")
+        self.assertFalse(cloud.glance.images.list.called)
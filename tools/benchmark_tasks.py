@@ -0,0 +1,128 @@
+# Copyright (c) 2014 Mirantis Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the License);
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an AS IS BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and#
+# limitations under the License.
+
+"""Measures preparation of tasks of reset workloads
+
+Builds tasks of SetupWorkload and CleanupWorkload for synthetic
+resources without a cloud and reports time and memory of their
+expansion by :func:`pumphouse.tasks.base.tasks.process_tasks` and of
+the creation of the flow. Memory is reported as growth of the resident
+set of the process during every step and as growth of its peak over
+the peak reached before the steps, e.g. by building of resources::
+
+    python tools/benchmark_tasks.py --tenants 10 --servers 125
+"""
+
+import argparse
+import gc
+import resource
+import time
+
+import mock
+
+from pumphouse.tasks.base import runners
+from pumphouse.tasks.base import tasks
+from pumphouse.tasks import reset
+
+
+CLEANUP_COLLECTIONS = ("tenants", "users", "keypairs", "images", "flavors",
+                       "security_groups", "networks", "floating_ips",
+                       "servers", "volumes")
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenants", type=int, default=10,
+                        help="A number of tenants")
+    parser.add_argument("--servers", type=int, default=125,
+                        help="A number of servers of every tenant")
+    parser.add_argument("--volumes", type=int, default=0,
+                        help="A number of volumes of every server")
+    return parser
+
+
+def get_env():
+    cloud = mock.Mock()
+    cloud.nova.services.list.return_value = []
+    return reset.Environment(cloud, {"network": "nova"})
+
+
+def build_setup(args):
+    runner = runners.TaskflowRunner(get_env())
+    workload = runner.get_resource(reset.SetupWorkload, {
+        "id": "benchmark",
+        "populate": {
+            "num_tenants": args.tenants,
+            "num_servers": args.servers,
+            "num_volumes": args.volumes,
+        },
+        "workloads": {},
+    })
+    runner.add(workload.create)
+    return runner, workload
+
+
+def build_cleanup(setup_workload):
+    runner = runners.TaskflowRunner(get_env())
+    workload = runner.get_resource(reset.CleanupWorkload,
+                                   {"id": "benchmark"})
+    for name in CLEANUP_COLLECTIONS:
+        setattr(workload, name, getattr(setup_workload, name))
+    workload.roles = workload.services = workload.offline_services = []
+    runner.add(workload.delete)
+    return runner
+
+
+def get_rss():
+    """Get the resident set size of the process in kilobytes."""
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize() // 1024
+
+
+def get_peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(name, runner):
+    gc.collect()
+    peak = get_peak_rss()
+    rss = get_rss()
+    started = time.time()
+    processed = list(tasks.process_tasks(runner.tasks))
+    expanded = time.time()
+    expanded_rss = get_rss()
+    runner.create_flow()
+    finished = time.time()
+    print("{}: {} resources, {} tasks, process_tasks {:.2f}s +{} MB, "
+          "create_flow {:.2f}s +{} MB, peak +{} MB".format(
+              name, len(runner.resources), len(processed),
+              expanded - started, (expanded_rss - rss) // 1024,
+              finished - expanded, (get_rss() - expanded_rss) // 1024,
+              (get_peak_rss() - peak) // 1024))
+
+
+def main():
+    args = get_parser().parse_args()
+    started = time.time()
+    setup_runner, setup_workload = build_setup(args)
+    cleanup_runner = build_cleanup(setup_workload)
+    print("Workloads of {} servers are built in {:.2f}s".format(
+        args.tenants * args.servers, time.time() - started))
+    measure("SetupWorkload", setup_runner)
+    measure("CleanupWorkload", cleanup_runner)
+
+
+if __name__ == "__main__":
+    main()